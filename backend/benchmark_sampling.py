@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for DatasetGenerator._sample_from_pool.
+
+Compares the old per-row list comprehension with the NumPy fancy-indexing
+path and the categorical-codes path at 10k, 100k and 1M rows.
+Run from the backend directory: python benchmark_sampling.py
+"""
+import sys
+import timeit
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / "src"))
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+POOL_SIZE = 500
+ROW_COUNTS = [10_000, 100_000, 1_000_000]
+REPEATS = 5
+
+
+def legacy_list_comprehension(pool, row_count):
+    return np.array([pool[i % len(pool)] for i in np.random.randint(0, len(pool), row_count)])
+
+
+def fancy_indexing(pool, row_count):
+    pool_array = np.asarray(pool, dtype=object)
+    return pool_array[np.random.randint(0, len(pool_array), row_count)]
+
+
+def categorical_codes(pool, row_count):
+    categories = pd.unique(np.asarray(pool, dtype=object))
+    codes = np.random.randint(0, len(categories), row_count)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def best_of(func, pool, row_count):
+    """Best wall time in milliseconds over REPEATS runs."""
+    return min(timeit.repeat(lambda: func(pool, row_count), number=1, repeat=REPEATS)) * 1000
+
+
+def run_benchmark():
+    fake = Faker()
+    Faker.seed(42)
+    np.random.seed(42)
+    pool = [fake.name() for _ in range(POOL_SIZE)]
+
+    print(f"Sampling from a {POOL_SIZE}-value Faker name pool (best of {REPEATS} runs)")
+    print(f"{'Rows':>10} {'List comp (ms)':>16} {'Indexing (ms)':>15} {'Categorical (ms)':>18} {'Speedup':>9}")
+    print("-" * 72)
+
+    for row_count in ROW_COUNTS:
+        legacy = best_of(legacy_list_comprehension, pool, row_count)
+        indexed = best_of(fancy_indexing, pool, row_count)
+        categorical = best_of(categorical_codes, pool, row_count)
+        print(f"{row_count:>10,} {legacy:>16.1f} {indexed:>15.1f} {categorical:>18.1f} {legacy / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
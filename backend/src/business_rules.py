@@ -0,0 +1,205 @@
+"""
+Compiled engine for calculated-field business rules.
+
+Each "calculated_field" rule ("total = quantity * dim_products.unit_price") is
+parsed once into a checked expression. Column references may name a parent
+table, whose values are gathered through the FK join. Rules are ordered by a
+dependency DAG across tables, so a field computed from another calculated field
+(in the same or a parent table) always sees its final values. Expressions are
+evaluated with numexpr (multithreaded, one fused pass per expression) when it is
+installed, and with NumPy otherwise.
+"""
+import ast
+import logging
+from functools import lru_cache
+from graphlib import CycleError, TopologicalSorter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models import Schema, BusinessRule, ForeignKeyDefinition
+
+try:
+    import numexpr
+except ImportError:  # Optional: formulas fall back to NumPy evaluation
+    numexpr = None
+
+logger = logging.getLogger(__name__)
+
+# Functions formulas may call (all supported by numexpr as well)
+FUNCTIONS = {"where": np.where, "abs": np.abs, "sqrt": np.sqrt, "log": np.log, "exp": np.exp}
+
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Attribute,
+                  ast.Constant, ast.Load, ast.operator, ast.unaryop, ast.cmpop)
+
+ColumnRef = Tuple[str, str]  # (table, column)
+
+
+class CalculatedField:
+    """A parsed calculated-field rule: target column and the expression computing it."""
+
+    def __init__(self, table: str, target: str, expression: str, variables: Dict[str, ColumnRef], description: str):
+        self.table = table
+        self.target = target
+        self.expression = expression  # Column references rewritten to plain variable names
+        self.variables = variables  # Variable name -> (table, column) it reads
+        self.description = description
+        self.code = compile(expression, f"<{table}.{target}>", "eval")
+
+    @property
+    def key(self) -> ColumnRef:
+        return self.table, self.target
+
+    def evaluate(self, arrays: Dict[str, np.ndarray]) -> np.ndarray:
+        if numexpr is not None:
+            return numexpr.evaluate(self.expression, local_dict=arrays)
+        return eval(self.code, {"__builtins__": {}, **FUNCTIONS}, arrays)
+
+
+class _ColumnRefs(ast.NodeTransformer):
+    """Replace column references (col or table.col) with variable names, collecting them."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.variables: Dict[str, ColumnRef] = {}
+
+    def visit_Call(self, node: ast.Call) -> ast.Call:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ValueError(f"unsupported function call: {ast.unparse(node)}")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:
+        self.variables[node.id] = (self.table, node.id)
+        return node
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.Name:
+        if not isinstance(node.value, ast.Name):
+            raise ValueError(f"unsupported column reference: {ast.unparse(node)}")
+        table = node.value.id
+        name = node.attr if table == self.table else f"{table}__{node.attr}"
+        self.variables[name] = (table, node.attr)
+        return ast.Name(id=name, ctx=ast.Load())
+
+
+@lru_cache(maxsize=256)
+def _parse(table: str, formula: str) -> Tuple[str, str, Tuple[Tuple[str, ColumnRef], ...]]:
+    """(target, rewritten expression, variables) for 'target = expression'; raises ValueError."""
+    target, sep, expr = formula.partition("=")
+    target = target.strip()
+    if not sep or not expr.strip() or not target:
+        raise ValueError(f"expected 'column = expression', got {formula!r}")
+    if target.startswith(f"{table}."):
+        target = target[len(table) + 1:]
+    if not target.isidentifier():
+        raise ValueError(f"invalid target column {target!r}")
+
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"invalid expression {expr.strip()!r}: {e.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"unsupported syntax {type(node).__name__} in {expr.strip()!r}")
+    refs = _ColumnRefs(table)
+    tree = ast.fix_missing_locations(refs.visit(tree))
+    return target, ast.unparse(tree), tuple(refs.variables.items())
+
+
+def parse_rule(rule: BusinessRule) -> CalculatedField:
+    """Parse a calculated_field rule (parameters: table, formula); raises ValueError if malformed."""
+    table = rule.parameters.get("table")
+    formula = rule.parameters.get("formula")
+    if not table or not formula:
+        raise ValueError("calculated_field rules need 'table' and 'formula' parameters")
+    target, expression, variables = _parse(table, formula)
+    return CalculatedField(table, target, expression, dict(variables), rule.description)
+
+
+def compile_rules(schema: Schema) -> List[CalculatedField]:
+    """Parse the schema's calculated_field rules in dependency order, dropping malformed and cyclic rules."""
+    fields: Dict[ColumnRef, CalculatedField] = {}
+    for rule in schema.business_rules:
+        if rule.rule_type != "calculated_field":
+            continue
+        try:
+            field = parse_rule(rule)
+        except ValueError as e:
+            logger.warning(f"Failed to parse calculation rule: {rule.description}. Error: {e}")
+            continue
+        fields[field.key] = field  # A later rule for the same column replaces the earlier one
+
+    while True:
+        graph = {key: {ref for ref in field.variables.values() if ref in fields and ref != key}
+                 for key, field in fields.items()}
+        try:
+            return [fields[key] for key in TopologicalSorter(graph).static_order()]
+        except CycleError as e:
+            cycle = set(e.args[1])
+            logger.warning(f"Skipping calculation rules with circular dependencies: "
+                           f"{', '.join(f'{t}.{c}' for t, c in sorted(cycle))}")
+            fields = {key: field for key, field in fields.items() if key not in cycle}
+
+
+def _numeric(series: pd.Series) -> np.ndarray:
+    if series.dtype == bool:
+        return series.to_numpy()
+    if not pd.api.types.is_numeric_dtype(series):
+        raise TypeError(f"column {series.name!r} is not numeric")
+    if series.hasnans:
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.to_numpy()
+
+
+def _find_fk(schema: Schema, child: str, parent: str) -> ForeignKeyDefinition:
+    fk = next((fk for fk in schema.relationships if fk.child_table == child and fk.parent_table == parent), None)
+    if fk is None:
+        raise ValueError(f"{child} has no foreign key to {parent}")
+    return fk
+
+
+def apply_calculated_fields(schema: Schema, data: Dict[str, pd.DataFrame],
+                            parents: Optional[Dict[str, pd.DataFrame]] = None,
+                            fields: Optional[List[CalculatedField]] = None):
+    """
+    Compute every calculated field of the tables in data, in dependency order.
+
+    Parent-table columns are gathered through the FK join (rows whose FK value has
+    no parent get NaN); each child/parent row mapping is built once per call.
+    parents holds read-only tables that are joined but not computed, e.g. the
+    resident parent columns during streaming generation. Rules whose tables or
+    columns are missing are skipped with a warning. fields are the schema's
+    compiled rules, if the caller already has them.
+    """
+    if fields is None:
+        fields = compile_rules(schema)
+    tables = {**(parents or {}), **data}
+    joins: Dict[Tuple[str, str], np.ndarray] = {}  # (child, parent) -> parent row position per child row
+
+    def join(table: str, parent_table: str) -> np.ndarray:
+        if (table, parent_table) not in joins:
+            fk = _find_fk(schema, table, parent_table)
+            parent_keys = tables[parent_table][fk.parent_column]
+            first = ~parent_keys.duplicated().to_numpy()
+            indexer = pd.Index(parent_keys[first]).get_indexer(tables[table][fk.child_column])
+            joins[(table, parent_table)] = np.where(indexer < 0, -1, np.flatnonzero(first)[indexer])
+        return joins[(table, parent_table)]
+
+    def gather(table: str, ref: ColumnRef) -> np.ndarray:
+        ref_table, column = ref
+        if ref_table == table:
+            return _numeric(tables[table][column])
+        rows = join(table, ref_table)
+        values = _numeric(tables[ref_table][column]).astype(np.float64)[rows]
+        values[rows < 0] = np.nan
+        return values
+
+    for field in fields:
+        if field.table not in data:
+            continue
+        try:
+            arrays = {name: gather(field.table, ref) for name, ref in field.variables.items()}
+            data[field.table][field.target] = field.evaluate(arrays)
+        except (KeyError, ValueError, TypeError, ZeroDivisionError) as e:
+            logger.warning(f"Failed to apply calculation rule: {field.description}. Error: {e}")
@@ -76,11 +76,70 @@ INTENTIONAL_FORMAT_INCONSISTENCY_PCT = 0.02  # 2%
 INTENTIONAL_DUPLICATES_PCT = 0.01  # 1%
 INTENTIONAL_OUTLIERS_PCT = 0.025  # 2.5%
 
+# Streaming generation: fact tables are built and written in chunks of this many rows
+GENERATION_CHUNK_SIZE = int(os.getenv("GENERATION_CHUNK_SIZE", 25000))
+# Datasets of at least this many cells (rows x columns, summed over tables) are streamed to
+# disk instead of built in memory, e.g. 100k fact rows of 10 columns; validation and reports
+# then read back only the first STREAMING_REPORT_ROWS rows of each table
+STREAMING_GENERATION_MIN_CELLS = int(os.getenv("STREAMING_GENERATION_MIN_CELLS", 1000000))
+STREAMING_REPORT_ROWS = int(os.getenv("STREAMING_REPORT_ROWS", 50000))
+
+# Dataset output format: "csv", "parquet" or "feather" (compression is format specific,
+# e.g. "zstd" for parquet/feather or "gzip" for csv)
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "csv")
+OUTPUT_COMPRESSION = os.getenv("OUTPUT_COMPRESSION") or None
+
+# Parallel generation: independent tables of the same FK level run in a process pool
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS") or os.cpu_count() or 1)
+PARALLEL_GENERATION_MIN_ROWS = 50000  # Below this a level is cheaper to build in-process
+
+# Pool-sampled string columns and category columns are stored as pd.Categorical
+# (integer codes + the value pool) instead of one Python object per row; "false" keeps
+# plain object columns
+CATEGORICAL_STRING_COLUMNS = os.getenv("CATEGORICAL_STRING_COLUMNS", "true").lower() == "true"
+
+# Faker value pools are cached per process (LRU) and optionally persisted to disk,
+# keyed by (provider, locale, seed bucket, size)
+VALUE_POOL_CACHE_SIZE = 256  # Pools kept in memory
+VALUE_POOL_SEED_BUCKETS = 16  # Distinct pool variants per provider and size
+VALUE_POOL_CACHE_DIR = BASE_DIR / "cache" / "value_pools"
+VALUE_POOL_DISK_CACHE = os.getenv("VALUE_POOL_DISK_CACHE", "true").lower() == "true"
+
+# Download packages are stored content-addressed (hash of datasets, reports and
+# schema) so unchanged sessions reuse the same archive
+PACKAGE_CACHE_DIR = OUTPUT_DIR / "packages"
+
+# Approximate validation: tables above this many rows are profiled from a stratified
+# row sample, and each quality check reports a 95% error bound on its score
+APPROXIMATE_VALIDATION_MIN_ROWS = int(os.getenv("APPROXIMATE_VALIDATION_MIN_ROWS", 500000))
+VALIDATION_SAMPLE_ROWS = 100000
+HLL_PRECISION = 14  # 2^14 registers, ~0.8% relative error on distinct counts
+
+# Table profiles and FK results are cached by table content fingerprint, so
+# re-validation only re-checks tables that changed
+VALIDATION_CACHE_SIZE = 256  # Cached table profiles + FK results
+
+# Quality checks, table profiling and FK checks run concurrently in a thread pool
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS") or min(8, os.cpu_count() or 1))
+
+# Estimated cost of each check cost class as (fixed seconds, seconds per million
+# profiled rows). Callers pass a time budget and the validator runs the most
+# valuable checks that fit it.
+CHECK_COST_CLASSES = {"low": (0.001, 0.05), "medium": (0.005, 0.3), "high": (0.02, 1.0)}
+PREVIEW_VALIDATION_BUDGET = 0.02  # Phase 3: near-instant, skips high-cost checks
+FULL_VALIDATION_BUDGET = None  # Phase 4: run every registered check
+
 # Distribution settings
 NORMAL_DISTRIBUTION_PCT = 0.80  # 80% of data follows normal distribution
 OUTLIER_PCT_MIN = 0.05  # 5% minimum outliers
 OUTLIER_PCT_MAX = 0.10  # 10% maximum outliers
 
+# Date columns are sampled from a daily intensity curve: the KPI trend (expected_trend /
+# narrative_percentage) times a yearly seasonal cycle times event dips
+SEASONAL_AMPLITUDE = 0.25  # Peak month has 1.25x, trough month 0.75x the trend volume
+SEASONAL_PEAK_MONTH = 12
+DEFAULT_TREND_PCT = 30.0  # For KPIs with a growth/decline/spike trend but no narrative_percentage
+
 # Scoring weights
 SCORING_WEIGHTS = {
     "technical_integrity": 0.25,
@@ -91,6 +150,14 @@ SCORING_WEIGHTS = {
 }
 
 # PDF settings
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS") or os.cpu_count() or 1)  # Chart rendering processes
+PARALLEL_CHART_MIN_COUNT = 6  # Fewer uncached charts render faster in-process than through a new pool
+# Rendered charts are cached on disk by hash of (chart type, inputs, style), oldest evicted first
+CHART_CACHE_DIR = BASE_DIR / "cache" / "charts"
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Chart output: "png" rasterizes every chart, "vector" embeds bar/histogram/pie/line charts
+# as native PDF drawings (boxplots and heatmaps stay PNG)
+REPORT_CHART_FORMAT = os.getenv("REPORT_CHART_FORMAT", "png")
 PDF_MIN_VISUALS_DENORMALIZED = 8
 PDF_MIN_VISUALS_NORMALIZED = 10
 PDF_PAGE_SIZE = "A4"
@@ -0,0 +1,377 @@
+"""
+Single-pass column profiling for quality validation.
+
+Every column is encoded once (pd.factorize, or the codes of a Categorical) and
+all per-column statistics, row duplicates and date trends are derived from
+those codes and one vectorized pass over the numeric block.
+
+Tables above a row threshold are profiled from a stratified row sample: counts
+are scaled back to the full table, the primary key's distinct count comes from
+a HyperLogLog sketch over the full column, and the helpers at the bottom give
+95% margins for the sampled statistics.
+"""
+import logging
+import math
+from concurrent.futures import Executor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models import Schema, ColumnProfile, TableProfile, DatasetProfile
+from config import VALIDATION_SAMPLE_ROWS, HLL_PRECISION
+from validation_cache import validation_cache
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_DTYPES = [np.number]
+CATEGORICAL_DTYPES = ['category', 'object', 'string', 'bool']
+TOP_VALUES = 10
+BOTTOM_VALUES = 5
+
+# Combined row keys are re-compressed before they could overflow int64
+_MAX_KEY_CARDINALITY = 2 ** 62
+
+Z_95 = 1.96
+# One-sided bound for the sketched key check: a unique key is reported duplicated
+# in about 1 of 2000 tables, instead of 1 in 40 with Z_95
+Z_KEY_UNIQUE = 3.29
+SAMPLE_SEED = 0  # Fixed so repeated validation of the same data gives the same scores
+
+
+def profile_dataset(schema: Schema, data: Dict[str, pd.DataFrame],
+                    approximate_above: Optional[int] = None,
+                    sample_rows: int = VALIDATION_SAMPLE_ROWS,
+                    fingerprints: Optional[Dict[str, str]] = None,
+                    executor: Optional[Executor] = None,
+                    correlations: bool = True,
+                    duplicate_rows: Optional[Dict[str, np.ndarray]] = None) -> DatasetProfile:
+    """
+    Profile every table in the dataset, sampling tables with more than approximate_above rows.
+
+    Tables with a content fingerprint are looked up in the validation cache
+    and only profiled if that content has not been profiled before (the
+    fingerprint must cover the table's duplicate rows). With an executor,
+    tables are profiled concurrently. Correlation matrices are left empty when
+    correlations is False. duplicate_rows maps tables to row positions that are
+    written twice (see DatasetGenerator.duplicate_rows); tables are profiled as
+    written.
+    """
+    primary_keys = {t.name: t.primary_key for t in schema.tables}
+    duplicate_rows = duplicate_rows or {}
+    builds = {}
+    for name, df in data.items():
+        primary_key = primary_keys.get(name)
+        dups = duplicate_rows.get(name)
+        if approximate_above is not None and len(df) > max(approximate_above, sample_rows):
+            build = partial(profile_table_sample, name, df, primary_key, sample_rows, correlations, dups)
+        else:
+            build = partial(profile_table, name, df, primary_key, correlations, dups)
+
+        if fingerprints and name in fingerprints:
+            key = ("profile", name, primary_key, fingerprints[name], approximate_above, sample_rows, correlations)
+            build = partial(validation_cache.get, key, build)
+        builds[name] = build
+
+    if executor is None:
+        return DatasetProfile(tables={name: build() for name, build in builds.items()})
+    futures = {name: executor.submit(build) for name, build in builds.items()}
+    return DatasetProfile(tables={name: future.result() for name, future in futures.items()})
+
+
+def profile_table(name: str, df: pd.DataFrame, primary_key: Optional[str] = None,
+                  correlations: bool = True, duplicate_rows: Optional[np.ndarray] = None) -> TableProfile:
+    """
+    Compute all column statistics for one table.
+
+    Rows at positions duplicate_rows count a second time, as if appended to the
+    table (correlations are computed from the distinct rows only).
+    """
+    dups = duplicate_rows if duplicate_rows is not None else np.empty(0, dtype=np.int64)
+    row_count = len(df) + len(dups)
+    numeric_cols = list(df.select_dtypes(include=NUMERIC_DTYPES).columns)
+    categorical_cols = set(df.select_dtypes(include=CATEGORICAL_DTYPES).columns)
+
+    numeric_values = np.empty((row_count, len(numeric_cols)), order="F")
+    for i, col in enumerate(numeric_cols):
+        numeric_values[:len(df), i] = df[col].to_numpy(dtype=float, na_value=np.nan)
+        numeric_values[len(df):, i] = numeric_values[dups, i]
+    numeric_stats = _numeric_stats(numeric_cols, numeric_values)
+
+    columns: Dict[str, ColumnProfile] = {}
+    encoded: List[Tuple[np.ndarray, int]] = []
+    for col in df.columns:
+        series = df[col]
+        if col in numeric_stats:
+            columns[col] = ColumnProfile(
+                name=col,
+                dtype=str(series.dtype),
+                kind="numeric",
+                null_pct=numeric_stats[col]["null_count"] / row_count * 100 if row_count else 0.0,
+                **numeric_stats[col]
+            )
+            continue
+
+        codes, uniques = _encode(series)
+        encoded.append((codes, len(uniques)))
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        if len(dups):
+            dup_codes = codes[dups]
+            counts += np.bincount(dup_codes[dup_codes >= 0], minlength=len(uniques))
+
+        if col in categorical_cols:
+            kind = "categorical"
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            kind = "datetime"
+        else:
+            kind = "other"
+
+        null_count = int(row_count - counts.sum())
+        profile = ColumnProfile(
+            name=col,
+            dtype=str(series.dtype),
+            kind=kind,
+            null_count=null_count,
+            null_pct=null_count / row_count * 100 if row_count else 0.0,
+            distinct_count=int((counts > 0).sum())
+        )
+
+        if kind == "categorical":
+            profile.frequency_std, profile.top_values, profile.bottom_values = _frequency_stats(counts, uniques)
+        if 'date' in col.lower() or kind == "datetime":
+            profile.monthly_counts = _monthly_counts(counts, uniques)
+
+        columns[col] = profile
+
+    primary_key_unique = True
+    pk = columns.get(primary_key)
+    if pk is not None:
+        if pk.distinct_count is None:
+            primary_key_unique = not len(dups) and not df[primary_key].duplicated().any()
+        else:
+            # Matches Series.duplicated().any(): repeated nulls count as duplicates too
+            primary_key_unique = pk.distinct_count + min(pk.null_count, 1) == row_count
+
+    return TableProfile(
+        name=name,
+        row_count=row_count,
+        # Every re-written row repeats the row it was copied from
+        duplicate_row_count=_count_duplicate_rows(df, encoded) + len(dups),
+        primary_key=primary_key,
+        primary_key_unique=primary_key_unique,
+        columns=columns,
+        correlations=_correlations(df[numeric_cols]) if correlations else {}
+    )
+
+
+def profile_table_sample(name: str, df: pd.DataFrame, primary_key: Optional[str] = None,
+                         sample_rows: int = VALIDATION_SAMPLE_ROWS, correlations: bool = True,
+                         duplicate_rows: Optional[np.ndarray] = None) -> TableProfile:
+    """
+    Estimate the table profile from a stratified sample of sample_rows rows.
+
+    Null, outlier, negative, top-value and monthly counts are scaled to the
+    full table. A row duplicated once survives sampling only if its original
+    is sampled too, so duplicates are scaled by 1 / fraction^2. The table is
+    sampled as written, i.e. followed by the rows at duplicate_rows.
+    """
+    dups = duplicate_rows if duplicate_rows is not None else np.empty(0, dtype=np.int64)
+    row_count = len(df) + len(dups)
+    positions = _stratified_positions(row_count, sample_rows)
+    written = positions >= len(df)
+    positions[written] = dups[positions[written] - len(df)]
+    sample = df.iloc[positions]
+    profile = profile_table(name, sample, primary_key, correlations)
+
+    n = len(sample)
+    fraction = n / row_count
+    scale = 1 / fraction
+    for col in profile.columns.values():
+        col.null_count = round(col.null_count * scale)
+        if col.outlier_count is not None:
+            col.outlier_count = round(col.outlier_count * scale)
+        if col.negative_count is not None:
+            col.negative_count = round(col.negative_count * scale)
+        col.top_values = {k: round(v * scale) for k, v in col.top_values.items()}
+        col.bottom_values = {k: round(v * scale) for k, v in col.bottom_values.items()}
+        if col.monthly_counts is not None:
+            col.monthly_counts = {k: round(v * scale) for k, v in col.monthly_counts.items()}
+
+    sample_duplicates = profile.duplicate_row_count
+    profile.duplicate_row_count = min(row_count, round(sample_duplicates / fraction ** 2))
+    profile.duplicate_margin = min(float(row_count), Z_95 * math.sqrt(max(sample_duplicates, 1)) / fraction ** 2)
+
+    # Re-written rows repeat their primary key
+    if len(dups) and primary_key in df.columns:
+        profile.primary_key_unique = False
+
+    # A repeat inside the sample is conclusive; otherwise ask the sketch of the full column
+    if profile.primary_key_unique and primary_key in df.columns:
+        pk = df[primary_key]
+        distinct = hyperloglog_distinct(pk)
+        rse = 1.04 / math.sqrt(1 << HLL_PRECISION)
+        nulls = int(pk.isna().sum())
+        # As in the exact check, a second null counts as a duplicate
+        profile.primary_key_unique = (nulls <= 1
+                                      and distinct >= (row_count - nulls) * (1 - Z_KEY_UNIQUE * rse))
+        profile.columns[primary_key].distinct_count = round(distinct)
+
+    profile.row_count = row_count
+    profile.sampled_rows = n
+    return profile
+
+
+def _stratified_positions(row_count: int, sample_rows: int) -> np.ndarray:
+    """One random row from each of sample_rows equal, contiguous blocks of the table."""
+    rng = np.random.default_rng(SAMPLE_SEED)
+    edges = np.linspace(0, row_count, min(sample_rows, row_count) + 1).astype(np.int64)
+    return edges[:-1] + rng.integers(0, np.diff(edges))
+
+
+def hyperloglog_distinct(series: pd.Series, precision: int = HLL_PRECISION) -> float:
+    """HyperLogLog estimate of the number of distinct non-null values."""
+    hashes = pd.util.hash_pandas_object(series.dropna(), index=False).to_numpy()
+    if not len(hashes):
+        return 0.0
+    m = 1 << precision
+    width = 64 - precision
+    register = (hashes >> np.uint64(width)).astype(np.int64)
+    rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)  # Exact: width <= 53 bits
+    # Position of the leftmost 1-bit in the remaining bits (width + 1 when they are all zero)
+    _, exponent = np.frexp(rest)
+    rank = np.where(rest > 0, width - exponent + 1, width + 1)
+
+    registers = np.zeros(m, dtype=np.int64)
+    per_register = pd.Series(rank).groupby(register).max()
+    registers[per_register.index.to_numpy()] = per_register.to_numpy()
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    empty = int((registers == 0).sum())
+    if estimate <= 2.5 * m and empty:
+        # Small-range correction (linear counting)
+        estimate = m * math.log(m / empty)
+    return float(estimate)
+
+
+def proportion_margin(p: float, table: TableProfile) -> float:
+    """95% margin on a row proportion of the table; 0 when it was profiled exactly."""
+    n = table.sampled_rows
+    if not n:
+        return 0.0
+    fpc = math.sqrt((table.row_count - n) / max(table.row_count - 1, 1))
+    # Floor the variance so a proportion never observed in the sample still gets a margin
+    return Z_95 * math.sqrt(max(p * (1 - p), 1 / n) / n) * fpc
+
+
+def correlation_bounds(r: float, table: TableProfile) -> Tuple[float, float]:
+    """95% Fisher-z interval for a sampled Pearson correlation."""
+    n = table.sampled_rows
+    if not n or n <= 3 or abs(r) >= 1 or math.isnan(r):
+        return r, r
+    z = math.atanh(r)
+    se = 1 / math.sqrt(n - 3)
+    return math.tanh(z - Z_95 * se), math.tanh(z + Z_95 * se)
+
+
+def _encode(series: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Integer codes (-1 for null) and the distinct values they point to."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes, pd.Index(uniques)
+
+
+def _numeric_stats(columns: List[str], values: np.ndarray) -> Dict[str, Dict]:
+    """Nulls, min/max/mean/std, quartiles, IQR outliers and negatives for the numeric block."""
+    stats = {}
+    for i, col in enumerate(columns):
+        column = values[:, i]
+        present = column[~np.isnan(column)]
+        col_stats = {"null_count": int(len(column) - len(present)), "outlier_count": 0, "negative_count": 0}
+
+        if len(present):
+            q1, median, q3 = np.quantile(present, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            col_stats.update({
+                "min": float(present.min()),
+                "max": float(present.max()),
+                "mean": float(present.mean()),
+                "std": float(present.std(ddof=1)) if len(present) > 1 else None,
+                "q1": float(q1),
+                "median": float(median),
+                "q3": float(q3),
+                "outlier_count": int(((present < q1 - 1.5 * iqr) | (present > q3 + 1.5 * iqr)).sum()),
+                "negative_count": int((present < 0).sum()),
+            })
+        stats[col] = col_stats
+    return stats
+
+
+def _frequency_stats(counts: np.ndarray,
+                     uniques: pd.Index) -> Tuple[Optional[float], Dict[str, int], Dict[str, int]]:
+    """Std of normalized value frequencies (as value_counts(normalize=True).std()), top and bottom values."""
+    observed = counts > 0
+    present = counts[observed]
+    if not len(present):
+        return None, {}, {}
+
+    frequency_std = None
+    if len(present) > 1:
+        frequency_std = float(np.std(present / present.sum(), ddof=1))
+
+    order = np.argsort(-counts, kind='stable')[:len(present)]
+    top_values = {str(uniques[i]): int(counts[i]) for i in order[:TOP_VALUES]}
+    bottom_values = {str(uniques[i]): int(counts[i]) for i in order[-BOTTOM_VALUES:]}
+    return frequency_std, top_values, bottom_values
+
+
+def _monthly_counts(counts: np.ndarray, uniques: pd.Index) -> Dict[str, int]:
+    """Row counts per month; only non-datetime columns are parsed, once per distinct value."""
+    if pd.api.types.is_datetime64_any_dtype(uniques):
+        parsed = pd.Series(uniques)
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce')
+    months = parsed.dt.to_period('M')
+    per_month = pd.Series(counts, index=months)
+    per_month = per_month[per_month.index.notna()].groupby(level=0).sum().sort_index()
+    return {str(period): int(count) for period, count in per_month.items()}
+
+
+def _count_duplicate_rows(df: pd.DataFrame, encoded: List[Tuple[np.ndarray, int]]) -> int:
+    """
+    Number of rows that repeat an earlier row (DataFrame.duplicated().sum()).
+
+    Rows are first keyed on the already-encoded columns; only rows sharing a
+    key with another row can be full duplicates, so the exact check runs on
+    that (usually tiny) subset.
+    """
+    row_count = len(df)
+    if not row_count:
+        return 0
+    if not encoded:
+        return int(df.duplicated().sum())
+
+    key = np.zeros(row_count, dtype=np.int64)
+    cardinality = 1
+    for codes, n_uniques in encoded:
+        # Shift so nulls (-1) become their own value, as in DataFrame.duplicated()
+        radix = n_uniques + 1
+        if cardinality * radix >= _MAX_KEY_CARDINALITY:
+            key, distinct = pd.factorize(key)
+            cardinality = len(distinct)
+        key = key * radix + (codes.astype(np.int64) + 1)
+        cardinality *= radix
+
+    candidates = pd.Series(key).duplicated(keep=False).to_numpy()
+    if not candidates.any():
+        return 0
+    return int(df[candidates].duplicated().sum())
+
+
+def _correlations(num_df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    if len(num_df.columns) < 2:
+        return {}
+    corr = num_df.corr()
+    return {col: {other: float(v) for other, v in row.items()} for col, row in corr.iterrows()}
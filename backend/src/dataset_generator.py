@@ -3,11 +3,15 @@ Realistic dataset generation engine.
 """
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from faker import Faker
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 import uuid
 import random
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -18,22 +22,94 @@ from models import (
 from config import (
     INTENTIONAL_MISSING_VALUES_PCT, INTENTIONAL_FORMAT_INCONSISTENCY_PCT,
     INTENTIONAL_DUPLICATES_PCT, INTENTIONAL_OUTLIERS_PCT,
-    NORMAL_DISTRIBUTION_PCT
+    NORMAL_DISTRIBUTION_PCT, GENERATION_CHUNK_SIZE,
+    GENERATION_WORKERS, PARALLEL_GENERATION_MIN_ROWS,
+    CATEGORICAL_STRING_COLUMNS, VALUE_POOL_SEED_BUCKETS,
+    OUTPUT_FORMAT, OUTPUT_COMPRESSION
 )
+from value_pool_cache import value_pool_cache
+from event_impacts import apply_event_impacts
+from time_shaping import sample_dates, uniform_dates
+from business_rules import CalculatedField, apply_calculated_fields, compile_rules
+from dataset_writers import get_writer
 
 logger = logging.getLogger(__name__)
 
+# Faker providers that string columns sample their values from
+POOL_PROVIDERS = {
+    "name": lambda fake: fake.name(),
+    "email": lambda fake: fake.email(),
+    "address": lambda fake: fake.address().replace('\n', ', '),
+    "phone_number": lambda fake: fake.phone_number(),
+    "word": lambda fake: fake.word(),
+}
+
+
+def _stable_seed(*parts: Any) -> int:
+    """Derive a 32-bit seed from parts that is the same in every process."""
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def _set_nulls(df: pd.DataFrame, col: str, positions: np.ndarray):
+    """Null out rows of one column without copying it, where its dtype allows."""
+    series = df[col]
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().copy()  # Small integer codes
+        codes[positions] = -1
+        df[col] = pd.Categorical.from_codes(codes, dtype=dtype)
+    elif isinstance(series.array, (pd.arrays.ArrowStringArray, pd.arrays.ArrowExtensionArray)):
+        # Arrow buffers are immutable: the column is rebuilt with nulls at positions, in Arrow
+        mask = np.zeros(len(series), dtype=bool)
+        mask[positions] = True
+        values = pa.array(series.array)
+        nulled = pc.if_else(pa.array(mask), pa.scalar(None, type=values.type), values)
+        df[col] = pd.Series(type(series.array)(nulled), index=df.index)
+    elif dtype.kind in "iub":
+        # Nullable integer/boolean arrays wrap the existing values plus a validity mask
+        mask = np.zeros(len(series), dtype=bool)
+        mask[positions] = True
+        array_type = pd.arrays.BooleanArray if dtype.kind == "b" else pd.arrays.IntegerArray
+        df[col] = array_type(series.to_numpy(), mask)
+    else:
+        # Float, datetime, object and nullable columns take nulls in place
+        df.iloc[positions, df.columns.get_loc(col)] = None
+
+
+def _generate_table_worker(seed: int, table_def: TableDefinition, row_count: int, schema: Schema,
+                           parent_keys: Dict[Tuple[str, str], np.ndarray]) -> pd.DataFrame:
+    """Process-pool entry point: build one table from its own seed and its parents' keys."""
+    generator = DatasetGenerator(seed=seed, workers=1)
+    generator.key_arrays = parent_keys
+    return generator._generate_seeded_table(table_def, row_count, schema)
+
+
 class DatasetGenerator:
     """Generate realistic datasets based on AI-generated schema."""
 
-    def __init__(self, seed: Optional[int] = None):
-        self.fake = Faker()
+    def __init__(self, seed: Optional[int] = None, workers: int = GENERATION_WORKERS):
+        self.locale = "en_US"
+        self.fake = Faker(self.locale)
         if seed:
             random.seed(seed)
             np.random.seed(seed)
             Faker.seed(seed)
+
+        # Every table is generated from its own seed derived from this one, so the
+        # output does not depend on how many workers build it
+        self.seed = seed if seed else int(np.random.randint(0, 2**31 - 1))
+        self.workers = max(1, workers)
         
         self.generated_data: Dict[str, pd.DataFrame] = {}
+        # Key columns kept resident for FK sampling when tables are streamed to disk
+        self.key_arrays: Dict[Tuple[str, str], np.ndarray] = {}
+        # Row positions per table that are written a second time as intentional duplicates
+        self.duplicate_rows: Dict[str, np.ndarray] = {}
+        # Calculated-field rules of the schema being generated, compiled once per run
+        self.calculated_fields: List[CalculatedField] = []
+        # "date" columns per table, held as datetime64 and written as calendar dates
+        self.date_columns: Dict[str, List[str]] = {}
 
     def generate(self, schema: Schema, total_rows: int) -> Dict[str, pd.DataFrame]:
         """
@@ -47,104 +123,294 @@ class DatasetGenerator:
             Dictionary mapping table names to Pandas DataFrames
         """
         logger.info(f"Starting data generation for {len(schema.tables)} tables")
+        self.calculated_fields = compile_rules(schema)
+        self.date_columns = self._get_date_columns(schema)
         
-        # Determine generation order (topological sort based on FKs)
-        generation_order = self._get_generation_order(schema)
-        
-        for table_name in generation_order:
-            table_def = next(t for t in schema.tables if t.name == table_name)
-            
-            # Determine row count for this table
-            # Fact tables get total_rows, dimension tables usually get 5-10% of total_rows or a reasonable minimum
-            is_fact = "fact" in table_name.lower() or not any(fk.parent_table == table_name for fk in schema.relationships)
-            
-            if is_fact:
-                row_count = total_rows
-            else:
-                # Dimension tables are smaller
-                row_count = max(50, int(total_rows * 0.05))
-                # Cap dimensions at a reasonable limit for realism unless specified
-                row_count = min(row_count, 5000)
-
-            logger.info(f"Generating {row_count} rows for table: {table_name}")
-            df = self._generate_table_data(table_def, row_count, schema)
-            self.generated_data[table_name] = df
-            
+        # Tables in the same level only depend on earlier levels (topological sort based on FKs)
+        for level in self._get_generation_levels(schema):
+            row_counts = {name: self._get_row_count(name, schema, total_rows) for name in level}
+
+            if self.workers > 1 and len(level) > 1 and sum(row_counts.values()) >= PARALLEL_GENERATION_MIN_ROWS:
+                self._generate_level_parallel(level, row_counts, schema)
+                continue
+
+            for table_name in level:
+                table_def = next(t for t in schema.tables if t.name == table_name)
+                logger.info(f"Generating {row_counts[table_name]} rows for table: {table_name}")
+                self.generated_data[table_name] = self._generate_seeded_table(table_def, row_counts[table_name], schema)
+
         # Apply business rules and cross-table logic
-        self._apply_business_rules(schema)
+        self._apply_business_rules(schema, self.generated_data)
         
-        # Inject intentional quality issues
-        self._inject_quality_issues(schema)
+        # Inject intentional quality issues, each table from its own seed so that changing
+        # one table leaves the others (and their validation cache entries) untouched
+        for table_name, df in self.generated_data.items():
+            self._seed_random_state(f"{table_name}:quality_issues")
+            self._inject_quality_issues(schema, {table_name: df})
         
         return self.generated_data
 
+    def generate_streaming(self, schema: Schema, total_rows: int, output_dir: Path,
+                           chunk_size: int = GENERATION_CHUNK_SIZE, fmt: str = OUTPUT_FORMAT,
+                           compression: Optional[str] = OUTPUT_COMPRESSION) -> Dict[str, Path]:
+        """
+        Generate the dataset in fixed-size row chunks, writing each chunk straight to disk.
+
+        Nothing is kept in self.generated_data. Only the parent key columns that
+        foreign keys sample from stay resident, so peak memory depends on
+        chunk_size rather than total_rows.
+
+        Args:
+            schema: The database schema to follow
+            total_rows: Target row count for the main fact table
+            output_dir: Directory the dataset files are written to
+            chunk_size: Maximum number of rows held in memory per table
+            fmt: Output format ("csv", "parquet" or "feather")
+            compression: Format-specific compression codec
+
+        Returns:
+            Dictionary mapping table names to the written file paths
+        """
+        logger.info(f"Starting streaming data generation for {len(schema.tables)} tables (chunk size {chunk_size:,})")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.calculated_fields = compile_rules(schema)
+        self.date_columns = self._get_date_columns(schema)
+
+        referenced = self._get_referenced_columns(schema)
+        paths = {}
+
+        for table_name in self._get_generation_order(schema):
+            table_def = next(t for t in schema.tables if t.name == table_name)
+            row_count = self._get_row_count(table_name, schema, total_rows)
+            resident = {col: [] for col in referenced.get(table_name, [])}
+            # Resident parent columns, for calculated fields that read a parent table. A parent
+            # that is missing or not generated yet (dangling or cyclic FK) has none, as in generate()
+            parents = {}
+            for fk in schema.relationships:
+                columns = {col: self.key_arrays[(fk.parent_table, col)]
+                           for col in referenced.get(fk.parent_table, []) if (fk.parent_table, col) in self.key_arrays}
+                if fk.child_table == table_name and columns:
+                    parents[fk.parent_table] = pd.DataFrame(columns)
+            self._seed_random_state(table_name)
+
+            logger.info(f"Streaming {row_count} rows for table: {table_name}")
+            with get_writer(output_dir, table_name, fmt, compression, self.date_columns[table_name]) as writer:
+                for offset in range(0, row_count, chunk_size):
+                    n_rows = min(chunk_size, row_count - offset)
+                    chunk = {table_name: self._generate_table_data(table_def, n_rows, schema, pk_start=offset + 1,
+                                                                   pk_total=row_count)}
+
+                    self._apply_business_rules(schema, chunk, parents)
+
+                    # Keep parent keys and formula inputs before quality issues are injected, like generate() does
+                    for col, parts in resident.items():
+                        if col in chunk[table_name]:
+                            parts.append(chunk[table_name][col])
+
+                    self._inject_quality_issues(schema, chunk)
+
+                    writer.write(chunk[table_name], self.duplicate_rows.pop(table_name, None))
+
+            for col, parts in resident.items():
+                if parts:
+                    self.key_arrays[(table_name, col)] = pd.concat(parts, ignore_index=True).array
+
+            paths[table_name] = writer.path
+            logger.info(f"Saved {writer.path.name} to {output_dir}")
+
+        return paths
+
+    def estimated_cells(self, schema: Schema, total_rows: int) -> int:
+        """Cells (rows x columns, summed over tables) of a dataset with total_rows fact rows."""
+        return sum(self._get_row_count(t.name, schema, total_rows) * len(t.columns) for t in schema.tables)
+
+    @staticmethod
+    def _is_fact_table(table_name: str, schema: Schema) -> bool:
+        """Fact tables are named so or are not the parent of any relationship."""
+        return "fact" in table_name.lower() or not any(fk.parent_table == table_name for fk in schema.relationships)
+
+    def _get_row_count(self, table_name: str, schema: Schema, total_rows: int) -> int:
+        """Fact tables get total_rows, dimension tables usually get 5-10% of total_rows or a reasonable minimum."""
+        if self._is_fact_table(table_name, schema):
+            return total_rows
+
+        # Dimension tables are smaller
+        row_count = max(50, int(total_rows * 0.05))
+        # Cap dimensions at a reasonable limit for realism unless specified
+        return min(row_count, 5000)
+
+    @staticmethod
+    def _get_date_columns(schema: Schema) -> Dict[str, List[str]]:
+        """Columns typed "date" per table (in memory they are datetime64 like datetime columns)."""
+        return {t.name: [c.name for c in t.columns if c.datatype == "date"] for t in schema.tables}
+
+    def _get_referenced_columns(self, schema: Schema) -> Dict[str, List[str]]:
+        """Map each parent table to the columns its children sample foreign keys from or use in formulas."""
+        referenced: Dict[str, List[str]] = {}
+        for fk in schema.relationships:
+            cols = referenced.setdefault(fk.parent_table, [])
+            if fk.parent_column not in cols:
+                cols.append(fk.parent_column)
+        for field in self.calculated_fields:
+            for table, col in field.variables.values():
+                if table != field.table and table in referenced and col not in referenced[table]:
+                    referenced[table].append(col)
+        return referenced
+
+    def _generate_level_parallel(self, level: List[str], row_counts: Dict[str, int], schema: Schema):
+        """Generate the independent tables of one DAG level concurrently in a process pool."""
+        logger.info(f"Generating {len(level)} independent tables in parallel: {', '.join(level)}")
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(level))) as executor:
+            futures = {}
+            for table_name in level:
+                table_def = next(t for t in schema.tables if t.name == table_name)
+                parent_keys = {
+                    (fk.parent_table, fk.parent_column): self._get_parent_keys(fk)
+                    for fk in schema.relationships
+                    if fk.child_table == table_name and self._get_parent_keys(fk) is not None
+                }
+                futures[table_name] = executor.submit(
+                    _generate_table_worker, self.seed, table_def, row_counts[table_name], schema, parent_keys
+                )
+
+            # Collect in level order so generated_data keeps a stable table order
+            for table_name in level:
+                self.generated_data[table_name] = futures[table_name].result()
+
+    def _generate_seeded_table(self, table_def: TableDefinition, row_count: int, schema: Schema) -> pd.DataFrame:
+        """Generate a whole table from its deterministic per-table seed."""
+        self._seed_random_state(table_def.name)
+        return self._generate_table_data(table_def, row_count, schema)
+
+    def _seed_random_state(self, key: str):
+        """Reseed every random source from a stable hash of the base seed and key."""
+        table_seed = _stable_seed(self.seed, key)
+        random.seed(table_seed)
+        np.random.seed(table_seed)
+        self.fake.seed_instance(table_seed)
+
+    def _get_generation_levels(self, schema: Schema) -> List[List[str]]:
+        """Group tables into DAG levels: each level only depends on tables in earlier levels."""
+        table_names = [t.name for t in schema.tables]
+        parents = {name: [] for name in table_names}
+        for fk in schema.relationships:
+            if fk.child_table in parents and fk.parent_table in parents and fk.parent_table != fk.child_table:
+                parents[fk.child_table].append(fk.parent_table)
+
+        depth: Dict[str, int] = {}
+        in_progress = set()
+
+        def visit(table_name) -> int:
+            if table_name in depth:
+                return depth[table_name]
+            if table_name in in_progress:
+                # Cyclic FK: break the cycle instead of recursing forever
+                return -1
+            in_progress.add(table_name)
+            depth[table_name] = 1 + max((visit(parent) for parent in parents[table_name]), default=-1)
+            in_progress.discard(table_name)
+            return depth[table_name]
+
+        for name in table_names:
+            visit(name)
+
+        levels: List[List[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for name in table_names:
+            levels[depth[name]].append(name)
+        return levels
+
     def _get_generation_order(self, schema: Schema) -> List[str]:
         """Sort tables so parents are generated before children."""
-        order = []
-        visited = set()
-        
-        def visit(table_name):
-            if table_name in visited:
-                return
-            if table_name in [item for item in order]:
-                return
-                
-            # Find dependencies (parents)
-            parents = [fk.parent_table for fk in schema.relationships if fk.child_table == table_name]
-            for parent in parents:
-                visit(parent)
-                
-            visited.add(table_name)
-            order.append(table_name)
-
-        for table in schema.tables:
-            visit(table.name)
-            
-        return order
+        return [name for level in self._get_generation_levels(schema) for name in level]
 
-    def _generate_table_data(self, table_def: TableDefinition, row_count: int, schema: Schema) -> pd.DataFrame:
-        """Generate data for a single table."""
+    def _generate_table_data(self, table_def: TableDefinition, row_count: int, schema: Schema,
+                             pk_start: int = 1, pk_total: Optional[int] = None) -> pd.DataFrame:
+        """Generate data for a single table (or one chunk of it, starting at pk_start)."""
         data = {}
         
         # First generate IDs and FKs to ensure integrity
-        pks = self._generate_primary_key(table_def, row_count)
+        pks = self._generate_primary_key(table_def, row_count, start=pk_start, total_rows=pk_total)
         data[table_def.primary_key] = pks
         
         # Foreign Keys
         for fk in schema.relationships:
             if fk.child_table == table_def.name:
-                parent_df = self.generated_data.get(fk.parent_table)
-                if parent_df is not None:
-                    # Pick random values from parent's PK
-                    parent_pks = parent_df[fk.parent_column].values
-                    data[fk.child_column] = np.random.choice(parent_pks, size=row_count)
+                parent_pks = self._get_parent_keys(fk)
+                if parent_pks is not None:
+                    # Pick random values from parent's PK (take() keeps Arrow-backed keys compact)
+                    data[fk.child_column] = parent_pks.take(np.random.randint(0, len(parent_pks), row_count))
         
         # Other columns
         for col in table_def.columns:
             if col.name in data:
                 continue # Already generated (PK or FK)
                 
-            data[col.name] = self._generate_column_values(col, row_count, schema)
+            data[col.name] = self._generate_column_values(col, row_count, schema, table_def)
             
         return pd.DataFrame(data)
 
-    def _generate_primary_key(self, table_def: TableDefinition, row_count: int) -> List[str]:
-        """Generate unique prefixed IDs."""
+    def _get_parent_keys(self, fk: ForeignKeyDefinition) -> Optional[np.ndarray]:
+        """Return the parent key values a foreign key samples from, if the parent exists yet."""
+        parent_df = self.generated_data.get(fk.parent_table)
+        if parent_df is not None:
+            return parent_df[fk.parent_column].array
+        return self.key_arrays.get((fk.parent_table, fk.parent_column))
+
+    def _generate_primary_key(self, table_def: TableDefinition, row_count: int, start: int = 1,
+                              total_rows: Optional[int] = None) -> pd.api.extensions.ExtensionArray:
+        """
+        Generate unique prefixed IDs like CUST000001 as an Arrow-backed string array.
+
+        The numeric part is zero-padded to 6 digits, widening automatically when the
+        table (total_rows, for chunked tables) needs more.
+        """
         pk_col = next(c for c in table_def.columns if c.name == table_def.primary_key)
         prefix = pk_col.id_prefix or table_def.name[:3].upper()
-        
-        ids = [f"{prefix}{str(i).zfill(6)}" for i in range(1, row_count + 1)]
-        return ids
+        width = max(6, len(str(total_rows or start + row_count - 1)))
+
+        ids = pa.array(np.arange(start, start + row_count, dtype=np.int64))
+        digits = pc.utf8_lpad(pc.cast(ids, pa.string()), width=width, padding="0")
+        return pd.arrays.ArrowStringArray(pc.binary_join_element_wise(prefix, digits, ""))
 
     def _generate_string_pool(self, generator_func, pool_size: int) -> List[str]:
         """Pre-generate a pool of fake values to sample from (much faster than per-row)."""
         return [generator_func() for _ in range(pool_size)]
 
-    def _sample_from_pool(self, pool: List[str], row_count: int) -> np.ndarray:
-        """Sample row_count values from a pre-generated pool."""
-        return np.array([pool[i % len(pool)] for i in np.random.randint(0, len(pool), row_count)])
+    def _get_value_pool(self, provider: str, pool_size: int) -> List[str]:
+        """
+        Fetch a Faker value pool from the process-wide cache, generating it on a miss.
 
-    def _generate_column_values(self, col: ColumnDefinition, row_count: int, schema: Schema) -> np.ndarray:
+        The seed bucket is drawn from the seeded global state, so seeded runs stay
+        reproducible while different jobs still see different pools.
+        """
+        bucket = int(np.random.randint(VALUE_POOL_SEED_BUCKETS))
+
+        def build_pool() -> List[str]:
+            fake = Faker(self.locale)
+            fake.seed_instance(_stable_seed(provider, self.locale, bucket))
+            return self._generate_string_pool(lambda: POOL_PROVIDERS[provider](fake), pool_size)
+
+        return value_pool_cache.get((provider, self.locale, bucket, pool_size), build_pool)
+
+    def _sample_from_pool(self, pool: List[str], row_count: int) -> Union[np.ndarray, pd.Categorical]:
+        """Sample row_count values from a pre-generated pool."""
+        if CATEGORICAL_STRING_COLUMNS:
+            # The pool becomes the categories, rows only store an integer code
+            categories = pd.unique(np.asarray(pool, dtype=object))
+            codes = np.random.randint(0, len(categories), row_count)
+            return pd.Categorical.from_codes(codes, categories=categories)
+        # Fancy indexing into the pool array: no Python-level loop over rows
+        pool_array = np.asarray(pool, dtype=object)
+        return pool_array[np.random.randint(0, len(pool_array), row_count)]
+
+    def _categorical_from_choices(self, choices: List[Any], codes: np.ndarray) -> pd.Categorical:
+        """Build a Categorical from positions into choices (which may repeat values)."""
+        choice_codes, categories = pd.factorize(pd.Series(choices, dtype=object))
+        return pd.Categorical.from_codes(choice_codes[codes], categories=categories)
+
+    def _generate_column_values(self, col: ColumnDefinition, row_count: int, schema: Schema,
+                                table_def: Optional[TableDefinition] = None) -> np.ndarray:
         """Generate realistic values based on column definition."""
 
         # Pool size: generate a small set of unique values, then sample
@@ -153,18 +419,18 @@ class DatasetGenerator:
 
         if col.datatype == "string":
             if "name" in col.name.lower():
-                pool = self._generate_string_pool(self.fake.name, pool_size)
+                pool = self._get_value_pool("name", pool_size)
                 return self._sample_from_pool(pool, row_count)
             if "email" in col.name.lower():
-                pool = self._generate_string_pool(self.fake.email, pool_size)
+                pool = self._get_value_pool("email", pool_size)
                 return self._sample_from_pool(pool, row_count)
             if "address" in col.name.lower():
-                pool = self._generate_string_pool(lambda: self.fake.address().replace('\n', ', '), pool_size)
+                pool = self._get_value_pool("address", pool_size)
                 return self._sample_from_pool(pool, row_count)
             if "phone" in col.name.lower():
-                pool = self._generate_string_pool(self.fake.phone_number, pool_size)
+                pool = self._get_value_pool("phone_number", pool_size)
                 return self._sample_from_pool(pool, row_count)
-            pool = self._generate_string_pool(self.fake.word, pool_size)
+            pool = self._get_value_pool("word", pool_size)
             return self._sample_from_pool(pool, row_count)
 
         elif col.datatype == "integer":
@@ -193,59 +459,42 @@ class DatasetGenerator:
             return vals
 
         elif col.datatype == "date" or col.datatype == "datetime":
-            start_date = pd.Timestamp(schema.date_range_start)
-            end_date = pd.Timestamp(schema.date_range_end)
-            delta_days = (end_date - start_date).days
-
-            # Vectorized date generation using pandas
-            random_days = np.random.randint(0, delta_days + 1, row_count)
-            dates = start_date + pd.to_timedelta(random_days, unit='D')
-
-            if col.datatype == "date":
-                return dates.date
-            return dates.to_numpy()
+            # Fact table dates follow the KPI trend, seasonality and event dips (see time_shaping);
+            # dimension dates such as signup dates stay uniform. Dates stay datetime64 (midnight)
+            # in memory; writers store them as calendar dates
+            if table_def is not None and self._is_fact_table(table_def.name, schema):
+                return sample_dates(schema, row_count, table_def)
+            return uniform_dates(schema, row_count)
 
         elif col.datatype == "category" or col.datatype == "boolean":
             choices = col.allowed_values or [True, False]
+            probs = None
             # Use non-uniform distribution for realism
             if len(choices) > 1:
                 # Pareto-like: first few choices are more common
                 weights = [1.0 / (i + 1) for i in range(len(choices))]
                 total_weight = sum(weights)
                 probs = [w / total_weight for w in weights]
-                return np.random.choice(choices, size=row_count, p=probs)
-            return np.random.choice(choices, size=row_count)
+
+            if CATEGORICAL_STRING_COLUMNS and col.datatype == "category" and col.allowed_values:
+                codes = np.random.choice(len(choices), size=row_count, p=probs)
+                return self._categorical_from_choices(choices, codes)
+            return np.random.choice(choices, size=row_count, p=probs)
 
         return np.array([None] * row_count)
 
-    def _apply_business_rules(self, schema: Schema):
-        """Apply cross-column and cross-table business logic."""
+    def _apply_business_rules(self, schema: Schema, data: Dict[str, pd.DataFrame],
+                              parents: Optional[Dict[str, pd.DataFrame]] = None):
+        """Apply cross-column and cross-table business logic (parents: read-only tables formulas may join)."""
+        # Calculated fields are compiled and evaluated together, in dependency order
+        apply_calculated_fields(schema, data, parents, self.calculated_fields)
+
         for rule in schema.business_rules:
-            if rule.rule_type == "calculated_field":
-                self._apply_calculation_rule(rule)
-            elif rule.rule_type == "status_transition":
+            if rule.rule_type == "status_transition":
                 self._apply_status_rule(rule)
                 
         # Apply event impacts
-        self._apply_event_impacts(schema)
-
-    def _apply_calculation_rule(self, rule: BusinessRule):
-        """Handle rules like 'total = quantity * unit_price'."""
-        target_table = rule.parameters.get("table")
-        if target_table not in self.generated_data:
-            return
-            
-        df = self.generated_data[target_table]
-        formula = rule.parameters.get("formula") # e.g. "total_amount = quantity * unit_price"
-        
-        try:
-            target_col, expr = formula.split('=')
-            target_col = target_col.strip()
-            # This is a very simple parser, in production we might use something more robust
-            # But for educational datasets, simple math is usually enough
-            df[target_col] = df.eval(expr.strip())
-        except Exception as e:
-            logger.warning(f"Failed to apply calculation rule: {rule.description}. Error: {e}")
+        self._apply_event_impacts(schema, data)
 
     def _apply_status_rule(self, rule: BusinessRule):
         """Handle status transitions (placeholders for now)."""
@@ -253,52 +502,51 @@ class DatasetGenerator:
         # For simplicity in Phase 1, we ensure random statuses match allowed values
         pass
 
-    def _apply_event_impacts(self, schema: Schema):
-        """Modify data to reflect historical events like COVID."""
-        for impact in schema.event_impacts:
-            start_date = datetime.strptime(impact.start_date, "%Y-%m-%d").date()
-            end_date = datetime.strptime(impact.end_date, "%Y-%m-%d").date()
-            magnitude = impact.impact_magnitude
-            
-            for table_name, df in self.generated_data.items():
-                # Find date column
-                date_cols = [c for c in df.columns if 'date' in c.lower()]
-                if not date_cols:
-                    continue
-                    
-                date_col = date_cols[0]
-                mask = (df[date_col] >= start_date) & (df[date_col] <= end_date)
-                
-                for metric in impact.affected_metrics:
-                    if metric in df.columns:
-                        # Apply impact
-                        df.loc[mask, metric] = df.loc[mask, metric] * (1 + magnitude)
+    def _apply_event_impacts(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+        """Modify data to reflect historical events like COVID (see event_impacts)."""
+        if not schema.event_impacts:
+            return
+        for df in data.values():
+            apply_event_impacts(df, schema.event_impacts)
 
-    def _inject_quality_issues(self, schema: Schema):
-        """Inject intentional data quality issues for learning."""
-        for table_name, df in self.generated_data.items():
+    def _inject_quality_issues(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+        """
+        Inject intentional data quality issues for learning.
+
+        Nulls go into the existing column buffers where the dtype can hold them;
+        integer and boolean columns become nullable (the values are kept, plus a
+        validity mask) instead of being upcast to float/object. Duplicates are not
+        appended: their source row positions are recorded in self.duplicate_rows
+        and the writers emit them at write time.
+        """
+        for table_name, df in data.items():
             # 1. Missing values
-            cols_to_null = [c for c in df.columns if c != next(t.primary_key for t in schema.tables if t.name == table_name)]
-            for col in cols_to_null:
-                mask = np.random.random(len(df)) < INTENTIONAL_MISSING_VALUES_PCT
-                if df[col].dtype == bool:
-                    df[col] = df[col].astype(object)
-                df.loc[mask, col] = np.nan
-                
+            row_count = len(df)
+            primary_key = next(t.primary_key for t in schema.tables if t.name == table_name)
+            for col in df.columns:
+                if col == primary_key:
+                    continue
+                n_nulls = np.random.binomial(row_count, INTENTIONAL_MISSING_VALUES_PCT)
+                if n_nulls:
+                    _set_nulls(df, col, np.unique(np.random.randint(0, row_count, n_nulls)))
+
             # 2. Duplicates
-            if len(df) > 100:
-                n_dups = int(len(df) * INTENTIONAL_DUPLICATES_PCT)
-                dup_indices = np.random.choice(df.index, size=n_dups)
-                dups = df.loc[dup_indices].copy()
-                # Append duplicates
-                self.generated_data[table_name] = pd.concat([df, dups]).reset_index(drop=True)
+            if row_count > 100:
+                n_dups = int(row_count * INTENTIONAL_DUPLICATES_PCT)
+                self.duplicate_rows[table_name] = np.sort(np.random.randint(0, row_count, n_dups))
 
             # 3. Format inconsistencies (dates or strings)
             # Placeholder: In production, we'd change format of some values
 
-    def save_to_disk(self, output_dir: Path):
-        """Save generated dataframes to CSV files."""
+    def save_to_disk(self, output_dir: Path, fmt: str = OUTPUT_FORMAT,
+                     compression: Optional[str] = OUTPUT_COMPRESSION) -> Dict[str, Path]:
+        """Save generated dataframes (plus their intentional duplicate rows) as CSV, Parquet or Feather files."""
         output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {}
         for table_name, df in self.generated_data.items():
-            df.to_csv(output_dir / f"{table_name}.csv", index=False)
-            logger.info(f"Saved {table_name}.csv to {output_dir}")
+            with get_writer(output_dir, table_name, fmt, compression,
+                            self.date_columns.get(table_name, ())) as writer:
+                writer.write(df, self.duplicate_rows.get(table_name))
+            paths[table_name] = writer.path
+            logger.info(f"Saved {writer.path.name} to {output_dir}")
+        return paths
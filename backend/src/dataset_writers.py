@@ -0,0 +1,270 @@
+"""
+Pluggable output formats for generated datasets (CSV, Parquet, Feather/Arrow IPC).
+"""
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Type
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetWriter(ABC):
+    """Writes one table to disk, either in a single call or chunk by chunk."""
+
+    format_name: str = ""
+    extension: str = ""
+    compressions: List[Optional[str]] = [None]
+
+    def __init__(self, output_dir: Path, table_name: str, compression: Optional[str] = None,
+                 date_columns: Sequence[str] = ()):
+        self.compression = compression
+        self.date_columns = list(date_columns)  # datetime64 columns stored as calendar dates
+        self.path = output_dir / f"{table_name}{self._extension()}"
+        self.schema: Optional[pa.Schema] = None
+
+    def write(self, df: pd.DataFrame, duplicate_rows: Optional[np.ndarray] = None):
+        """
+        Append a DataFrame; every chunk after the first is cast to the first chunk's schema.
+
+        The rows at positions duplicate_rows are written a second time after the
+        chunk (intentional duplicates that are not materialized in memory).
+        """
+        table = self._prepare(self._cast_dates(pa.Table.from_pandas(df, preserve_index=False)))
+        if self.schema is None:
+            self.schema = table.schema
+            self._open(self.schema)
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+        self._write_table(table)
+        if duplicate_rows is not None and len(duplicate_rows):
+            self._write_table(table.take(pa.array(duplicate_rows)))
+
+    def close(self):
+        if self.schema is not None:
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _extension(self) -> str:
+        return self.extension
+
+    def _cast_dates(self, table: pa.Table) -> pa.Table:
+        """Store date columns, held in memory as midnight timestamps, as date32."""
+        for name in self.date_columns:
+            i = table.schema.get_field_index(name)
+            if i >= 0 and pa.types.is_timestamp(table.schema.field(i).type):
+                table = table.set_column(i, name, pc.cast(table.column(i), pa.date32()))
+        return table
+
+    def _prepare(self, table: pa.Table) -> pa.Table:
+        """Widen dictionary indices so chunks with different category counts share one schema."""
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type) and field.type.index_type != pa.int32():
+                target = pa.dictionary(pa.int32(), field.type.value_type)
+                table = table.set_column(i, field.name, table.column(i).cast(target))
+        return table
+
+    @abstractmethod
+    def _open(self, schema: pa.Schema):
+        pass
+
+    @abstractmethod
+    def _write_table(self, table: pa.Table):
+        pass
+
+    @abstractmethod
+    def _close(self):
+        pass
+
+
+class CSVDatasetWriter(DatasetWriter):
+    """CSV through Arrow's multithreaded writer, optionally gzip-compressed."""
+
+    format_name = "csv"
+    extension = ".csv"
+    compressions = [None, "gzip"]
+
+    def _extension(self) -> str:
+        return ".csv.gz" if self.compression == "gzip" else ".csv"
+
+    def _prepare(self, table: pa.Table) -> pa.Table:
+        # CSV holds plain values: decode dictionaries and drop sub-second timestamp noise.
+        # Timestamps that are all at midnight are written as dates, as pandas' to_csv does;
+        # the first chunk decides, later chunks follow the file's schema
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+            elif pa.types.is_timestamp(field.type):
+                seconds = pc.cast(table.column(i), pa.timestamp("s", tz=field.type.tz), safe=False)
+                if self._as_dates(field.name, seconds):
+                    seconds = pc.cast(seconds, pa.date32(), safe=False)
+                table = table.set_column(i, field.name, seconds)
+        return table
+
+    def _as_dates(self, name: str, column: pa.ChunkedArray) -> bool:
+        if self.schema is not None:
+            as_dates = pa.types.is_date32(self.schema.field(name).type)
+            if as_dates and not _at_midnight(column):
+                logger.warning(f"{self.path.name}: times in column {name} dropped; earlier rows were written as dates")
+            return as_dates
+        return column.type.tz is None and _at_midnight(column)
+
+    def _open(self, schema: pa.Schema):
+        if self.compression:
+            self._sink = pa.CompressedOutputStream(str(self.path), self.compression)
+        else:
+            self._sink = pa.OSFile(str(self.path), "wb")
+        self._writer = pa_csv.CSVWriter(self._sink, schema)
+
+    def _write_table(self, table: pa.Table):
+        self._writer.write_table(table)
+
+    def _close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+def _at_midnight(column: pa.ChunkedArray) -> bool:
+    """Whether every non-null timestamp falls on midnight."""
+    dates = pc.cast(pc.cast(column, pa.date32(), safe=False), column.type)
+    return pc.all(pc.equal(dates, column)).as_py() is not False
+
+
+class ParquetDatasetWriter(DatasetWriter):
+    """Columnar Parquet; categorical columns stay dictionary-encoded."""
+
+    format_name = "parquet"
+    extension = ".parquet"
+    compressions = [None, "snappy", "zstd", "gzip", "brotli", "lz4"]
+
+    def _open(self, schema: pa.Schema):
+        self._writer = pq.ParquetWriter(str(self.path), schema, compression=self.compression or "none")
+
+    def _write_table(self, table: pa.Table):
+        self._writer.write_table(table)
+
+    def _close(self):
+        self._writer.close()
+
+
+class FeatherDatasetWriter(DatasetWriter):
+    """
+    Feather v2 / Arrow IPC file format.
+
+    An IPC file holds one dictionary per column, which may only grow by deltas.
+    Streamed chunks sample categories from different value pools, so each chunk's
+    dictionary column is re-encoded against the file's dictionary, appending the
+    values it has not seen yet.
+    """
+
+    format_name = "feather"
+    extension = ".feather"
+    compressions = [None, "lz4", "zstd"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dictionaries: Dict[str, pa.Array] = {}  # Column -> dictionary written so far
+
+    def _prepare(self, table: pa.Table) -> pa.Table:
+        table = super()._prepare(table)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, self._extend_dictionary(field.name, table.column(i)))
+        return table
+
+    def _extend_dictionary(self, name: str, column: pa.ChunkedArray) -> pa.Array:
+        """Encode a dictionary column against the file's dictionary for that column, extended as needed."""
+        chunk = column.unify_dictionaries().combine_chunks()
+        known = self._dictionaries.get(name)
+        if known is None:
+            dictionary = chunk.dictionary
+        else:
+            unseen = chunk.dictionary.filter(pc.invert(pc.is_in(chunk.dictionary, value_set=known)))
+            dictionary = pa.concat_arrays([known, unseen.cast(known.type)])
+        self._dictionaries[name] = dictionary
+        indices = pc.index_in(chunk.dictionary, value_set=dictionary).take(chunk.indices)
+        return pa.DictionaryArray.from_arrays(indices.cast(chunk.indices.type), dictionary)
+
+    def _open(self, schema: pa.Schema):
+        options = pa.ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+        self._writer = pa.ipc.new_file(str(self.path), schema, options=options)
+
+    def _write_table(self, table: pa.Table):
+        self._writer.write_table(table)
+
+    def _close(self):
+        self._writer.close()
+
+
+WRITERS: Dict[str, Type[DatasetWriter]] = {
+    "csv": CSVDatasetWriter,
+    "parquet": ParquetDatasetWriter,
+    "feather": FeatherDatasetWriter,
+}
+
+# Every file suffix a writer can produce, for finding dataset files on disk
+DATASET_SUFFIXES = (".csv", ".csv.gz", ".parquet", ".feather")
+
+
+def get_writer(output_dir: Path, table_name: str, fmt: str = "csv",
+               compression: Optional[str] = None, date_columns: Sequence[str] = ()) -> DatasetWriter:
+    """Create the writer for an output format; raises ValueError for unknown formats or codecs."""
+    validate_output_options(fmt, compression)
+    return WRITERS[fmt](output_dir, table_name, compression, date_columns)
+
+
+def validate_output_options(fmt: str, compression: Optional[str] = None):
+    """Raise ValueError if the format/compression combination is not supported."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported output format '{fmt}'. Choose from: {', '.join(WRITERS)}")
+    if compression not in WRITERS[fmt].compressions:
+        supported = ", ".join(c for c in WRITERS[fmt].compressions if c)
+        raise ValueError(f"Compression '{compression}' is not supported for {fmt} output (supported: {supported})")
+
+
+def list_dataset_files(datasets_dir: Path) -> List[Path]:
+    """All dataset files in a directory, whatever format they were written in."""
+    if not datasets_dir.exists():
+        return []
+    return sorted(p for p in datasets_dir.iterdir() if p.is_file() and p.name.endswith(DATASET_SUFFIXES))
+
+
+def read_dataset_head(path: Path, max_rows: int) -> pd.DataFrame:
+    """
+    The first max_rows rows of a dataset file written by one of the writers.
+
+    Only the record batches covering those rows are read, so a streamed dataset
+    can be inspected without loading it whole. Dates come back as datetime64.
+    """
+    name = path.name
+    if name.endswith(".parquet"):
+        batches = pq.ParquetFile(path).iter_batches()
+    elif name.endswith(".feather"):
+        reader = pa.ipc.open_file(path)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        # Decompresses .csv.gz by extension; empty fields are the nulls the CSV writer emits
+        batches = pa_csv.open_csv(path, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+
+    collected, rows = [], 0
+    for batch in batches:
+        if rows >= max_rows:
+            break
+        collected.append(batch)
+        rows += batch.num_rows
+    if not collected:
+        return pd.DataFrame()
+    table = pa.Table.from_batches(collected).slice(0, max_rows)
+    return table.to_pandas(date_as_object=False)
@@ -0,0 +1,90 @@
+"""
+Vectorized event-impact engine.
+
+A table's date column is converted to integer day offsets once. Every impact is
+laid onto a per-day multiplier curve spanning the table's dates (overlapping
+impacts multiply), and each affected metric is scaled by one gather from its
+curve and one multiply, regardless of how many impacts touch it.
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_integer_dtype, is_numeric_dtype
+
+from models import EventImpact
+
+logger = logging.getLogger(__name__)
+
+
+def day_offsets(dates: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Days since the epoch (int64) and a validity mask; unparseable dates are invalid."""
+    values = dates.to_numpy()
+    if values.dtype.kind != "M":
+        values = pd.to_datetime(dates, errors="coerce").to_numpy()
+    days = values.astype("datetime64[D]")
+    return days.view("int64"), ~np.isnat(days)
+
+
+def _to_day(date: str) -> int:
+    return int(np.datetime64(date, "D").view("int64"))
+
+
+def impact_curve(impacts: List[EventImpact], first_day: int, last_day: int) -> np.ndarray:
+    """Multiplier for each day in [first_day, last_day] combining all impacts."""
+    curve = np.ones(last_day - first_day + 1)
+    for impact in impacts:
+        start, end = _to_day(impact.start_date), _to_day(impact.end_date)
+        lo, hi = max(start, first_day), min(end, last_day)
+        if lo > hi:
+            continue
+        days = np.arange(lo, hi + 1)
+        # Share of the full magnitude on each day: ramps up after start and down before end
+        weight = np.ones(len(days))
+        if impact.ramp_in_days > 0:
+            weight = np.minimum(weight, (days - start + 1) / impact.ramp_in_days)
+        if impact.ramp_out_days > 0:
+            weight = np.minimum(weight, (end - days + 1) / impact.ramp_out_days)
+        curve[lo - first_day:hi - first_day + 1] *= 1 + impact.impact_magnitude * weight
+    return curve
+
+
+def apply_event_impacts(df: pd.DataFrame, impacts: List[EventImpact], date_col: Optional[str] = None):
+    """
+    Scale the affected metrics of df in place by all impacts overlapping each row's date.
+
+    date_col defaults to the first column with "date" in its name. Rows without a
+    valid date are left unchanged; integer metrics are rounded back to their dtype.
+    """
+    if date_col is None:
+        date_col = next((c for c in df.columns if 'date' in c.lower()), None)
+    impacts_by_metric: Dict[str, List[EventImpact]] = {}
+    for impact in impacts:
+        for metric in impact.affected_metrics:
+            if metric in df.columns and is_numeric_dtype(df[metric]) and df[metric].dtype != bool:
+                impacts_by_metric.setdefault(metric, []).append(impact)
+    if date_col is None or not impacts_by_metric:
+        return
+
+    days, valid = day_offsets(df[date_col])
+    if not valid.any():
+        return
+    first_day, last_day = int(days[valid].min()), int(days[valid].max())
+    positions = np.where(valid, days - first_day, 0)
+
+    # Metrics hit by the same set of impacts share one row multiplier
+    multipliers: Dict[Tuple[int, ...], np.ndarray] = {}
+    for metric, metric_impacts in impacts_by_metric.items():
+        key = tuple(id(impact) for impact in metric_impacts)
+        if key not in multipliers:
+            multiplier = impact_curve(metric_impacts, first_day, last_day)[positions]
+            multiplier[~valid] = 1.0
+            multipliers[key] = multiplier
+        scaled = df[metric].to_numpy(dtype=float, na_value=np.nan) * multipliers[key]
+        if is_integer_dtype(df[metric].dtype):
+            if df[metric].isna().any():
+                scaled = pd.array(np.rint(scaled), dtype="Float64").astype(df[metric].dtype)
+            else:
+                scaled = np.rint(scaled).astype(df[metric].dtype)
+        df[metric] = scaled
@@ -1,136 +1,314 @@
 
 import logging
+import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.chart import BarChart, LineChart, PieChart, Reference, Series
-from openpyxl.drawing.image import Image
+from openpyxl.chart import BarChart, LineChart, Reference
 
-from models import QAResults, ChallengeInput, ProblemStatement
+from models import QAResults, ProblemStatement, Schema, KPIDefinition, TableDefinition
 
 logger = logging.getLogger(__name__)
 
+ANSWER_MAX_ROWS = 15  # Groups shown per category breakdown (time breakdowns show every month)
+TIME_KEYWORDS = ("trend", "month", "year", "over time", "growth", "decline", "season", "since", "period")
+DATA_START_ROW = 17
+
+
 class SolutionExcelGenerator:
-    """Generate Excel solution files with embedded charts and SQL logic."""
+    """
+    Generate Excel solution files with embedded charts and SQL logic.
+
+    Each question sheet holds a real answer table: the KPI's measure aggregated from
+    the generated data by the dimension (or month) the question is about. The workbook
+    is written in openpyxl's write-only mode, so rows are streamed to disk instead of
+    being held as cell objects.
+    """
 
     def __init__(self, output_path: Path):
         self.output_path = output_path
 
-    def generate(self, qa_results: QAResults, problem_statement: ProblemStatement, data: Dict[str, pd.DataFrame]):
-        """Generate the comprehensive solution Excel file."""
+    def generate(self, qa_results: QAResults, problem_statement: ProblemStatement, data: Dict[str, pd.DataFrame],
+                 schema: Optional[Schema] = None, duplicate_rows: Optional[Dict[str, np.ndarray]] = None,
+                 head_rows: Optional[int] = None):
+        """
+        Generate the comprehensive solution Excel file.
+
+        duplicate_rows holds the row positions per table that the writers emit a
+        second time, so answers aggregate the tables as they are written. head_rows
+        is set when data holds only the leading rows of each (streamed) table; the
+        answers then say so.
+        """
+        duplicate_rows = duplicate_rows or {}
         logger.info("Generating Excel solution file...")
-        
-        wb = Workbook()
-        
+
+        wb = Workbook(write_only=True)
+
         # 1. Overview Sheet
         self._create_overview_sheet(wb, problem_statement)
-        
+
         # 2. Question Sheets (One per question)
         for i, question in enumerate(problem_statement.analytical_questions, 1):
-            sheet_name = f"Q{i} - Analysis"
             ws = wb.create_sheet(title=f"Q{i}")
-            
-            # Simulated analysis logic (in production this would come from an AI analyst agent)
-            # For now, we generate template structure and placeholder data/charts
-            self._create_question_sheet(ws, i, question, data)
-
-        # Remove default sheet if empty
-        if "Sheet" in wb.sheetnames:
-            wb.remove(wb["Sheet"])
+            answer = (self._answer_question(question, schema.kpis, i - 1, schema, data, duplicate_rows)
+                      if schema else None)
+            if answer and head_rows:
+                answer["approach"] += f" Computed from the first {head_rows:,} rows of each table."
+            self._create_question_sheet(ws, i, question, answer)
 
         wb.save(self.output_path)
         logger.info(f"Excel solution saved to {self.output_path}")
 
+    def _cell(self, ws, value: Any, **style) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        for name, setting in style.items():
+            setattr(cell, name, setting)
+        return cell
+
+    def _write_rows(self, ws, rows: Dict[int, List[Any]]):
+        """Stream rows (1-based row number -> cells from column B) in order, padding gaps."""
+        current = 0
+        for row_num in sorted(rows):
+            while current < row_num - 1:
+                ws.append([])
+                current += 1
+            ws.append([None] + rows[row_num])
+            current += 1
+
     def _create_overview_sheet(self, wb: Workbook, problem: ProblemStatement):
         """Create the cover sheet with problem context."""
-        ws = wb.active
-        ws.title = "Overview"
-        
-        # Title
-        ws["B2"] = problem.title
-        ws["B2"].font = Font(size=20, bold=True, color="3B82F6")
-        
-        # Company Info
-        ws["B4"] = f"Company: {problem.company_name}"
-        ws["B5"] = f"Generated: {problem.generated_at.strftime('%Y-%m-%d')}"
-        
-        # Problem Statement
-        ws["B7"] = "Problem Statement:"
-        ws["B7"].font = Font(bold=True)
-        ws["B8"] = problem.statement
-        ws["B8"].alignment = Alignment(wrap_text=True, vertical="top")
-        ws.merge_cells("B8:H20")
-        
-        # Disclaimer
-        ws["B22"] = "This solution file contains analysis approach, SQL queries, and visual insights for each business question."
-        ws["B22"].font = Font(italic=True, color="666666")
-
-        # Column widths
+        ws = wb.create_sheet(title="Overview")
+
+        # Column widths and merges must be set before rows are streamed
         ws.column_dimensions["A"].width = 2
         ws.column_dimensions["B"].width = 15
         ws.column_dimensions["C"].width = 60
+        ws.merged_cells.add("B8:H20")
 
-    def _create_question_sheet(self, ws, q_num: int, question: str, data: Dict[str, pd.DataFrame]):
+        self._write_rows(ws, {
+            # Title
+            2: [self._cell(ws, problem.title, font=Font(size=20, bold=True, color="3B82F6"))],
+            # Company Info
+            4: [f"Company: {problem.company_name}"],
+            5: [f"Generated: {problem.generated_at.strftime('%Y-%m-%d')}"],
+            # Problem Statement
+            7: [self._cell(ws, "Problem Statement:", font=Font(bold=True))],
+            8: [self._cell(ws, problem.statement, alignment=Alignment(wrap_text=True, vertical="top"))],
+            # Disclaimer
+            22: [self._cell(ws, "This solution file contains analysis approach, SQL queries, and visual insights "
+                                "for each business question.", font=Font(italic=True, color="666666"))],
+        })
+
+    def _create_question_sheet(self, ws, q_num: int, question: str, answer: Optional[Dict[str, Any]]):
         """Create a detailed analysis sheet for a single question."""
-        
-        # Header
-        ws["B2"] = f"Question {q_num}: {question}"
-        ws["B2"].font = Font(size=14, bold=True, color="20C997")
-        ws.merge_cells("B2:K2")
-        
-        # Sections
+        if answer is None:
+            answer = {
+                "approach": "No numeric measure in the dataset matches this question; "
+                            "answer it from the record-level data.",
+                "sql": "-- No aggregate query could be derived from the schema",
+                "findings": [],
+                "table": None,
+            }
+
         sections = [
-            ("Analysis Approach", 4, "Identify key metrics and group by relevant dimensions."),
-            ("SQL Query Logic", 8, "SELECT dimension, SUM(metric) FROM table GROUP BY dimension"),
-            ("Key Findings", 12, "• Trend indicates positive growth.\n• Segment A outperforms Segment B.")
+            ("Analysis Approach", 4, answer["approach"]),
+            ("SQL Query Logic", 8, answer["sql"]),
+            ("Key Findings", 12, "\n".join(answer["findings"]) or "No supporting data."),
         ]
-        
+
+        ws.column_dimensions["B"].width = 24
+        ws.column_dimensions["C"].width = 18
+        ws.column_dimensions["D"].width = 18
+        ws.merged_cells.add("B2:K2")
+        for _, row, _ in sections:
+            ws.merged_cells.add(f"B{row+1}:H{row+2}")
+
+        # Header
+        rows = {2: [self._cell(ws, f"Question {q_num}: {question}", font=Font(size=14, bold=True, color="20C997"))]}
+
+        # Sections
+        section_fill = PatternFill(start_color="F3F4F6", end_color="F3F4F6", fill_type="solid")
         for title, row, content in sections:
-            cell = ws.cell(row=row, column=2, value=title)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="F3F4F6", end_color="F3F4F6", fill_type="solid")
-            
-            content_cell = ws.cell(row=row+1, column=2, value=content)
-            content_cell.alignment = Alignment(wrap_text=True)
-            ws.merge_cells(f"B{row+1}:H{row+2}")
+            rows[row] = [self._cell(ws, title, font=Font(bold=True), fill=section_fill)]
+            rows[row + 1] = [self._cell(ws, content, alignment=Alignment(wrap_text=True, vertical="top"))]
 
         # Data Table & Chart Area
-        ws["B16"] = "Supporting Data"
-        ws["B16"].font = Font(bold=True)
-        
-        # Generate dummy data for the chart since we don't have real query execution yet
-        # Uses the first available numeric column from the first dataframe for demo purposes
-        dummy_data = {
-            "Category": ["A", "B", "C", "D"],
-            "Value": [10, 25, 15, 30]
-        }
-        df = pd.DataFrame(dummy_data)
-        
-        # Write dataframe to sheet
-        rows = dataframe_to_rows(df, index=False, header=True)
-        start_row = 17
-        for r_idx, row in enumerate(rows, 1):
-            for c_idx, value in enumerate(row, 1):
-                cell = ws.cell(row=start_row + r_idx - 1, column=1 + c_idx, value=value)
-                if r_idx == 1:
-                    cell.font = Font(bold=True)
-                    cell.border = Border(bottom=Side(style="thin"))
-
-        # Create Chart
-        chart = BarChart()
-        chart.type = "col"
+        rows[DATA_START_ROW - 1] = [self._cell(ws, "Supporting Data", font=Font(bold=True))]
+
+        table = answer["table"]
+        if table is not None:
+            header_border = Border(bottom=Side(style="thin"))
+            rows[DATA_START_ROW] = [self._cell(ws, col, font=Font(bold=True), border=header_border)
+                                    for col in table.columns]
+            for offset, values in enumerate(table.itertuples(index=False, name=None), 1):
+                cells = [values[0]]
+                for col, value in zip(table.columns[1:], values[1:]):
+                    cells.append(self._cell(ws, value, number_format="#,##0" if col == "Records" else "#,##0.00"))
+                rows[DATA_START_ROW + offset] = cells
+            ws.add_chart(self._answer_chart(ws, answer, len(table)), f"G{DATA_START_ROW}")
+
+        self._write_rows(ws, rows)
+
+    def _answer_chart(self, ws, answer: Dict[str, Any], n_rows: int):
+        """Chart of the answer table's first measure column (column C) against its labels (column B)."""
+        if answer["time"]:
+            chart = LineChart()
+            chart.x_axis.title = "Month"
+        else:
+            chart = BarChart()
+            chart.type = "col"
+            chart.x_axis.title = answer["dimension"]
         chart.style = 10
         chart.title = "Analysis Visualization"
-        chart.y_axis.title = "Metric Value"
-        chart.x_axis.title = "Dimension"
+        chart.y_axis.title = answer["measure"]
 
-        data_ref = Reference(ws, min_col=3, min_row=17, max_row=17+len(df), max_col=3)
-        cats_ref = Reference(ws, min_col=2, min_row=18, max_row=17+len(df))
-        
+        data_ref = Reference(ws, min_col=3, min_row=DATA_START_ROW, max_row=DATA_START_ROW + n_rows, max_col=3)
+        cats_ref = Reference(ws, min_col=2, min_row=DATA_START_ROW + 1, max_row=DATA_START_ROW + n_rows)
         chart.add_data(data_ref, titles_from_data=True)
         chart.set_categories(cats_ref)
-        
-        ws.add_chart(chart, "F17") # Place chart next to data table
+        chart.width, chart.height = 18, 9
+        return chart
+
+    def _answer_question(self, question: str, kpis: List[KPIDefinition], kpi_index: int, schema: Schema,
+                         data: Dict[str, pd.DataFrame],
+                         duplicate_rows: Optional[Dict[str, np.ndarray]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate a KPI's measure by the dimension the question asks about.
+
+        The measure is the numeric column named in the question, else in the formula of
+        the question's KPI (assigned round-robin), else the first numeric column of the
+        largest table. The dimension is a category column of that table or of a parent
+        table reached through its FK, or the month of its date column when the question
+        is about a trend. Rows listed in duplicate_rows are counted twice, as in the
+        written files.
+        """
+        question_text = question.lower()
+        measures = [(table_def, col.name) for table_def in schema.tables if table_def.name in data
+                    for col in table_def.columns if self._is_measure(col.name, col.datatype, table_def, schema)]
+        if not measures:
+            return None
+
+        kpi = kpis[kpi_index % len(kpis)] if kpis else None
+        asked = [m for m in measures if self._mentioned(m[1], question_text)]
+        if asked:
+            # Prefer a KPI built on the measure the question names
+            kpi = next((k for k in kpis if self._mentioned(asked[0][1], k.formula.lower())), kpi)
+        text = f"{question_text} {kpi.formula.lower() if kpi else ''}"
+        mentioned = asked or [m for m in measures if self._mentioned(m[1], text)]
+        if mentioned:
+            table_def, measure = mentioned[0]
+        else:
+            table_def, measure = max(measures, key=lambda m: len(data[m[0].name]))
+        df = data[table_def.name]
+        values = pd.to_numeric(df[measure], errors="coerce")
+
+        date_cols = [c.name for c in table_def.columns if c.datatype in ("date", "datetime")]
+        use_time = bool(date_cols) and any(k in text for k in TIME_KEYWORDS)
+        if use_time:
+            date_col = next((c for c in date_cols if self._mentioned(c, text)), date_cols[0])
+            keys = pd.to_datetime(df[date_col], errors="coerce").dt.to_period("M")
+            dimension, source, join = "Month", f"DATE_TRUNC('month', t.{date_col})", ""
+        else:
+            found = self._find_dimension(table_def, schema, data, text)
+            if found is None:
+                return None
+            dimension, keys, source, join = found
+
+        dups = (duplicate_rows or {}).get(table_def.name)
+        if dups is not None and len(dups):
+            values = pd.concat([values, values.iloc[dups]], ignore_index=True)
+            keys = pd.concat([keys, keys.iloc[dups]], ignore_index=True)
+
+        grouped = values.groupby(keys, observed=True, sort=use_time).agg(["sum", "mean", "count"])
+        grouped = grouped[grouped["count"] > 0]
+        if grouped.empty:
+            return None
+        if not use_time:
+            grouped = grouped.sort_values("sum", ascending=False)
+        grouped.index = grouped.index.astype(str)
+        table = pd.DataFrame({
+            dimension: grouped.index,
+            f"Total {measure}": grouped["sum"].to_numpy(),
+            f"Average {measure}": grouped["mean"].to_numpy(),
+            "Records": grouped["count"].to_numpy(),
+        })
+
+        sql = (f"SELECT {source} AS {dimension.lower().replace('.', '_')},\n"
+               f"       SUM(t.{measure}) AS total_{measure}, AVG(t.{measure}) AS avg_{measure}, "
+               f"COUNT(t.{measure}) AS records\n"
+               f"FROM {table_def.name} t{join}\n"
+               f"GROUP BY 1\n"
+               f"ORDER BY {'1' if use_time else f'total_{measure} DESC'}")
+        kpi_note = f" for the KPI '{kpi.name}' ({kpi.formula})" if kpi else ""
+        approach = (f"Aggregate {table_def.name}.{measure}{kpi_note} by "
+                    f"{'month' if use_time else dimension}, comparing totals, averages and record counts.")
+
+        return {
+            "approach": approach,
+            "sql": sql,
+            "findings": self._findings(table, measure, use_time),
+            "table": table if use_time else table.head(ANSWER_MAX_ROWS),
+            "dimension": dimension,
+            "measure": f"Total {measure}",
+            "time": use_time,
+        }
+
+    def _is_measure(self, name: str, datatype: str, table_def: TableDefinition, schema: Schema) -> bool:
+        if datatype not in ("integer", "float") or name == table_def.primary_key or name.lower().endswith("_id"):
+            return False
+        return not any(fk.child_table == table_def.name and fk.child_column == name for fk in schema.relationships)
+
+    def _mentioned(self, column: str, text: str) -> bool:
+        name = column.lower()
+        return re.search(rf"\b{re.escape(name)}\b", text) is not None or name.replace("_", " ") in text
+
+    def _find_dimension(self, table_def: TableDefinition, schema: Schema, data: Dict[str, pd.DataFrame],
+                        text: str) -> Optional[Tuple[str, pd.Series, str, str]]:
+        """(label, per-row group keys, SQL expression, SQL join) for the best grouping column."""
+        df = data[table_def.name]
+        candidates = [(col.name, None) for col in table_def.columns if self._is_dimension(col)]
+        for fk in schema.relationships:
+            parent_def = next((t for t in schema.tables if t.name == fk.parent_table), None)
+            if fk.child_table != table_def.name or parent_def is None or fk.parent_table not in data:
+                continue
+            candidates.extend((col.name, fk) for col in parent_def.columns if self._is_dimension(col))
+        if not candidates:
+            return None
+
+        name, fk = next((c for c in candidates if self._mentioned(c[0], text)), candidates[0])
+        if fk is None:
+            return name, df[name], f"t.{name}", ""
+
+        # Map each row's FK value to the parent's column (map needs unique keys; injected nulls repeat)
+        parent = data[fk.parent_table].drop_duplicates(subset=fk.parent_column)
+        lookup = pd.Series(parent[name].to_numpy(), index=parent[fk.parent_column].to_numpy())
+        join = f"\nJOIN {fk.parent_table} p ON t.{fk.child_column} = p.{fk.parent_column}"
+        return f"{fk.parent_table}.{name}", df[fk.child_column].map(lookup), f"p.{name}", join
+
+    def _is_dimension(self, col) -> bool:
+        return col.datatype in ("category", "boolean") or (col.datatype == "string" and bool(col.allowed_values))
+
+    def _findings(self, table: pd.DataFrame, measure: str, use_time: bool) -> List[str]:
+        labels, totals, averages = table.iloc[:, 0], table.iloc[:, 1], table.iloc[:, 2]
+        if use_time:
+            findings = [f"• Monthly total {measure} went from {totals.iloc[0]:,.0f} ({labels.iloc[0]}) to "
+                        f"{totals.iloc[-1]:,.0f} ({labels.iloc[-1]})."]
+            if totals.iloc[0]:
+                findings.append(f"• That is a {totals.iloc[-1] / totals.iloc[0] - 1:+.1%} change over the period.")
+            peak = totals.idxmax()
+            findings.append(f"• Peak month: {labels[peak]} with {totals[peak]:,.0f}.")
+            return findings
+
+        grand_total = totals.sum()
+        findings = []
+        if grand_total:
+            findings.append(f"• {labels.iloc[0]} leads with {totals.iloc[0] / grand_total:.1%} of total {measure} "
+                            f"({totals.iloc[0]:,.0f}).")
+            if len(table) > 1:
+                findings.append(f"• {labels.iloc[-1]} is lowest with {totals.iloc[-1] / grand_total:.1%}.")
+        findings.append(f"• Average {measure} per record ranges from {averages.min():,.2f} to {averages.max():,.2f}.")
+        return findings
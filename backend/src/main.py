@@ -11,14 +11,18 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 import logging
+import shutil
 import time
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+import io
 import uuid
 import json
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 from models import (
@@ -30,10 +34,18 @@ from models import (
     Phase5Response, DownloadPackage,
     ChatRequest
 )
-from config import HOST, PORT, OUTPUT_DIR, LOG_LEVEL, LOG_FORMAT, GROQ_API_KEY, AI_MODEL
+from config import (
+    HOST, PORT, OUTPUT_DIR, LOG_LEVEL, LOG_FORMAT, GROQ_API_KEY, AI_MODEL,
+    PREVIEW_VALIDATION_BUDGET, FULL_VALIDATION_BUDGET,
+    STREAMING_GENERATION_MIN_CELLS, STREAMING_REPORT_ROWS, OUTPUT_FORMAT, OUTPUT_COMPRESSION
+)
 from groq import Groq
 from schema_generator import SchemaGenerator
 from problem_generator import ProblemGenerator
+from dataset_writers import validate_output_options, list_dataset_files, read_dataset_head
+from zip_stream import ZipEntry
+from package_cache import package_cache, PackageFileResponse
+from referential_integrity import check_relationships
 
 # Configure logging
 logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT)
@@ -427,13 +439,19 @@ async def phase3_generate_preview(session_id: str):
         preview_dataframes = data_gen.generate(schema, preview_size)
 
         # Validate preview
-        validation = _validate_preview(schema, preview_dataframes)
+        input_data = ChallengeInput(**sessions[session_id]["input"])
+        validation = _validate_preview(session_id, schema, preview_dataframes, input_data, data_gen.duplicate_rows)
 
         # Convert to PreviewData format
         preview_data = []
         for table_name, df in preview_dataframes.items():
             # Convert first 10 rows to list of dicts
-            sample_rows = df.head(10).fillna("NULL").to_dict('records')
+            # object first: categorical columns cannot take "NULL" as a new value
+            # Date columns are datetime64 in memory; show them as plain dates
+            head = df.head(10).copy()
+            for col in data_gen.date_columns.get(table_name, []):
+                head[col] = head[col].dt.date
+            sample_rows = head.astype(object).fillna("NULL").to_dict('records')
             preview_data.append(PreviewData(
                 table_name=table_name,
                 sample_rows=sample_rows,
@@ -521,18 +539,26 @@ async def phase4_generate_full(session_id: str, size_input: GenerationSizeInput,
     if not sessions[session_id].get("preview_approved"):
         raise HTTPException(status_code=400, detail="Preview must be approved first")
 
+    try:
+        validate_output_options(size_input.output_format, size_input.compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # Update session
         sessions[session_id]["phase"] = "phase4"
         sessions[session_id]["generation_size"] = size_input.dataset_size
+        sessions[session_id]["output_format"] = size_input.output_format
         sessions[session_id]["phase4_status"] = "generating"
+        sessions[session_id].pop("download_package", None)
 
         # Create session directory
         session_dir = OUTPUT_DIR / session_id
         session_dir.mkdir(parents=True, exist_ok=True)
 
         # Launch background generation
-        background_tasks.add_task(_run_phase4_generation, session_id, size_input.dataset_size, session_dir)
+        background_tasks.add_task(_run_phase4_generation, session_id, size_input.dataset_size, session_dir,
+                                  size_input.output_format, size_input.compression)
 
         return Phase4Response(
             session_id=session_id,
@@ -573,8 +599,9 @@ async def phase5_prepare_download(session_id: str):
     """
     Phase 5: Prepare complete download package.
 
-    Creates ZIP containing:
-    - All CSV files
+    The ZIP is stored content-addressed, so repeat calls for an unchanged
+    session return the existing archive. It contains:
+    - All dataset files (CSV, Parquet or Feather)
     - PDF quality report
     - Excel answers report
     - Data dictionary
@@ -591,8 +618,12 @@ async def phase5_prepare_download(session_id: str):
     try:
         session_dir = OUTPUT_DIR / session_id
 
-        # Create package
+        # Create package (reuses the cached archive when nothing changed)
         package = _create_download_package(session_id, session_dir)
+        zip_path = await run_in_threadpool(package_cache.get_or_build,
+                                           _package_entries(session_id, session_dir, package),
+                                           f"{session_id}:package_digest")
+        package.zip_path = str(zip_path)
 
         # Store package info
         sessions[session_id]["download_package"] = package.model_dump()
@@ -613,7 +644,7 @@ async def phase5_prepare_download(session_id: str):
 
 
 @app.get("/api/challenge/phase5/download/{session_id}")
-async def phase5_download(session_id: str):
+async def phase5_download(session_id: str, request: Request):
     """Download the complete package as ZIP."""
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -622,14 +653,12 @@ async def phase5_download(session_id: str):
         raise HTTPException(status_code=400, detail="Download package not prepared. Call /phase5/prepare first")
 
     package = DownloadPackage(**sessions[session_id]["download_package"])
+    session_dir = OUTPUT_DIR / session_id
 
-    if not Path(package.zip_path).exists():
-        raise HTTPException(status_code=404, detail="Download package not found")
-
-    return FileResponse(
-        path=package.zip_path,
-        media_type="application/zip",
-        filename=f"codebasics_data_challenge_{session_id}.zip"
+    return await _package_response(
+        request, session_id, "package_digest",
+        _package_entries(session_id, session_dir, package),
+        f"codebasics_data_challenge_{session_id}.zip"
     )
 
 
@@ -711,27 +740,26 @@ def _validate_schema_against_questions(schema: Schema, problem: ProblemStatement
     )
 
 
-def _validate_preview(schema: Schema, dataframes: Dict[str, pd.DataFrame]) -> PreviewValidationResult:
+def _validate_preview(session_id: str, schema: Schema, dataframes: Dict[str, pd.DataFrame],
+                      input_data: ChallengeInput,
+                      duplicate_rows: Optional[Dict[str, np.ndarray]] = None) -> PreviewValidationResult:
     """
     Validate preview data for foreign key integrity and data types.
+
+    The quality checks that fit the preview time budget are attached for
+    information; they do not affect the preview score.
     """
+    from quality_validator import QualityValidator
+
     orphan_records = {}
     data_type_issues = []
     fk_integrity_passed = True
 
     # Check FK integrity
-    for fk in schema.relationships:
-        if fk.child_table in dataframes and fk.parent_table in dataframes:
-            child_df = dataframes[fk.child_table]
-            parent_df = dataframes[fk.parent_table]
-
-            child_vals = set(child_df[fk.child_column].dropna().unique())
-            parent_vals = set(parent_df[fk.parent_column].unique())
-
-            orphans = child_vals - parent_vals
-            if orphans:
-                orphan_records[f"{fk.child_table}.{fk.child_column}"] = len(orphans)
-                fk_integrity_passed = False
+    for fk in check_relationships(schema, dataframes, duplicate_rows=duplicate_rows):
+        if not fk.passed:
+            orphan_records[f"{fk.child_table}.{fk.child_column}"] = fk.orphan_values
+            fk_integrity_passed = False
 
     # Check data types match schema
     for table in schema.tables:
@@ -739,7 +767,7 @@ def _validate_preview(schema: Schema, dataframes: Dict[str, pd.DataFrame]) -> Pr
             df = dataframes[table.name]
             for col in table.columns:
                 if col.name in df.columns:
-                    actual_type = str(df[col.name].dtype)
+                    actual_type = str(df[col.name].dtype).lower()  # Nullable dtypes are "Int64", "Float64"
                     expected_type = col.datatype
 
                     # Basic type checking
@@ -755,15 +783,42 @@ def _validate_preview(schema: Schema, dataframes: Dict[str, pd.DataFrame]) -> Pr
     if data_type_issues:
         score -= min(3.0, len(data_type_issues) * 0.5)
 
+    qa_results = QualityValidator(session_id).validate(
+        schema, dataframes, input_data, time_budget=PREVIEW_VALIDATION_BUDGET, duplicate_rows=duplicate_rows)
+
     return PreviewValidationResult(
         fk_integrity_passed=fk_integrity_passed,
         orphan_records=orphan_records,
         data_type_issues=data_type_issues[:10],  # Limit to 10
-        quality_score=max(0.0, score)
+        quality_score=max(0.0, score),
+        checks=qa_results.checks
     )
 
 
-async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir: Path):
+def _generate_dataset(data_gen, schema: Schema, dataset_size: int, datasets_dir: Path,
+                      output_format: str = OUTPUT_FORMAT, compression: Optional[str] = OUTPUT_COMPRESSION
+                      ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, np.ndarray], bool]:
+    """
+    Generate the dataset and write it to datasets_dir.
+
+    Returns (dataframes, duplicate_rows, streamed). Datasets of at least
+    STREAMING_GENERATION_MIN_CELLS cells are streamed to disk chunk by chunk;
+    dataframes then hold only the first STREAMING_REPORT_ROWS rows of each
+    written table (duplicate rows included, as written), so duplicate_rows is empty.
+    """
+    if data_gen.estimated_cells(schema, dataset_size) >= STREAMING_GENERATION_MIN_CELLS:
+        paths = data_gen.generate_streaming(schema, dataset_size, datasets_dir, fmt=output_format,
+                                            compression=compression)
+        dataframes = {name: read_dataset_head(path, STREAMING_REPORT_ROWS) for name, path in paths.items()}
+        return dataframes, {}, True
+
+    dataframes = data_gen.generate(schema, dataset_size)
+    data_gen.save_to_disk(datasets_dir, output_format, compression)
+    return dataframes, data_gen.duplicate_rows, False
+
+
+async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir: Path,
+                                 output_format: str = "csv", compression: Optional[str] = None):
     """
     Run Phase 4 full generation in background.
 
@@ -794,13 +849,13 @@ async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir
         problem = ProblemStatement(**sessions[session_id]["problem_statement"])
         input_data = ChallengeInput(**sessions[session_id]["input"])
 
-        # Generate full dataset
-        data_gen = DatasetGenerator(seed=int(time.time()))
-        dataframes = data_gen.generate(schema, dataset_size)
-
-        # Save datasets
+        # Generate full dataset. The seed is kept for the session, so a re-run reproduces the
+        # tables whose definition did not change and their validation results are reused
+        seed = sessions[session_id].setdefault("generation_seed", int(time.time()))
+        data_gen = DatasetGenerator(seed=seed)
         datasets_dir = session_dir / "datasets"
-        data_gen.save_to_disk(datasets_dir)
+        dataframes, duplicate_rows, streamed = _generate_dataset(data_gen, schema, dataset_size, datasets_dir,
+                                                                 output_format, compression)
 
         # Update progress
         sessions[session_id]["progress"] = {
@@ -812,7 +867,8 @@ async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir
 
         # Run quality validation
         validator = QualityValidator(session_id)
-        qa_results = validator.validate(schema, dataframes, input_data)
+        qa_results = validator.validate(schema, dataframes, input_data, time_budget=FULL_VALIDATION_BUDGET,
+                                        duplicate_rows=duplicate_rows)
 
         # Save QA results
         with open(session_dir / "qa_results.json", "w") as f:
@@ -829,7 +885,7 @@ async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir
         # Generate PDF report
         pdf_path = session_dir / "quality_report.pdf"
         pdf_gen = QualityReportPDF(pdf_path)
-        pdf_gen.generate(qa_results, schema, dataframes, input_data)
+        pdf_gen.generate(qa_results, schema, dataframes, input_data, validator.profile)
 
         # Update progress
         sessions[session_id]["progress"] = {
@@ -842,7 +898,8 @@ async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir
         # Generate Excel report
         excel_path = session_dir / "analytical_answers.xlsx"
         excel_gen = SolutionExcelGenerator(excel_path)
-        excel_gen.generate(qa_results, problem, dataframes)
+        excel_gen.generate(qa_results, problem, dataframes, schema, duplicate_rows=duplicate_rows,
+                           head_rows=STREAMING_REPORT_ROWS if streamed else None)
 
         # Complete
         sessions[session_id]["progress"] = {
@@ -876,58 +933,60 @@ async def _run_phase4_generation(session_id: str, dataset_size: int, session_dir
 
 def _create_download_package(session_id: str, session_dir: Path) -> DownloadPackage:
     """
-    Create complete download package with all files.
+    Describe the download package; the ZIP itself is streamed on download.
     """
-    import shutil
-
-    # Create package directory
-    package_dir = session_dir / "package"
-    package_dir.mkdir(exist_ok=True)
-
-    # Copy CSV files
     datasets_dir = session_dir / "datasets"
-    csv_files = []
-    if datasets_dir.exists():
-        for csv_file in datasets_dir.glob("*.csv"):
-            shutil.copy(csv_file, package_dir / csv_file.name)
-            csv_files.append(csv_file.name)
-
-    # Copy PDF report
-    pdf_path = session_dir / "quality_report.pdf"
-    if pdf_path.exists():
-        shutil.copy(pdf_path, package_dir / "quality_report.pdf")
-
-    # Copy Excel report
-    excel_path = session_dir / "analytical_answers.xlsx"
-    if excel_path.exists():
-        shutil.copy(excel_path, package_dir / "analytical_answers.xlsx")
-
-    # Create data dictionary
-    schema = Schema(**sessions[session_id]["schema"])
-    data_dict_path = package_dir / "data_dictionary.txt"
-    _create_data_dictionary(schema, data_dict_path)
-
-    # Create README
-    readme_path = package_dir / "README.txt"
-    _create_readme(session_id, readme_path)
-
-    # Create ZIP
-    zip_path = session_dir / f"codebasics_data_challenge_{session_id}.zip"
-    shutil.make_archive(str(zip_path.with_suffix('')), 'zip', package_dir)
+    csv_files = [dataset_file.name for dataset_file in list_dataset_files(datasets_dir)]
 
     return DownloadPackage(
         csv_files=csv_files,
         pdf_report="quality_report.pdf",
         excel_report="analytical_answers.xlsx",
         data_dictionary="data_dictionary.txt",
-        readme="README.txt",
-        zip_path=str(zip_path)
+        readme="README.txt"
     )
 
 
-def _create_data_dictionary(schema: Schema, output_path: Path):
+def _package_entries(session_id: str, session_dir: Path, package: DownloadPackage) -> List[ZipEntry]:
+    """List the files that make up the download package, in archive order."""
+    schema = Schema(**sessions[session_id]["schema"])
+    datasets_dir = session_dir / "datasets"
+
+    entries: List[ZipEntry] = [(name, datasets_dir / name) for name in package.csv_files]
+    entries.append((package.pdf_report, session_dir / "quality_report.pdf"))
+    entries.append((package.excel_report, session_dir / "analytical_answers.xlsx"))
+    entries.append((package.data_dictionary, _create_data_dictionary(schema).encode("utf-8")))
+    entries.append((package.readme, _create_readme(session_id).encode("utf-8")))
+    return entries
+
+
+async def _package_response(request: Request, session_id: str, kind: str,
+                            entries: List[ZipEntry], filename: str) -> Response:
+    """
+    Serve the content-addressed archive for these entries, building it on first use.
+
+    The digest doubles as the ETag, so unchanged packages answer If-None-Match
+    with 304 and interrupted downloads can resume with Range/If-Range. Hashing
+    and zipping run in the thread pool, off the event loop.
+    """
+    zip_path = await run_in_threadpool(package_cache.get_or_build, entries, f"{session_id}:{kind}")
+    digest = zip_path.stem
+    sessions[session_id][kind] = digest
+
+    if request.headers.get("if-none-match") == f'"{digest}"':
+        return Response(status_code=304, headers={"ETag": f'"{digest}"'})
+
+    return PackageFileResponse(
+        zip_path,
+        digest,
+        media_type="application/zip",
+        filename=filename
+    )
+
+
+def _create_data_dictionary(schema: Schema) -> str:
     """Create human-readable data dictionary."""
-    with open(output_path, 'w') as f:
+    with io.StringIO() as f:
         f.write("=" * 80 + "\n")
         f.write("CODEBASICS DATA FACTORY - DATA DICTIONARY\n")
         f.write("=" * 80 + "\n\n")
@@ -955,12 +1014,14 @@ def _create_data_dictionary(schema: Schema, output_path: Path):
             f.write(f"\n{rel.parent_table}.{rel.parent_column} -> {rel.child_table}.{rel.child_column}")
             f.write(f" ({rel.cardinality})\n")
 
+        return f.getvalue()
+
 
-def _create_readme(session_id: str, output_path: Path):
+def _create_readme(session_id: str) -> str:
     """Create README file for the package."""
     problem = ProblemStatement(**sessions[session_id]["problem_statement"])
 
-    with open(output_path, 'w') as f:
+    with io.StringIO() as f:
         f.write("=" * 80 + "\n")
         f.write("CODEBASICS DATA FACTORY - DATA CHALLENGE PACKAGE\n")
         f.write("=" * 80 + "\n\n")
@@ -968,11 +1029,14 @@ def _create_readme(session_id: str, output_path: Path):
         f.write(f"Challenge Title: {problem.title}\n")
         f.write(f"Company: {problem.company_name}\n")
         f.write(f"Difficulty: {problem.difficulty.value}\n")
-        f.write(f"Generated: {datetime.now().strftime('%B %d, %Y %I:%M %p')}\n\n")
+        # Use the Phase 4 completion time so the README (and the package digest) is stable
+        completed_at = sessions[session_id].get("completion_timestamp")
+        generated = datetime.fromisoformat(completed_at) if completed_at else datetime.now()
+        f.write(f"Generated: {generated.strftime('%B %d, %Y %I:%M %p')}\n\n")
 
         f.write("PACKAGE CONTENTS:\n")
         f.write("-" * 80 + "\n")
-        f.write("1. CSV Files - Raw data tables for analysis\n")
+        f.write("1. Dataset Files (CSV, Parquet or Feather) - Raw data tables for analysis\n")
         f.write("2. quality_report.pdf - Comprehensive data quality validation report\n")
         f.write("3. analytical_answers.xlsx - Answers to analytical questions with visuals\n")
         f.write("4. data_dictionary.txt - Complete schema and column descriptions\n")
@@ -985,7 +1049,7 @@ def _create_readme(session_id: str, output_path: Path):
 
         f.write("\n\nHOW TO USE:\n")
         f.write("-" * 80 + "\n")
-        f.write("1. Import CSV files into your preferred tool (Excel, Power BI, Tableau, SQL)\n")
+        f.write("1. Import the dataset files into your preferred tool (Excel, Power BI, Tableau, SQL)\n")
         f.write("2. Review the data dictionary to understand table relationships\n")
         f.write("3. Analyze the data to answer the analytical questions\n")
         f.write("4. Compare your answers with the provided Excel report\n")
@@ -1002,6 +1066,8 @@ def _create_readme(session_id: str, output_path: Path):
         f.write("For questions or issues, visit: https://codebasics.io\n")
         f.write("Happy Learning!\n")
 
+        return f.getvalue()
+
 
 async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir: Path):
     """Run the complete generation pipeline in background."""
@@ -1037,8 +1103,11 @@ async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir:
                 "elapsed": time.time() - start_time
             }
             
+            # Each iteration writes its own directory; only the best one is kept
             data_gen = DatasetGenerator(seed=int(time.time()))
-            dataframes = data_gen.generate(schema, input_data.dataset_size)
+            iteration_dir = session_dir / f"datasets_{current_iteration}"
+            dataframes, duplicate_rows, _ = _generate_dataset(data_gen, schema, input_data.dataset_size,
+                                                              iteration_dir)
             
             # Stage 3: QA Validation
             sessions[session_id]["progress"] = {
@@ -1049,11 +1118,16 @@ async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir:
             }
             
             validator = QualityValidator(session_id)
-            qa_results = validator.validate(schema, dataframes, input_data)
+            qa_results = validator.validate(schema, dataframes, input_data, time_budget=FULL_VALIDATION_BUDGET,
+                                            duplicate_rows=duplicate_rows)
             
             if qa_results.overall_score > best_score:
                 best_score = qa_results.overall_score
-                best_results = (schema, dataframes, qa_results)
+                if best_results:
+                    shutil.rmtree(best_results[4], ignore_errors=True)
+                best_results = (schema, dataframes, qa_results, validator.profile, iteration_dir)
+            else:
+                shutil.rmtree(iteration_dir, ignore_errors=True)
             
             if qa_results.overall_score >= QUALITY_APPROVED_THRESHOLD and qa_results.status != "Regenerate":
                 logger.info(f"Target quality reached on iteration {current_iteration}")
@@ -1064,12 +1138,15 @@ async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir:
 
         except Exception as e:
             logger.error(f"Iteration {current_iteration} failed: {e}")
+            failed_dir = session_dir / f"datasets_{current_iteration}"
+            if not best_results or best_results[4] != failed_dir:
+                shutil.rmtree(failed_dir, ignore_errors=True)
             if current_iteration == MAX_REGENERATION_ITERATIONS and not best_results:
                 raise
             current_iteration += 1
 
     # Use best results obtained
-    schema, dataframes, qa_results = best_results
+    schema, dataframes, qa_results, profile, best_dir = best_results
     
     try:
         # Final Stage: Save and Report
@@ -1084,9 +1161,10 @@ async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir:
         with open(session_dir / "schema.json", "w") as f:
             json.dump(schema.model_dump(), f, indent=2, default=str)
 
-        # Save datasets
+        # Keep the best iteration's datasets
         datasets_dir = session_dir / "datasets"
-        data_gen.save_to_disk(datasets_dir)
+        shutil.rmtree(datasets_dir, ignore_errors=True)
+        best_dir.rename(datasets_dir)
         
         # Save QA results
         with open(session_dir / "qa_results.json", "w") as f:
@@ -1095,7 +1173,7 @@ async def run_pipeline(session_id: str, input_data: ChallengeInput, session_dir:
         # Stage 4: PDF Report
         report_path = session_dir / "quality_report.pdf"
         pdf_gen = QualityReportPDF(report_path)
-        pdf_gen.generate(qa_results, schema, dataframes, input_data)
+        pdf_gen.generate(qa_results, schema, dataframes, input_data, profile)
 
         # Complete
         sessions[session_id]["progress"] = {
@@ -1323,30 +1401,19 @@ async def get_session_status(session_id: str):
 
 
 @app.get("/api/download/{session_id}")
-async def download_data(session_id: str):
+async def download_data(session_id: str, request: Request):
     """Download generated dataset files as a ZIP."""
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    import shutil
-    import tempfile
-    
     session_dir = OUTPUT_DIR / session_id
     datasets_dir = session_dir / "datasets"
     
     if not datasets_dir.exists():
         raise HTTPException(status_code=404, detail="Datasets not found")
 
-    # Create temporary zip file
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        # Zip the datasets directory
-        zip_path = shutil.make_archive(tmp.name, 'zip', datasets_dir)
-        
-    return FileResponse(
-        path=zip_path,
-        media_type="application/zip",
-        filename=f"challenge_data_{session_id}.zip"
-    )
+    entries = [(dataset_file.name, dataset_file) for dataset_file in list_dataset_files(datasets_dir)]
+    return await _package_response(request, session_id, "data_package_digest", entries, f"challenge_data_{session_id}.zip")
 
 
 if __name__ == "__main__":
@@ -103,6 +103,8 @@ class EventImpact(BaseModel):
     end_date: str  # "2020-12-31"
     impact_magnitude: float  # -0.30 for 30% decline
     affected_metrics: List[str]
+    ramp_in_days: int = 0  # Days after start_date over which the impact builds up linearly
+    ramp_out_days: int = 0  # Days before end_date over which it fades out linearly
 
 
 class Schema(BaseModel):
@@ -116,6 +118,68 @@ class Schema(BaseModel):
     event_impacts: List[EventImpact] = []
 
 
+class ColumnProfile(BaseModel):
+    """Per-column statistics computed once per validation run."""
+    name: str
+    dtype: str
+    kind: Literal["numeric", "categorical", "datetime", "other"]
+    null_count: int
+    null_pct: float
+    distinct_count: Optional[int] = None  # Not computed for numeric columns
+    # Categorical columns
+    frequency_std: Optional[float] = None  # Std of normalized value frequencies
+    top_values: Dict[str, int] = {}  # Most frequent first
+    bottom_values: Dict[str, int] = {}  # Least frequent observed values, most frequent first
+    # Numeric columns
+    min: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    q1: Optional[float] = None
+    median: Optional[float] = None
+    q3: Optional[float] = None
+    outlier_count: Optional[int] = None  # Outside 1.5 * IQR
+    negative_count: Optional[int] = None
+    # Date columns: row counts per "YYYY-MM"
+    monthly_counts: Optional[Dict[str, int]] = None
+
+
+class TableProfile(BaseModel):
+    """Statistics for one table."""
+    name: str
+    row_count: int
+    duplicate_row_count: int
+    primary_key: Optional[str] = None
+    primary_key_unique: bool = True
+    columns: Dict[str, ColumnProfile]
+    correlations: Dict[str, Dict[str, float]] = {}  # Pearson, numeric columns only
+    # Set when the statistics were estimated from a row sample; counts are scaled to row_count
+    sampled_rows: Optional[int] = None
+    duplicate_margin: float = 0.0  # 95% margin on duplicate_row_count
+
+
+class DatasetProfile(BaseModel):
+    """Statistics for every table in a dataset."""
+    tables: Dict[str, TableProfile]
+
+
+class ForeignKeyCheckResult(BaseModel):
+    """Referential integrity of one FK relationship."""
+    parent_table: str
+    parent_column: str
+    child_table: str
+    child_column: str
+    child_rows: int  # Non-null FK values
+    orphan_rows: int  # Rows whose FK value has no parent
+    orphan_values: int  # Distinct FK values with no parent
+    sample_orphans: List[str] = []
+    coverage: float  # Share of parent keys referenced by at least one child row
+
+    @property
+    def passed(self) -> bool:
+        return self.orphan_rows == 0
+
+
 class ValidationCheckResult(BaseModel):
     """Result of a single validation check."""
     check_name: str
@@ -125,6 +189,7 @@ class ValidationCheckResult(BaseModel):
     message: str
     details: Optional[Dict[str, Any]] = None
     severity: Literal["blocker", "warning", "info"] = "info"
+    error_bound: float = 0.0  # 95% bound on score when scored from sampled rows
 
 
 class QAResults(BaseModel):
@@ -138,6 +203,8 @@ class QAResults(BaseModel):
     issues: List[str]
     generated_at: datetime
     iteration_number: int = 1
+    approximate: bool = False  # At least one table was validated from a row sample
+    skipped_checks: List[str] = []  # Registered checks left out to fit the time budget
 
 
 class GenerationProgress(BaseModel):
@@ -243,6 +310,7 @@ class PreviewValidationResult(BaseModel):
     orphan_records: Dict[str, int]
     data_type_issues: List[str]
     quality_score: float = Field(ge=0.0, le=10.0)
+    checks: List[ValidationCheckResult] = []  # Quality checks that fit the preview time budget
 
 
 class Phase3Response(BaseModel):
@@ -259,6 +327,8 @@ class Phase3Response(BaseModel):
 class GenerationSizeInput(BaseModel):
     """Input for full dataset generation size."""
     dataset_size: int = Field(ge=1000, le=100000, description="Number of rows for main fact table")
+    output_format: Literal["csv", "parquet", "feather"] = Field(default="csv", description="Dataset file format")
+    compression: Optional[str] = Field(None, description="Format-specific codec, e.g. zstd for parquet, gzip for csv")
 
 
 class Phase4Response(BaseModel):
@@ -275,12 +345,12 @@ class Phase4Response(BaseModel):
 
 class DownloadPackage(BaseModel):
     """Download package contents."""
-    csv_files: List[str]
+    csv_files: List[str]  # Dataset files, in whichever output format Phase 4 wrote
     pdf_report: str
     excel_report: str
     data_dictionary: str
     readme: str
-    zip_path: str
+    zip_path: Optional[str] = None  # Content-addressed archive under PACKAGE_CACHE_DIR
 
 
 class Phase5Response(BaseModel):
@@ -0,0 +1,153 @@
+"""
+Content-addressed cache of download packages.
+
+Archives are stored as PACKAGE_CACHE_DIR/{digest}.zip, where the digest covers
+every file and in-memory document in the package. Repeat requests for an
+unchanged session reuse the existing archive; any change to Phase 4 output
+yields a new digest. Sessions with identical content share one archive, so an
+archive is only removed once no session serves it any more.
+
+Only requests for the same digest wait for each other's build. Like the session
+store in main, the reference counts live in process memory and assume a single
+server process: with several workers, one worker may remove an archive another
+still serves (that worker then rebuilds it on its next request).
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi.responses import FileResponse
+
+from config import PACKAGE_CACHE_DIR
+from zip_stream import stream_zip, ZipEntry
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@lru_cache(maxsize=1024)
+def _hash_file(path: str, size: int, mtime_ns: int) -> str:
+    """SHA-256 of a file; memoised on (path, size, mtime) so unchanged files hash once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    stat = path.stat()
+    return _hash_file(str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+
+class PackageCache:
+    """Builds ZIP archives once per distinct content digest."""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._served: Dict[str, str] = {}  # Owner (session and package kind) -> digest it serves
+        self._refs: Counter = Counter()  # Digest -> number of owners serving it
+        self._pins: Counter = Counter()  # Digest -> requests building or checking it right now
+        self._build_locks: Dict[str, threading.Lock] = {}  # Digest -> lock held while it is built
+
+    def digest(self, entries: List[ZipEntry]) -> str:
+        """Digest of archive names and contents; missing files are left out, as in the archive."""
+        digest = hashlib.sha256()
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                content = hashlib.sha256(source).hexdigest()
+            elif Path(source).exists():
+                content = file_digest(Path(source))
+            else:
+                continue
+            digest.update(f"{arcname}\0{content}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def path_for(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.zip"
+
+    def get_or_build(self, entries: List[ZipEntry], owner: Optional[str] = None) -> Path:
+        """
+        Return the archive for these entries, building it if it doesn't exist yet.
+
+        With an owner (e.g. a session and package kind), the archive is recorded as
+        served by it before it is returned. The digest stays pinned in between, so the
+        archive cannot be removed before it is served. The cache-wide lock is only
+        held for this bookkeeping; the build itself holds a lock for its digest.
+        """
+        digest = self.digest(entries)
+        zip_path = self.path_for(digest)
+
+        with self._lock:
+            self._pins[digest] += 1
+            build_lock = self._build_locks.setdefault(digest, threading.Lock())
+        try:
+            with build_lock:
+                if not zip_path.exists():
+                    self._build(entries, zip_path)
+        except BaseException:
+            with self._lock:
+                self._unpin(digest)
+            raise
+
+        with self._lock:
+            if owner is not None:
+                self._assign(owner, digest)
+            self._unpin(digest)
+        return zip_path
+
+    def _unpin(self, digest: str):
+        self._pins[digest] -= 1
+        if self._pins[digest] <= 0:
+            del self._pins[digest]
+            del self._build_locks[digest]
+
+    def _build(self, entries: List[ZipEntry], zip_path: Path):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = zip_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in stream_zip(entries):
+                    f.write(chunk)
+            os.replace(tmp_path, zip_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        logger.info(f"Built download package {zip_path.name}")
+
+    def _assign(self, owner: str, digest: str):
+        """Record that owner now serves digest; its previous archive is removed once nobody serves it."""
+        previous = self._served.get(owner)
+        if previous == digest:
+            return
+        self._served[owner] = digest
+        self._refs[digest] += 1
+        if previous is None:
+            return
+        self._refs[previous] -= 1
+        if self._refs[previous] <= 0:
+            del self._refs[previous]
+            if not self._pins[previous]:
+                self.path_for(previous).unlink(missing_ok=True)
+
+
+class PackageFileResponse(FileResponse):
+    """FileResponse whose ETag is the package digest, so If-Range resumes keep working."""
+
+    def __init__(self, path: Path, digest: str, **kwargs):
+        self.package_etag = f'"{digest}"'
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["etag"] = self.package_etag
+        super().__init__(path, headers=headers, **kwargs)
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        return http_if_range == self.package_etag or super()._should_use_range(http_if_range, stat_result)
+
+
+package_cache = PackageCache(PACKAGE_CACHE_DIR)
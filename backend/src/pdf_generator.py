@@ -1,10 +1,6 @@
 """
 Advanced PDF quality report generator with 12 mandatory visuals and 10-section structure.
 """
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg') # Non-interactive backend
-import seaborn as sns
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -14,23 +10,39 @@ import pandas as pd
 import numpy as np
 import io
 import logging
+import time
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
-from models import QAResults, Schema, ChallengeInput
-from config import BASE_DIR
+from models import QAResults, Schema, ChallengeInput, DatasetProfile
+from config import BASE_DIR, REPORT_WORKERS, REPORT_CHART_FORMAT
+from data_profiler import profile_dataset
+from report_charts import ChartRequest, render_charts, vector_chart
 
 logger = logging.getLogger(__name__)
 
 LOGO_PATH = BASE_DIR / "assets" / "logo.png"
 
+
+class PendingChart:
+    """Placeholder in the story for a chart that is rendered after all sections are built."""
+
+    def __init__(self, index: int, width: float, height: float):
+        self.index = index
+        self.width = width
+        self.height = height
+
+
 class QualityReportPDF:
     """Generate high-quality PDF reports with 12 mandatory data validation visuals."""
 
-    def __init__(self, output_path: Path):
+    def __init__(self, output_path: Path, workers: int = REPORT_WORKERS, chart_format: str = REPORT_CHART_FORMAT):
         self.output_path = output_path
+        self.workers = workers
+        self.chart_format = chart_format
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
+        self._chart_requests: List[ChartRequest] = []
 
     def _setup_custom_styles(self):
         self.styles.add(ParagraphStyle(
@@ -59,10 +71,21 @@ class QualityReportPDF:
                 sampled[name] = df
         return sampled
 
-    def generate(self, qa_results: QAResults, schema: Schema, data: Dict[str, pd.DataFrame], input_data: ChallengeInput):
-        """Generate the full structured PDF report with conditional sections."""
+    def generate(self, qa_results: QAResults, schema: Schema, data: Dict[str, pd.DataFrame], input_data: ChallengeInput,
+                 profile: Optional[DatasetProfile] = None):
+        """
+        Generate the full structured PDF report with conditional sections.
+
+        Counts and statistics come from the validator's profile (QualityValidator.profile);
+        data is only sampled for the histogram, boxplot and, when the profile has
+        no correlation matrices, the heatmap. Without a profile one is computed.
+        """
         doc = SimpleDocTemplate(str(self.output_path), pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
         elements = []
+        self._chart_requests = []
+
+        if profile is None:
+            profile = profile_dataset(schema, data)
 
         # Sample data for chart rendering (full data not needed for visuals)
         chart_data = self._sample_data(data)
@@ -71,50 +94,50 @@ class QualityReportPDF:
         elements.extend(self._create_cover_page(qa_results, input_data))
         elements.append(PageBreak())
 
-        # Section 2: Structural Integrity (uses full data for accurate row counts)
-        struct_page = self._create_structural_integrity_page(schema, data)
+        # Section 2: Structural Integrity
+        struct_page = self._create_structural_integrity_page(profile)
         if len(struct_page) > 1:
             elements.extend(struct_page)
             elements.append(PageBreak())
 
-        # Section 3: Completeness (uses full data for accurate null %)
-        completeness_page = self._create_completeness_page(data)
+        # Section 3: Completeness
+        completeness_page = self._create_completeness_page(profile)
         if len(completeness_page) > 1:
             elements.extend(completeness_page)
             elements.append(PageBreak())
 
-        # Section 4: Duplicates (uses full data for accurate counts)
-        dup_page = self._create_duplicate_page(data)
+        # Section 4: Duplicates
+        dup_page = self._create_duplicate_page(profile)
         if len(dup_page) > 1:
             elements.extend(dup_page)
             elements.append(PageBreak())
 
-        # Section 5: Numeric Distributions (sampled - charts don't need all rows)
-        num_page = self._create_numeric_distribution_page(chart_data)
+        # Section 5: Numeric Distributions (charts from sampled rows, summary from the profile)
+        num_page = self._create_numeric_distribution_page(profile, chart_data)
         if len(num_page) > 1:
             elements.extend(num_page)
             elements.append(PageBreak())
 
-        # Section 6: Category Distributions (sampled)
-        cat_page = self._create_category_distribution_page(chart_data)
+        # Section 6: Category Distributions
+        cat_page = self._create_category_distribution_page(profile)
         if len(cat_page) > 1:
             elements.extend(cat_page)
             elements.append(PageBreak())
 
-        # Section 7: Time-Series (sampled)
-        ts_page = self._create_time_series_page(chart_data)
+        # Section 7: Time-Series
+        ts_page = self._create_time_series_page(profile)
         if len(ts_page) > 1:
             elements.extend(ts_page)
             elements.append(PageBreak())
 
-        # Section 8: Outliers (sampled)
-        outlier_page = self._create_outlier_page(chart_data)
+        # Section 8: Outliers
+        outlier_page = self._create_outlier_page(profile)
         if len(outlier_page) > 1:
             elements.extend(outlier_page)
             elements.append(PageBreak())
 
-        # Section 9: Correlations (sampled)
-        corr_page = self._create_correlation_page(chart_data)
+        # Section 9: Correlations
+        corr_page = self._create_correlation_page(profile, chart_data)
         if len(corr_page) > 1:
             elements.extend(corr_page)
             elements.append(PageBreak())
@@ -122,9 +145,34 @@ class QualityReportPDF:
         # Section 10: Score Breakdown
         elements.extend(self._create_score_page(qa_results))
 
+        # Sections only queued their charts; build them all at once
+        elements = self._render_charts(elements)
+
         doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
         logger.info(f"Structured PDF report saved to {self.output_path}")
 
+    def _render_charts(self, elements: List[Any]) -> List[Any]:
+        """Replace chart placeholders with vector drawings where supported, else PNG images rendered in parallel."""
+        start = time.perf_counter()
+        charts: Dict[int, Any] = {}
+        if self.chart_format == "vector":
+            for e in elements:
+                if isinstance(e, PendingChart):
+                    kind, params, _ = self._chart_requests[e.index]
+                    drawing = vector_chart(kind, params, e.width, e.height)
+                    if drawing is not None:
+                        charts[e.index] = drawing
+
+        raster = [i for i in range(len(self._chart_requests)) if i not in charts]
+        images = render_charts([self._chart_requests[i] for i in raster], self.workers)
+        sizes = {e.index: (e.width, e.height) for e in elements if isinstance(e, PendingChart)}
+        for i, image in zip(raster, images):
+            width, height = sizes[i]
+            charts[i] = Image(io.BytesIO(image), width=width, height=height)
+        logger.info(f"Built {len(charts)} report charts ({len(charts) - len(raster)} vector) "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return [charts[e.index] if isinstance(e, PendingChart) else e for e in elements]
+
     def _add_footer(self, canvas, doc):
         """Add footer with page number and brand."""
         canvas.saveState()
@@ -140,14 +188,10 @@ class QualityReportPDF:
         canvas.drawString(40, 35, "Codebasics Data Factory - Official Quality Verification")
         canvas.restoreState()
 
-    def _plot_to_image(self, width=6, height=4):
-        """Helper to convert current plt to reportlab Image."""
-        img_data = io.BytesIO()
-        plt.savefig(img_data, format='png', bbox_inches='tight', dpi=80)
-        img_data.seek(0)
-        img = Image(img_data, width=width*inch, height=height*inch)
-        plt.close()
-        return img
+    def _chart(self, kind: str, figsize: Tuple[float, float] = (6, 4), width=6, height=4, **params) -> PendingChart:
+        """Queue a chart (see report_charts.RENDERERS) and return its placeholder in the story."""
+        self._chart_requests.append((kind, params, figsize))
+        return PendingChart(len(self._chart_requests) - 1, width*inch, height*inch)
 
     def _create_cover_page(self, qa_results: QAResults, input_data: ChallengeInput):
         elements = []
@@ -179,67 +223,57 @@ class QualityReportPDF:
         elements.append(t)
         return elements
 
-    def _create_structural_integrity_page(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    def _create_structural_integrity_page(self, profile: DatasetProfile):
         elements = [Paragraph("Section 2: Structural Integrity Summary", self.styles['SectionHeader'])]
         
         # 1. Row Count per Table (Bar Chart)
-        table_names = list(data.keys())
-        counts = [len(df) for df in data.values()]
-        plt.figure(figsize=(6, 4))
-        sns.barplot(x=table_names, y=counts, palette="viridis", hue=table_names, legend=False)
-        plt.title("Row Count per Table")
-        plt.xticks(rotation=45)
-        elements.append(self._plot_to_image())
+        table_names = list(profile.tables.keys())
+        counts = [t.row_count for t in profile.tables.values()]
+        elements.append(self._chart("bar", labels=table_names, values=counts, title="Row Count per Table",
+                                    palette="viridis", rotate=45))
         
         # 2. Column Data Type Distribution (Bar Chart)
         types = []
-        for df in data.values():
-            types.extend(df.dtypes.astype(str).tolist())
+        for table in profile.tables.values():
+            types.extend(c.dtype for c in table.columns.values())
         type_counts = pd.Series(types).value_counts()
-        plt.figure(figsize=(6, 4))
-        type_counts.plot(kind='bar', color='#3B82F6')
-        plt.title("Column Data Type Distribution")
-        elements.append(self._plot_to_image())
+        elements.append(self._chart("bar", labels=list(type_counts.index), values=type_counts.tolist(),
+                                    title="Column Data Type Distribution", color='#3B82F6', rotate=90))
         
         return elements
 
-    def _create_completeness_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_completeness_page(self, profile: DatasetProfile):
         elements = [Paragraph("Section 3: Completeness Analysis", self.styles['SectionHeader'])]
         
         # 3. Null % per Column (Bar Chart)
         all_nulls = []
-        for name, df in data.items():
-            s = df.isnull().mean() * 100
-            for col, val in s.items():
-                all_nulls.append({'Table.Col': f"{name}.{col}", 'Null %': val})
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                all_nulls.append({'Table.Col': f"{name}.{col}", 'Null %': col_profile.null_pct})
         
         null_df = pd.DataFrame(all_nulls).sort_values('Null %', ascending=False).head(15)
-        plt.figure(figsize=(6, 4))
-        sns.barplot(data=null_df, x='Null %', y='Table.Col', palette='flare', hue='Table.Col', legend=False)
-        plt.title("Top 15 Columns by Null %")
-        elements.append(self._plot_to_image())
+        elements.append(self._chart("bar", labels=null_df['Table.Col'].tolist(), values=null_df['Null %'].tolist(),
+                                    title="Top 15 Columns by Null %", palette='flare', horizontal=True))
         
         return elements
 
-    def _create_duplicate_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_duplicate_page(self, profile: DatasetProfile):
         elements = [Paragraph("Section 4: Duplicate Analysis", self.styles['SectionHeader'])]
         
         # 4. Duplicate Count Chart
-        dup_counts = {name: df.duplicated().sum() for name, df in data.items()}
-        plt.figure(figsize=(6, 4))
-        plt.bar(dup_counts.keys(), dup_counts.values(), color='mediumpurple')
-        plt.title("Duplicate Row Count per Table")
-        plt.xticks(rotation=45)
-        elements.append(self._plot_to_image())
+        dup_counts = {name: t.duplicate_row_count for name, t in profile.tables.items()}
+        elements.append(self._chart("bar", labels=list(dup_counts.keys()), values=list(dup_counts.values()),
+                                    title="Duplicate Row Count per Table", color='mediumpurple', rotate=45))
         
         return elements
 
-    def _create_numeric_distribution_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_numeric_distribution_page(self, profile: DatasetProfile, data: Dict[str, pd.DataFrame]):
         # Find numeric columns
         num_cols = []
-        for name, df in data.items():
-            for col in df.select_dtypes(include=[np.number]).columns:
-                num_cols.append((name, col))
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                if col_profile.kind == "numeric":
+                    num_cols.append((name, col))
         
         if not num_cols:
             return []
@@ -247,23 +281,20 @@ class QualityReportPDF:
         elements = [Paragraph("Section 5: Numeric Distribution Analysis", self.styles['SectionHeader'])]
         # 5. Histogram for first 2 numeric columns
         for name, col in num_cols[:2]:
-            plt.figure(figsize=(6, 3))
-            sns.histplot(data[name][col].dropna(), kde=False, color='skyblue', bins=30)
-            plt.title(f"Histogram: {name}.{col}")
-            elements.append(self._plot_to_image(height=2.5))
+            elements.append(self._chart("histogram", figsize=(6, 3), height=2.5,
+                                        values=data[name][col].dropna().to_numpy(), title=f"Histogram: {name}.{col}"))
         
         # 6. Boxplot for first numeric column
         name, col = num_cols[0]
-        plt.figure(figsize=(6, 3))
-        sns.boxplot(x=data[name][col], color='lightgreen')
-        plt.title(f"Boxplot: {name}.{col}")
-        elements.append(self._plot_to_image(height=2.5))
+        elements.append(self._chart("boxplot", figsize=(6, 3), height=2.5,
+                                    values=data[name][col].dropna().to_numpy(), title=f"Boxplot: {name}.{col}"))
         
         # 10. Numeric Range Summary Table
+        fmt = lambda v: f"{v:.1f}" if v is not None else "-"
         stats_rows = [["Table.Column", "Min", "Max", "Mean", "Std"]]
         for name, col in num_cols[:5]:
-            s = data[name][col].describe()
-            stats_rows.append([f"{name}.{col}", f"{s['min']:.1f}", f"{s['max']:.1f}", f"{s['mean']:.1f}", f"{s['std']:.1f}"])
+            s = profile.tables[name].columns[col]
+            stats_rows.append([f"{name}.{col}", fmt(s.min), fmt(s.max), fmt(s.mean), fmt(s.std)])
         
         t = Table(stats_rows, colWidths=[2*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch])
         t.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.lightgrey), ('GRID',(0,0),(-1,-1),1,colors.black)]))
@@ -272,115 +303,92 @@ class QualityReportPDF:
 
         return elements
 
-    def _create_category_distribution_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_category_distribution_page(self, profile: DatasetProfile):
         cat_cols = []
-        for name, df in data.items():
-            cols = df.select_dtypes(include=['object', 'category', 'bool']).columns
-            for c in cols:
-                cat_cols.append((name, c))
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                if col_profile.kind == "categorical":
+                    cat_cols.append((name, col_profile))
         
         if not cat_cols:
             return []
 
         elements = [Paragraph("Section 6: Category Distribution Analysis", self.styles['SectionHeader'])]
         # 7. Category Frequency Distribution (Top 10)
-        name, col = cat_cols[0]
-        counts = data[name][col].value_counts().head(10)
-        plt.figure(figsize=(6, 4))
-        counts.plot(kind='barh', color='darkorange')
-        plt.title(f"Top 10 Frequencies: {name}.{col}")
-        elements.append(self._plot_to_image())
+        name, col_profile = cat_cols[0]
+        counts = col_profile.top_values
+        elements.append(self._chart("bar", labels=list(counts.keys()), values=list(counts.values()),
+                                    title=f"Top 10 Frequencies: {name}.{col_profile.name}", color='darkorange',
+                                    horizontal=True))
         
         # 8. Top 5 vs Bottom 5 Comparison
         if len(counts) > 5:
-            top5 = counts.head(5)
-            bot5 = data[name][col].value_counts().tail(5)
-            plt.figure(figsize=(6, 4))
-            plt.subplot(1,2,1); top5.plot(kind='bar', title='Top 5')
-            plt.subplot(1,2,2); bot5.plot(kind='bar', title='Bottom 5')
-            plt.tight_layout()
-            elements.append(self._plot_to_image())
+            top5 = dict(list(counts.items())[:5])
+            elements.append(self._chart("top_bottom", top=top5, bottom=col_profile.bottom_values))
 
         # 12. Value Count for Boolean Columns
-        bool_found = False
-        for name, df in data.items():
-            b_cols = df.select_dtypes(include=['bool']).columns
-            if not b_cols.empty:
-                col = b_cols[0]
-                counts = df[col].value_counts()
-                plt.figure(figsize=(6, 3))
-                counts.plot(kind='pie', autopct='%1.1f%%', colors=['#3B82F6', '#EF4444'])
-                plt.title(f"Boolean Ratio: {name}.{col}")
-                elements.append(self._plot_to_image(height=3))
-                bool_found = True
+        for name, col_profile in cat_cols:
+            if col_profile.dtype in ("bool", "boolean"):
+                counts = col_profile.top_values
+                elements.append(self._chart("pie", figsize=(6, 3), height=3,
+                                            labels=list(counts.keys()), values=list(counts.values()),
+                                            title=f"Boolean Ratio: {name}.{col_profile.name}"))
                 break
 
         return elements
 
-    def _create_time_series_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_time_series_page(self, profile: DatasetProfile):
         elements = []
         
         # 9. Time-Series Trend Chart (Records per Month)
-        ts_found = False
-        for name, df in data.items():
-            date_cols = [c for c in df.columns if 'date' in c.lower()]
+        for name, table in profile.tables.items():
+            date_cols = [c for c in table.columns if 'date' in c.lower()]
             if date_cols:
-                if not ts_found:
-                    elements.append(Paragraph("Section 7: Time-Series Analysis", self.styles['SectionHeader']))
-                    ts_found = True
-                d_col = date_cols[0]
-                dates = pd.to_datetime(df[d_col], errors='coerce')
-                ts = dates.groupby(dates.dt.to_period('M')).size()
-                plt.figure(figsize=(6, 4))
-                ts.plot(marker='o', color='teal')
-                plt.title(f"Monthly Records Trend ({name})")
-                elements.append(self._plot_to_image())
+                elements.append(Paragraph("Section 7: Time-Series Analysis", self.styles['SectionHeader']))
+                ts = table.columns[date_cols[0]].monthly_counts or {}
+                elements.append(self._chart("line", labels=list(ts.keys()), values=list(ts.values()),
+                                            title=f"Monthly Records Trend ({name})"))
                 break
         return elements
 
-    def _create_outlier_page(self, data: Dict[str, pd.DataFrame]):
-        # Check if numeric columns exist
-        has_numeric = False
-        for df in data.values():
-            if not df.select_dtypes(include=[np.number]).columns.empty:
-                has_numeric = True
-                break
-        
-        if not has_numeric:
+    def _create_outlier_page(self, profile: DatasetProfile):
+        num_cols = {
+            name: [c for c in table.columns.values() if c.kind == "numeric"]
+            for name, table in profile.tables.items()
+        }
+        if not any(num_cols.values()):
             return []
 
         elements = [Paragraph("Section 8: Outlier Analysis", self.styles['SectionHeader'])]
         # Outlier count summary
         outlier_data = [["Table.Column", "Outlier Count", "Percentage"]]
-        for name, df in data.items():
-            num_cols = df.select_dtypes(include=[np.number]).columns
-            for col in num_cols[:2]: # limit
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
-                iqr = q3 - q1
-                count = len(df[(df[col] < (q1 - 1.5 * iqr)) | (df[col] > (q3 + 1.5 * iqr))])
-                outlier_data.append([f"{name}.{col}", str(count), f"{count/len(df)*100:.1f}%"])
+        for name, cols in num_cols.items():
+            row_count = profile.tables[name].row_count
+            for col_profile in cols[:2]: # limit
+                count = col_profile.outlier_count or 0
+                pct = count / row_count * 100 if row_count else 0.0
+                outlier_data.append([f"{name}.{col_profile.name}", str(count), f"{pct:.1f}%"])
         
         t = Table(outlier_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
         t.setStyle(TableStyle([('GRID',(0,0),(-1,-1),1,colors.black),('BACKGROUND',(0,0),(-1,0),colors.whitesmoke)]))
         elements.append(t)
         return elements
 
-    def _create_correlation_page(self, data: Dict[str, pd.DataFrame]):
+    def _create_correlation_page(self, profile: DatasetProfile, data: Dict[str, pd.DataFrame]):
         elements = []
         
         # 11. Correlation Heatmap
-        corr_found = False
-        for name, df in data.items():
-            num_df = df.select_dtypes(include=[np.number])
-            if len(num_df.columns) >= 2:
-                if not corr_found:
-                    elements.append(Paragraph("Section 9: Correlation Analysis", self.styles['SectionHeader']))
-                    corr_found = True
-                plt.figure(figsize=(6, 5))
-                sns.heatmap(num_df.corr(), annot=True, cmap='coolwarm', fmt=".2f")
-                plt.title(f"Correlation Heatmap: {name}")
-                elements.append(self._plot_to_image())
+        for name, table in profile.tables.items():
+            num_cols = [col for col, c in table.columns.items() if c.kind == "numeric"]
+            if len(num_cols) >= 2:
+                elements.append(Paragraph("Section 9: Correlation Analysis", self.styles['SectionHeader']))
+                if table.correlations:
+                    corr = pd.DataFrame(table.correlations).loc[num_cols, num_cols]
+                else:
+                    # Correlations were skipped by the validation budget; use the chart sample
+                    corr = data[name][num_cols].corr()
+                elements.append(self._chart("heatmap", figsize=(6, 5), labels=num_cols,
+                                            matrix=corr.to_numpy().tolist(), title=f"Correlation Heatmap: {name}"))
                 break
         return elements
 
@@ -388,9 +396,15 @@ class QualityReportPDF:
         elements = [Paragraph("Section 10: Final Score Breakdown", self.styles['SectionHeader'])]
         score_data = [["Category", "Score", "Weight", "Contribution"]]
         from config import SCORING_WEIGHTS
+        # Categories whose checks were all skipped are not evaluated; the rest share their weight
+        evaluated = sum(w for cat, w in SCORING_WEIGHTS.items() if cat in qa_results.category_scores) or 1.0
         for cat, weight in SCORING_WEIGHTS.items():
-            score = qa_results.category_scores.get(cat, 0.0)
-            score_data.append([cat.replace('_',' ').title(), f"{score:.1f}", f"{weight*100}%", f"{score*weight:.2f}"])
+            if cat not in qa_results.category_scores:
+                score_data.append([cat.replace('_',' ').title(), "Not evaluated", f"{weight*100}%", "-"])
+                continue
+            score = qa_results.category_scores[cat]
+            score_data.append([cat.replace('_',' ').title(), f"{score:.1f}", f"{weight*100}%",
+                               f"{score*weight/evaluated:.2f}"])
         score_data.append(["TOTAL", f"{qa_results.overall_score}", "100%", f"{qa_results.overall_score}"])
         
         t = Table(score_data, colWidths=[2.5*inch, 1*inch, 1*inch, 1.2*inch])
@@ -4,64 +4,197 @@ Advanced data quality validation engine with 8 mandatory check categories.
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, List, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Sequence, Tuple
 from datetime import datetime
 import json
 from scipy import stats
 
 from models import (
     ChallengeInput, Schema, QAResults, ValidationCheckResult,
-    TableDefinition, ColumnDefinition
+    TableDefinition, ColumnDefinition, DatasetProfile, ForeignKeyCheckResult
 )
+from data_profiler import profile_dataset, proportion_margin, correlation_bounds
+from referential_integrity import check_relationships
+from validation_cache import table_fingerprint
 from config import (
     QUALITY_APPROVED_THRESHOLD, QUALITY_REGENERATE_THRESHOLD,
-    SCORING_WEIGHTS, DIFFICULTY_CONFIG
+    SCORING_WEIGHTS, DIFFICULTY_CONFIG,
+    APPROXIMATE_VALIDATION_MIN_ROWS, VALIDATION_SAMPLE_ROWS, VALIDATION_WORKERS,
+    CHECK_COST_CLASSES
 )
 
 logger = logging.getLogger(__name__)
 
+
+def _score_bound(score_fn: Callable[[float], float], estimate: float, margin: float) -> float:
+    """Largest change in score between the estimate and either end of estimate +/- margin."""
+    if not margin:
+        return 0.0
+    score = score_fn(estimate)
+    return max(abs(score_fn(estimate - margin) - score), abs(score_fn(estimate + margin) - score))
+
+
+def _mean_bound(scores: Sequence[float], low: Sequence[float], high: Sequence[float]) -> float:
+    """Bound on an averaged score given per-item scores at both ends of their intervals."""
+    if not scores:
+        return 0.0
+    avg = sum(scores) / len(scores)
+    return max(abs(sum(low) / len(low) - avg), abs(sum(high) / len(high) - avg))
+
+
+class CheckOutcome:
+    """What a check returns; the validator adds its name, category and timing."""
+
+    def __init__(self, passed: bool, score: float, message: str, details: Optional[Dict] = None,
+                 error_bound: float = 0.0, failures: Optional[List[str]] = None):
+        self.passed = passed
+        self.score = score
+        self.message = message
+        self.details = details
+        self.error_bound = error_bound
+        self.failures = failures or []  # Hard-rule failures that force regeneration
+
+
+class CheckSpec:
+    """A registered quality check, the validation inputs it reads and what it is worth."""
+
+    def __init__(self, name: str, category: str, func: Callable[..., CheckOutcome], inputs: Tuple[str, ...],
+                 weight: float = 1.0, cost: str = "low"):
+        self.name = name
+        self.category = category
+        self.func = func
+        self.inputs = inputs
+        self.weight = weight  # Relative value when a time budget forces a choice
+        self.cost = cost  # Key of CHECK_COST_CLASSES
+
+    def estimated_seconds(self, rows: int) -> float:
+        fixed, per_million = CHECK_COST_CLASSES[self.cost]
+        return fixed + per_million * rows / 1_000_000
+
+
+# Inputs a check can declare: "schema", "data" and "input_data" as passed to validate(),
+# "profile" (DatasetProfile), "relationships" (FK results) and "correlations"
+# (per-table correlation matrices, only computed when a selected check needs them)
+CHECK_INPUTS = ("schema", "data", "input_data", "profile", "relationships", "correlations")
+
+# Checks run in registration order; results and failure reasons are reported in that order
+CHECK_REGISTRY: Dict[str, CheckSpec] = {}
+
+
+def register_check(name: str, category: str, inputs: Sequence[str] = ("profile",),
+                   weight: float = 1.0, cost: str = "low"):
+    """Register a QualityValidator method (or any function taking the validator first) as a check."""
+    unknown = set(inputs) - set(CHECK_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown check inputs for '{name}': {', '.join(sorted(unknown))}")
+    if cost not in CHECK_COST_CLASSES:
+        raise ValueError(f"Unknown cost class '{cost}' for '{name}'. Choose from: {', '.join(CHECK_COST_CLASSES)}")
+
+    def decorator(func):
+        CHECK_REGISTRY[name] = CheckSpec(name, category, func, tuple(inputs), weight, cost)
+        return func
+    return decorator
+
+
+def select_checks(checks: List[CheckSpec], rows: int, time_budget: Optional[float] = None) -> List[CheckSpec]:
+    """
+    The most valuable checks whose estimated cost fits time_budget (seconds), in registry order.
+
+    Checks are taken greedily by weight per estimated second; None runs everything.
+    """
+    if time_budget is None:
+        return list(checks)
+    by_value = sorted(checks, key=lambda c: c.weight / max(c.estimated_seconds(rows), 1e-9), reverse=True)
+    selected, spent = set(), 0.0
+    for spec in by_value:
+        cost = spec.estimated_seconds(rows)
+        if spent + cost <= time_budget:
+            selected.add(spec.name)
+            spent += cost
+    return [spec for spec in checks if spec.name in selected]
+
+
 class QualityValidator:
     """Validate generated dataset against 8 mandatory quality categories."""
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, workers: int = VALIDATION_WORKERS):
         self.session_id = session_id
+        self.workers = workers
         self.results: List[ValidationCheckResult] = []
         self.regeneration_needed = False
         self.failure_reasons = []
+        self.profile: Optional[DatasetProfile] = None
+        self.fingerprints: Dict[str, str] = {}
 
-    def validate(self, schema: Schema, data: Dict[str, pd.DataFrame], input_data: ChallengeInput) -> QAResults:
-        """Run comprehensive validation suite."""
+    def validate(self, schema: Schema, data: Dict[str, pd.DataFrame], input_data: ChallengeInput,
+                 time_budget: Optional[float] = None,
+                 duplicate_rows: Optional[Dict[str, np.ndarray]] = None) -> QAResults:
+        """
+        Run comprehensive validation suite.
+
+        With a time_budget (seconds), only the most valuable registered checks
+        whose estimated cost fits are run; the rest are listed as skipped.
+        duplicate_rows (DatasetGenerator.duplicate_rows) are the row positions the
+        writers emit twice; tables are profiled as they will be written.
+        """
+        duplicate_rows = duplicate_rows or {}
         logger.info(f"Starting advanced quality validation for session {self.session_id}")
         self.results = []
         self.regeneration_needed = False
         self.failure_reasons = []
-        
-        # 1. Structural Integrity
-        self._check_structural_integrity(schema, data, input_data)
-        
-        # 2. Completeness & Null Analysis
-        self._check_completeness(schema, data)
-        
-        # 3. Duplicate Analysis
-        self._check_duplicates(schema, data)
-        
-        # 4. Distribution Analysis
-        self._check_distributions(schema, data)
-        
-        # 5. Numeric Range Validation
-        self._check_numeric_ranges(schema, data)
-        
-        # 6. Time-Series Validation
-        self._check_time_series(schema, data)
-        
-        # 7. Outlier & Anomaly Check
-        self._check_outliers_anomalies(schema, data)
-        
-        # 8. Correlation Analysis
-        self._check_correlations(schema, data)
+
+        checks = select_checks(list(CHECK_REGISTRY.values()), self._profiled_rows(data), time_budget)
+        skipped = [name for name in CHECK_REGISTRY if name not in {spec.name for spec in checks}]
+        if skipped:
+            logger.info(f"Skipping checks outside the {time_budget}s budget: {', '.join(skipped)}")
+        needed = {name for spec in checks for name in spec.inputs}
+
+        inputs = {"schema": schema, "data": data, "input_data": input_data}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Per-table results are cached by content fingerprint, so unchanged tables are not re-profiled
+            self.fingerprints = dict(zip(data, executor.map(
+                table_fingerprint, data.values(), [duplicate_rows.get(name) for name in data])))
+
+            # Only the inputs some registered check declares are built
+            relationships = None
+            if "relationships" in needed:
+                relationships = executor.submit(check_relationships, schema, data, fingerprints=self.fingerprints,
+                                                duplicate_rows=duplicate_rows)
+            if needed & {"profile", "correlations"}:
+                # Profile every table once; checks score from the shared profile. Very large
+                # tables are profiled from a row sample and scores carry error bounds.
+                # This runs here and fans tables out to the pool, so no pool task waits on another.
+                inputs["profile"] = profile_dataset(
+                    schema, data, approximate_above=APPROXIMATE_VALIDATION_MIN_ROWS,
+                    sample_rows=VALIDATION_SAMPLE_ROWS, fingerprints=self.fingerprints, executor=executor,
+                    correlations="correlations" in needed, duplicate_rows=duplicate_rows)
+                inputs["correlations"] = {name: t.correlations for name, t in inputs["profile"].tables.items()}
+            if relationships is not None:
+                inputs["relationships"] = relationships.result()
+            logger.info(f"Validation inputs for {len(data)} tables ready in {time.perf_counter() - start:.2f}s")
+
+            futures = [executor.submit(self._run_check, spec, inputs) for spec in checks]
+            outcomes = [future.result() for future in futures]
+
+        self.profile = inputs.get("profile")
+        approximate = bool(self.profile) and any(t.sampled_rows for t in self.profile.tables.values())
+        if approximate:
+            logger.info(f"Approximate validation: tables over {APPROXIMATE_VALIDATION_MIN_ROWS:,} rows "
+                        f"profiled from {VALIDATION_SAMPLE_ROWS:,}-row samples")
+
+        # Aggregate in registry order so results do not depend on thread scheduling
+        for result, failures in outcomes:
+            self.results.append(result)
+            if failures:
+                self.regeneration_needed = True
+                self.failure_reasons.extend(failures)
 
         # Calculate scores
-        category_scores = self._calculate_category_scores()
+        category_scores = self._calculate_category_scores(skipped)
         overall_score = self._calculate_overall_score(category_scores)
         
         # Hard Rules for Regeneration
@@ -83,21 +216,45 @@ class QualityValidator:
             checks=self.results,
             strengths=self._generate_strengths(),
             issues=self._generate_issues() + self.failure_reasons,
-            generated_at=datetime.now()
+            generated_at=datetime.now(),
+            approximate=approximate,
+            skipped_checks=skipped
+        )
+
+    @staticmethod
+    def _profiled_rows(data: Dict[str, pd.DataFrame]) -> int:
+        """Rows the profile will actually read, counting sampled tables at their sample size."""
+        rows = 0
+        for df in data.values():
+            sampled = len(df) > max(APPROXIMATE_VALIDATION_MIN_ROWS, VALIDATION_SAMPLE_ROWS)
+            rows += VALIDATION_SAMPLE_ROWS if sampled else len(df)
+        return rows
+
+    def _run_check(self, spec: CheckSpec, inputs: Dict[str, Any]) -> Tuple[ValidationCheckResult, List[str]]:
+        """Run one check on its declared inputs, recording its wall time in the result details."""
+        start = time.perf_counter()
+        outcome = spec.func(self, **{name: inputs[name] for name in spec.inputs})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        details = dict(outcome.details or {})
+        details["wall_time_ms"] = round(elapsed_ms, 2)
+        result = ValidationCheckResult(
+            check_name=spec.name,
+            category=spec.category,
+            passed=outcome.passed,
+            score=outcome.score,
+            message=outcome.message,
+            details=details,
+            error_bound=round(outcome.error_bound, 2)
         )
+        return result, outcome.failures
 
-    def _add_result(self, name: str, category: str, passed: bool, score: float, message: str, details: Dict = None):
-        self.results.append(ValidationCheckResult(
-            check_name=name,
-            category=category,
-            passed=passed,
-            score=score,
-            message=message,
-            details=details
-        ))
-
-    def _check_structural_integrity(self, schema: Schema, data: Dict[str, pd.DataFrame], input_data: ChallengeInput):
+    @register_check("Structural Integrity", "technical_integrity",
+                    inputs=("schema", "profile", "relationships", "input_data"), weight=3.0, cost="medium")
+    def _check_structural_integrity(self, schema: Schema, profile: DatasetProfile,
+                                    relationships: List[ForeignKeyCheckResult], input_data: ChallengeInput) -> "CheckOutcome":
         """Check PKs, FKs, Orphans, Row/Col counts, Types."""
+        failures = []
         issues = []
         scores = []
         
@@ -111,25 +268,21 @@ class QualityValidator:
         
         # PK Uniqueness
         for table in schema.tables:
-            if table.name in data:
-                df = data[table.name]
-                if df[table.primary_key].duplicated().any():
+            if table.name in profile.tables:
+                if not profile.tables[table.name].primary_key_unique:
                     issues.append(f"Duplicate PKs in {table.name}")
                     scores.append(0)
                 else:
                     scores.append(10)
 
         # FK Validity & Orphans
-        for fk in schema.relationships:
-            if fk.child_table in data and fk.parent_table in data:
-                child_vals = data[fk.child_table][fk.child_column].dropna().unique()
-                parent_vals = set(data[fk.parent_table][fk.parent_column].unique())
-                orphans = [v for v in child_vals if v not in parent_vals]
-                if orphans:
-                    issues.append(f"Orphan records in {fk.child_table}.{fk.child_column}")
-                    scores.append(0)
-                else:
-                    scores.append(10)
+        for fk in relationships:
+            if not fk.passed:
+                issues.append(f"Orphan records in {fk.child_table}.{fk.child_column} "
+                              f"({fk.orphan_rows:,} rows, e.g. {', '.join(fk.sample_orphans)})")
+                scores.append(0)
+            else:
+                scores.append(10)
 
         # Column counts
         if abs(total_cols - expected_cols) > 5:
@@ -141,176 +294,248 @@ class QualityValidator:
         avg_score = sum(scores)/len(scores) if scores else 0
         passed = avg_score > 8
         if not passed:
-            self.regeneration_needed = True
-            self.failure_reasons.append("Structural integrity broken")
+            failures.append("Structural integrity broken")
             
-        self._add_result("Structural Integrity", "technical_integrity", passed, avg_score, 
-                        "; ".join(issues) if issues else "Structural integrity verified.")
+        return CheckOutcome(passed, avg_score, 
+                        "; ".join(issues) if issues else "Structural integrity verified.",
+                        {"relationships": [fk.model_dump() for fk in relationships]},
+                        failures=failures)
 
-    def _check_completeness(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Completeness & Null Analysis", "technical_integrity", weight=2.0)
+    def _check_completeness(self, profile: DatasetProfile) -> "CheckOutcome":
         """Null Analysis: Required <2%, Optional 2-5%, >10% check."""
-        scores = []
+        failures = []
+        def null_score(pct: float) -> float:
+            if pct > 10:
+                return 0
+            if pct > 5:
+                return 7
+            return 10
+
+        scores, low, high = [], [], []
         high_null_cols = []
         
-        for name, df in data.items():
-            null_pcts = df.isnull().mean() * 100
-            for col, pct in null_pcts.items():
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                pct = col_profile.null_pct
+                margin = proportion_margin(pct / 100, table) * 100
                 if pct > 10:
                     high_null_cols.append(f"{name}.{col} ({pct:.1f}%)")
-                    scores.append(0)
-                elif pct > 5:
-                    scores.append(7)
-                else:
-                    scores.append(10)
+                scores.append(null_score(pct))
+                low.append(null_score(pct + margin))
+                high.append(null_score(pct - margin))
         
         avg_score = sum(scores)/len(scores) if scores else 10
         passed = avg_score >= 8
         if len(high_null_cols) > 3:
-            self.regeneration_needed = True
-            self.failure_reasons.append("Unrealistic null percentages")
+            failures.append("Unrealistic null percentages")
 
-        self._add_result("Completeness & Null Analysis", "technical_integrity", passed, avg_score,
-                        f"Found {len(high_null_cols)} columns with high nulls." if high_null_cols else "Null distributions are realistic.")
+        return CheckOutcome(passed, avg_score,
+                        f"Found {len(high_null_cols)} columns with high nulls." if high_null_cols else "Null distributions are realistic.",
+                        error_bound=_mean_bound(scores, low, high),
+                        failures=failures)
 
-    def _check_duplicates(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Duplicate Analysis", "technical_integrity", weight=2.0)
+    def _check_duplicates(self, profile: DatasetProfile) -> "CheckOutcome":
         """Check for PK, Composite and Near-duplicates."""
+        failures = []
         total_dup_pct = 0
-        for name, df in data.items():
-            dup_pct = df.duplicated().mean() * 100
+        total_margin = 0
+        for name, table in profile.tables.items():
+            dup_pct = table.duplicate_row_count / table.row_count * 100 if table.row_count else 0
             total_dup_pct += dup_pct
+            total_margin += table.duplicate_margin / table.row_count * 100 if table.row_count else 0
             
-        avg_dup = total_dup_pct / len(data) if data else 0
+        avg_dup = total_dup_pct / len(profile.tables) if profile.tables else 0
+        avg_margin = total_margin / len(profile.tables) if profile.tables else 0
         passed = avg_dup <= 3.0
-        score = max(0, 10 - avg_dup * 2)
+        score_fn = lambda dup: max(0, 10 - max(dup, 0) * 2)
+        score = score_fn(avg_dup)
         
         if avg_dup > 5.0:
-            self.regeneration_needed = True
-            self.failure_reasons.append("Excessive duplicate records")
+            failures.append("Excessive duplicate records")
 
-        self._add_result("Duplicate Analysis", "technical_integrity", passed, score,
-                        f"Average duplicate rate: {avg_dup:.2f}% (Threshold: 3%).")
+        return CheckOutcome(passed, score,
+                        f"Average duplicate rate: {avg_dup:.2f}% (Threshold: 3%).",
+                        error_bound=_score_bound(score_fn, avg_dup, avg_margin),
+                        failures=failures)
 
-    def _check_distributions(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Distribution Analysis", "realism_distribution", weight=1.5)
+    def _check_distributions(self, profile: DatasetProfile) -> "CheckOutcome":
         """Check for uniform distributions and skewness."""
+        failures = []
         is_uniform = False
-        scores = []
+        scores, low, high = [], [], []
+        # Check if all counts are nearly equal (Uniform): very low variance in frequencies
+        std_score = lambda std: 0 if std < 0.05 else 10
         
-        for name, df in data.items():
-            cat_cols = df.select_dtypes(include=['category', 'object', 'bool']).columns
-            for col in cat_cols:
-                counts = df[col].value_counts(normalize=True)
-                if len(counts) > 1:
-                    # Check if all counts are nearly equal (Uniform)
-                    std = counts.std()
-                    if std < 0.05: # Very low variance in frequencies
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                if col_profile.kind != "categorical":
+                    continue
+                # Std of normalized value frequencies; None when fewer than two values occur
+                std = col_profile.frequency_std
+                if std is not None:
+                    if std < 0.05:
                         is_uniform = True
-                        scores.append(0)
-                    else:
-                        scores.append(10)
+                    # Moving each of k frequencies by at most m moves their std by at most m*sqrt(k/(k-1))
+                    k = col_profile.distinct_count or 2
+                    margin = proportion_margin(0.5, table) * np.sqrt(k / (k - 1))
+                    scores.append(std_score(std))
+                    low.append(std_score(std - margin))
+                    high.append(std_score(std + margin))
         
         avg_score = sum(scores)/len(scores) if scores else 10
         if is_uniform:
-            self.regeneration_needed = True
-            self.failure_reasons.append("Distributions look uniform/artificially flat")
+            failures.append("Distributions look uniform/artificially flat")
 
-        self._add_result("Distribution Analysis", "realism_distribution", not is_uniform, avg_score,
-                        "Distributions are realistic and show natural variance." if not is_uniform else "Warning: Flat distributions detected.")
+        return CheckOutcome(not is_uniform, avg_score,
+                        "Distributions are realistic and show natural variance." if not is_uniform else "Warning: Flat distributions detected.",
+                        error_bound=_mean_bound(scores, low, high),
+                        failures=failures)
 
-    def _check_numeric_ranges(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Numeric Range Validation", "technical_integrity")
+    def _check_numeric_ranges(self, profile: DatasetProfile) -> "CheckOutcome":
         """Min/Max, Mean/Median, Outliers, Negative checks."""
+        failures = []
         issues = []
-        for name, df in data.items():
-            num_cols = df.select_dtypes(include=[np.number]).columns
-            for col in num_cols:
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                if col_profile.kind != "numeric":
+                    continue
                 # Basic unrealistic check (e.g. negative prices)
                 if any(x in col.lower() for x in ['price', 'amount', 'total', 'quantity']):
-                    if (df[col] < 0).any():
+                    if col_profile.negative_count:
                         issues.append(f"Negative values in {name}.{col}")
         
         passed = len(issues) == 0
-        self._add_result("Numeric Range Validation", "technical_integrity", passed, 10 if passed else 5,
-                        "Numeric ranges are realistic." if passed else "; ".join(issues))
+        return CheckOutcome(passed, 10 if passed else 5,
+                        "Numeric ranges are realistic." if passed else "; ".join(issues),
+                        failures=failures)
 
-    def _check_time_series(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Time-Series Validation", "realism_distribution", weight=1.5, cost="medium")
+    def _check_time_series(self, profile: DatasetProfile) -> "CheckOutcome":
         """Seasonality, Seasonality, Flat Trend checks."""
+        failures = []
         is_flat = False
+        flat_low = flat_high = False  # Flatness at either end of the sampled CV intervals
         date_cols_found = False
-        for name, df in data.items():
-            date_cols = [c for c in df.columns if 'date' in c.lower()]
+        for name, table in profile.tables.items():
+            date_cols = [c for c in table.columns if 'date' in c.lower()]
             if date_cols:
                 date_cols_found = True
                 d_col = date_cols[0]
-                # Convert to datetime if not already
-                if not pd.api.types.is_datetime64_any_dtype(df[d_col]):
-                    df[d_col] = pd.to_datetime(df[d_col], errors='coerce')
-                
-                counts = df.groupby(df[d_col].dt.to_period('M')).size()
+                counts = pd.Series(table.columns[d_col].monthly_counts or {}, dtype=float)
                 if len(counts) > 2:
                     std = counts.std() / counts.mean()
                     if std < 0.1: # Very flat trend
                         is_flat = True
+                    # CV = std/mean of the k monthly shares, whose mean is exactly 1/k
+                    k = len(counts)
+                    share = counts.max() / counts.sum()
+                    margin = proportion_margin(share, table) * np.sqrt(k / (k - 1)) * k
+                    flat_low = flat_low or std - margin < 0.1
+                    flat_high = flat_high or std + margin < 0.1
         
         if date_cols_found and is_flat:
-            self.regeneration_needed = True
-            self.failure_reasons.append("No seasonal variation or flat-line trend")
+            failures.append("No seasonal variation or flat-line trend")
 
-        self._add_result("Time-Series Validation", "realism_distribution", not is_flat, 10 if not is_flat else 4,
-                        "Time-series data shows realistic variation." if not is_flat else "Detected artificial flat trend.")
+        score = 10 if not is_flat else 4
+        bound = 6 if date_cols_found and (flat_low != is_flat or flat_high != is_flat) else 0
+        return CheckOutcome(not is_flat, score,
+                        "Time-series data shows realistic variation." if not is_flat else "Detected artificial flat trend.",
+                        error_bound=bound,
+                        failures=failures)
 
-    def _check_outliers_anomalies(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Outlier & Anomaly Check", "realism_distribution")
+    def _check_outliers_anomalies(self, profile: DatasetProfile) -> "CheckOutcome":
         """Outlier % (5-10% ideal), Impossible combinations."""
+        failures = []
         outlier_pcts = []
-        for name, df in data.items():
-            num_cols = df.select_dtypes(include=[np.number]).columns
-            for col in num_cols:
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
-                iqr = q3 - q1
-                outlier_count = ((df[col] < (q1 - 1.5 * iqr)) | (df[col] > (q3 + 1.5 * iqr))).sum()
-                outlier_pcts.append(outlier_count / len(df) * 100)
+        margins = []
+        for name, table in profile.tables.items():
+            for col, col_profile in table.columns.items():
+                if col_profile.kind != "numeric" or not table.row_count:
+                    continue
+                pct = col_profile.outlier_count / table.row_count * 100
+                outlier_pcts.append(pct)
+                margins.append(proportion_margin(pct / 100, table) * 100)
         
         avg_outlier = sum(outlier_pcts)/len(outlier_pcts) if outlier_pcts else 7.0
+        avg_margin = sum(margins)/len(margins) if margins else 0.0
         # Target: 5-10%
-        if avg_outlier < 1.0 or avg_outlier > 20.0:
-            self.regeneration_needed = True
-            self.failure_reasons.append(f"Unrealistic outlier percentage ({avg_outlier:.1f}%)")
-            score = 3
-        else:
-            score = 10
+        score_fn = lambda pct: 3 if pct < 1.0 or pct > 20.0 else 10
+        score = score_fn(avg_outlier)
+        if score < 10:
+            failures.append(f"Unrealistic outlier percentage ({avg_outlier:.1f}%)")
             
-        self._add_result("Outlier & Anomaly Check", "realism_distribution", score > 5, score,
-                        f"Outlier percentage: {avg_outlier:.1f}% (Ideal: 5-10%).")
+        return CheckOutcome(score > 5, score,
+                        f"Outlier percentage: {avg_outlier:.1f}% (Ideal: 5-10%).",
+                        error_bound=_score_bound(score_fn, avg_outlier, avg_margin),
+                        failures=failures)
 
-    def _check_correlations(self, schema: Schema, data: Dict[str, pd.DataFrame]):
+    @register_check("Correlation Matrix Analysis", "realism_distribution",
+                    inputs=("profile", "correlations"), cost="high")
+    def _check_correlations(self, profile: DatasetProfile,
+                            correlations: Dict[str, Dict[str, Dict[str, float]]]) -> "CheckOutcome":
         """Correlation Analysis (Random vs Synthetic Logic)."""
+        failures = []
         is_synthetic_smell = False
-        for name, df in data.items():
-            num_df = df.select_dtypes(include=[np.number])
-            if len(num_df.columns) > 1:
-                corr = num_df.corr().abs()
+        smell_low = smell_high = False  # Verdict at either end of the sampled correlation intervals
+        for name, table in profile.tables.items():
+            corr = correlations.get(name, {})
+            if len(corr) > 1:
+                near_perfect = sum(1 for row in corr.values() for v in row.values() if abs(v) > 0.99)
                 # If everything is perfectly correlated or perfectly zero
-                if (corr > 0.99).sum().sum() > len(num_df.columns):
+                if near_perfect > len(corr):
                     is_synthetic_smell = True
+                if table.sampled_rows:
+                    abs_bounds = []
+                    for row in corr.values():
+                        for v in row.values():
+                            lo, hi = correlation_bounds(v, table)
+                            abs_bounds.append((0.0 if lo <= 0 <= hi else min(abs(lo), abs(hi)),
+                                               max(abs(lo), abs(hi))))
+                    smell_low = smell_low or sum(1 for lo, _ in abs_bounds if lo > 0.99) > len(corr)
+                    smell_high = smell_high or sum(1 for _, hi in abs_bounds if hi > 0.99) > len(corr)
+                else:
+                    smell_low = smell_low or near_perfect > len(corr)
+                    smell_high = smell_high or near_perfect > len(corr)
         
         if is_synthetic_smell:
-            self.regeneration_needed = True
-            self.failure_reasons.append("Correlation matrix unrealistic (synthetic smell)")
+            failures.append("Correlation matrix unrealistic (synthetic smell)")
+
+        bound = 8 if (smell_low != is_synthetic_smell or smell_high != is_synthetic_smell) else 0
+        return CheckOutcome(not is_synthetic_smell, 10 if not is_synthetic_smell else 2,
+                        "Correlations between variables are logically sound." if not is_synthetic_smell else "Perfect correlations detected.",
+                        error_bound=bound,
+                        failures=failures)
 
-        self._add_result("Correlation Matrix Analysis", "realism_distribution", not is_synthetic_smell, 10 if not is_synthetic_smell else 2,
-                        "Correlations between variables are logically sound." if not is_synthetic_smell else "Perfect correlations detected.")
+    def _calculate_category_scores(self, skipped: Sequence[str] = ()) -> Dict[str, float]:
+        """
+        Mean check score per category.
 
-    def _calculate_category_scores(self) -> Dict[str, float]:
+        Categories whose checks were all skipped for the time budget are left out
+        (not evaluated) rather than scored.
+        """
+        skipped_categories = {CHECK_REGISTRY[name].category for name in skipped if name in CHECK_REGISTRY}
         scores = {}
         for category in SCORING_WEIGHTS.keys():
             cat_results = [r.score for r in self.results if r.category == category]
-            scores[category] = sum(cat_results) / len(cat_results) if cat_results else 10.0
+            if cat_results:
+                scores[category] = sum(cat_results) / len(cat_results)
+            elif category not in skipped_categories:
+                scores[category] = 10.0
         return scores
 
     def _calculate_overall_score(self, category_scores: Dict[str, float]) -> float:
-        total = 0.0
+        """Weighted mean over the evaluated categories."""
+        total = weights = 0.0
         for cat, weight in SCORING_WEIGHTS.items():
-            total += category_scores.get(cat, 0.0) * weight
-        return round(total, 1)
+            if cat in category_scores:
+                total += category_scores[cat] * weight
+                weights += weight
+        return round(total / weights, 1) if weights else 0.0
 
     def _generate_strengths(self) -> List[str]:
         return [r.message for r in self.results if r.passed and r.score >= 9.0][:3]
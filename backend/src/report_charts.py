@@ -0,0 +1,395 @@
+"""
+Chart renderers for the quality report.
+
+Each renderer draws one chart on its own matplotlib Figure (no pyplot state)
+from plain, picklable inputs, so charts can be rendered in worker processes
+and returned as image bytes. Rendered images are cached on disk by a hash of
+the chart kind, its inputs and style, so unchanged charts are not re-rendered.
+
+The simple chart kinds (bars, histograms, pies, lines) can also be built as
+reportlab vector drawings, which are embedded natively in the PDF without
+rasterizing.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.colors import to_hex
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from reportlab.graphics.charts.barcharts import HorizontalBarChart, VerticalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+
+from config import CHART_CACHE_DIR, CHART_CACHE_MAX_BYTES, PARALLEL_CHART_MIN_COUNT
+
+logger = logging.getLogger(__name__)
+
+CHART_DPI = 80
+CHART_STYLE_VERSION = 1  # Bump when a renderer's output changes to invalidate cached images
+
+# (kind, params, figsize)
+ChartRequest = Tuple[str, Dict[str, Any], Tuple[float, float]]
+
+
+def _bar(fig: Figure, labels: Sequence[str], values: Sequence[float], title: str,
+         palette: str = None, color: str = None, horizontal: bool = False, rotate: int = 0):
+    ax = fig.add_subplot()
+    if palette:
+        x, y = (values, labels) if horizontal else (labels, values)
+        sns.barplot(x=x, y=y, palette=palette, hue=list(labels), legend=False, ax=ax)
+    elif horizontal:
+        ax.barh(labels, values, color=color)
+    else:
+        ax.bar(labels, values, color=color)
+    ax.set_title(title)
+    if rotate:
+        ax.tick_params(axis='x', labelrotation=rotate)
+
+
+def _histogram(fig: Figure, values: Sequence[float], title: str):
+    ax = fig.add_subplot()
+    sns.histplot(np.asarray(values), kde=False, color='skyblue', bins=30, ax=ax)
+    ax.set_title(title)
+
+
+def _boxplot(fig: Figure, values: Sequence[float], title: str):
+    ax = fig.add_subplot()
+    sns.boxplot(x=np.asarray(values), color='lightgreen', ax=ax)
+    ax.set_title(title)
+
+
+def _top_bottom(fig: Figure, top: Dict[str, float], bottom: Dict[str, float]):
+    for i, (counts, title) in enumerate([(top, 'Top 5'), (bottom, 'Bottom 5')], start=1):
+        ax = fig.add_subplot(1, 2, i)
+        pd.Series(counts).plot(kind='bar', title=title, ax=ax)
+    fig.tight_layout()
+
+
+def _pie(fig: Figure, labels: Sequence[str], values: Sequence[float], title: str):
+    ax = fig.add_subplot()
+    ax.pie(values, labels=labels, autopct='%1.1f%%', colors=['#3B82F6', '#EF4444'])
+    ax.set_title(title)
+
+
+def _line(fig: Figure, labels: Sequence[str], values: Sequence[float], title: str):
+    ax = fig.add_subplot()
+    pd.Series(list(values), index=list(labels)).plot(marker='o', color='teal', ax=ax)
+    ax.set_title(title)
+
+
+def _heatmap(fig: Figure, matrix: List[List[float]], labels: Sequence[str], title: str):
+    ax = fig.add_subplot()
+    sns.heatmap(pd.DataFrame(matrix, index=labels, columns=labels), annot=True, cmap='coolwarm', fmt=".2f", ax=ax)
+    ax.set_title(title)
+
+
+RENDERERS: Dict[str, Callable[..., None]] = {
+    "bar": _bar,
+    "histogram": _histogram,
+    "boxplot": _boxplot,
+    "top_bottom": _top_bottom,
+    "pie": _pie,
+    "line": _line,
+    "heatmap": _heatmap,
+}
+
+
+# Vector drawings: sizes are in points, laid out to match the matplotlib renderers above
+
+TITLE_HEIGHT = 20
+MAX_CATEGORY_LABELS = 12  # Longer category axes only label every n-th value
+
+
+def _color(name: str) -> colors.Color:
+    return colors.HexColor(to_hex(name))
+
+
+def _palette(name: str, n: int) -> List[colors.Color]:
+    return [colors.HexColor(c) for c in sns.color_palette(name, n).as_hex()]
+
+
+def _titled(width: float, height: float, title: str) -> Drawing:
+    drawing = Drawing(width, height)
+    drawing.add(String(width / 2, height - TITLE_HEIGHT + 6, title, textAnchor='middle',
+                       fontName='Helvetica-Bold', fontSize=11))
+    return drawing
+
+
+def _sparse_labels(labels: Sequence[str]) -> List[str]:
+    step = max(1, -(-len(labels) // MAX_CATEGORY_LABELS))
+    return [str(label) if i % step == 0 else "" for i, label in enumerate(labels)]
+
+
+def _bar_chart(x: float, y: float, width: float, height: float, labels: Sequence[str],
+               values: Sequence[float], horizontal: bool = False, rotate: int = 0):
+    chart = HorizontalBarChart() if horizontal else VerticalBarChart()
+    chart.x, chart.y, chart.width, chart.height = x, y, width, height
+    chart.data = [[float(v) for v in values]]
+    chart.categoryAxis.categoryNames = _sparse_labels(labels)
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.valueMin = min([0.0, *chart.data[0]])
+    chart.bars.strokeColor = None
+    chart.bars[0].fillColor = _color('C0')
+    if horizontal:
+        chart.categoryAxis.reverseDirection = 1  # First label on top, as in matplotlib/seaborn
+    elif rotate:
+        chart.categoryAxis.labels.angle = rotate
+        chart.categoryAxis.labels.boxAnchor = 'e' if rotate == 90 else 'ne'
+        chart.categoryAxis.labels.dy = -2
+    return chart
+
+
+def _vector_bar(width: float, height: float, labels: Sequence[str], values: Sequence[float], title: str,
+                palette: str = None, color: str = None, horizontal: bool = False, rotate: int = 0) -> Drawing:
+    drawing = _titled(width, height, title)
+    if horizontal:
+        left, bottom = min(width * 0.4, 4 * max((len(str(l)) for l in labels), default=0) + 10), 25
+    else:
+        left, bottom = 45, (8 + 4 * max((len(str(l)) for l in labels), default=0)) if rotate else 25
+    chart = _bar_chart(left, bottom, width - left - 15, height - bottom - TITLE_HEIGHT - 10,
+                       labels, values, horizontal, rotate)
+    if palette:
+        for i, fill in enumerate(_palette(palette, len(labels))):
+            chart.bars[(0, i)].fillColor = fill
+    elif color:
+        chart.bars[0].fillColor = _color(color)
+    drawing.add(chart)
+    return drawing
+
+
+def _vector_histogram(width: float, height: float, values: Sequence[float], title: str) -> Drawing:
+    values = np.asarray(values)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=30)
+    labels = [f"{edge:.3g}" for edge in edges[:-1]]
+    drawing = _titled(width, height, title)
+    chart = _bar_chart(45, 25, width - 60, height - TITLE_HEIGHT - 35, labels, counts)
+    chart.barSpacing = chart.groupSpacing = 0
+    chart.bars[0].fillColor = _color('skyblue')
+    chart.bars[0].strokeColor = colors.white
+    drawing.add(chart)
+    return drawing
+
+
+def _vector_top_bottom(width: float, height: float, top: Dict[str, float], bottom: Dict[str, float]) -> Drawing:
+    drawing = Drawing(width, height)
+    half = width / 2
+    for i, (counts, title) in enumerate([(top, 'Top 5'), (bottom, 'Bottom 5')]):
+        labels = list(counts.keys())
+        label_height = 8 + 4 * max((len(str(l)) for l in labels), default=0)
+        drawing.add(String(half * i + half / 2, height - TITLE_HEIGHT + 6, title, textAnchor='middle',
+                           fontName='Helvetica-Bold', fontSize=11))
+        drawing.add(_bar_chart(half * i + 40, label_height, half - 55, height - label_height - TITLE_HEIGHT - 10,
+                               labels, list(counts.values()), rotate=90))
+    return drawing
+
+
+def _vector_pie(width: float, height: float, labels: Sequence[str], values: Sequence[float], title: str) -> Drawing:
+    drawing = _titled(width, height, title)
+    total = float(sum(values)) or 1.0
+    size = min(width, height - TITLE_HEIGHT) - 50
+    pie = Pie()
+    pie.x, pie.y, pie.width, pie.height = (width - size) / 2, (height - TITLE_HEIGHT - size) / 2, size, size
+    pie.data = [float(v) for v in values]
+    pie.labels = [f"{label} ({v / total:.1%})" for label, v in zip(labels, values)]
+    pie.slices.strokeColor = colors.white
+    pie.slices.fontSize = 8
+    for i, fill in enumerate(['#3B82F6', '#EF4444'][:len(values)]):
+        pie.slices[i].fillColor = colors.HexColor(fill)
+    drawing.add(pie)
+    return drawing
+
+
+def _vector_line(width: float, height: float, labels: Sequence[str], values: Sequence[float], title: str) -> Drawing:
+    drawing = _titled(width, height, title)
+    label_height = 8 + 4 * max((len(str(l)) for l in labels), default=0)
+    chart = HorizontalLineChart()
+    chart.x, chart.y = 45, label_height
+    chart.width, chart.height = width - 60, height - label_height - TITLE_HEIGHT - 10
+    chart.data = [[float(v) for v in values]]
+    chart.categoryAxis.categoryNames = _sparse_labels(labels)
+    chart.categoryAxis.labels.angle = 90
+    chart.categoryAxis.labels.boxAnchor = 'e'
+    chart.categoryAxis.labels.fontSize = 7
+    chart.valueAxis.labels.fontSize = 7
+    chart.lines[0].strokeColor = _color('teal')
+    chart.lines[0].symbol = makeMarker('FilledCircle', size=3, fillColor=_color('teal'), strokeColor=None)
+    drawing.add(chart)
+    return drawing
+
+
+VECTOR_RENDERERS: Dict[str, Callable[..., Drawing]] = {
+    "bar": _vector_bar,
+    "histogram": _vector_histogram,
+    "top_bottom": _vector_top_bottom,
+    "pie": _vector_pie,
+    "line": _vector_line,
+}
+
+
+def vector_chart(kind: str, params: Dict[str, Any], width: float, height: float) -> Optional[Drawing]:
+    """Build a chart as a vector drawing of width x height points, or None if kind has no vector renderer."""
+    renderer = VECTOR_RENDERERS.get(kind)
+    return renderer(width, height, **params) if renderer else None
+
+
+def render_chart(kind: str, params: Dict[str, Any], figsize: Tuple[float, float]) -> bytes:
+    """Render one chart to PNG bytes."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    RENDERERS[kind](fig, **params)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=CHART_DPI)
+    return buffer.getvalue()
+
+
+def chart_key(kind: str, params: Dict[str, Any], figsize: Tuple[float, float]) -> str:
+    """Digest of everything that determines a chart's image."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([kind, list(figsize), CHART_DPI, CHART_STYLE_VERSION]).encode("utf-8"))
+    for name in sorted(params):
+        digest.update(f"\0{name}\0".encode("utf-8"))
+        value = params[name]
+        if isinstance(value, np.ndarray):
+            digest.update(str(value.dtype).encode("utf-8"))
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Eviction frees space down to this share of the limit, so it runs once per batch of new charts
+CACHE_EVICT_TO = 0.9
+
+
+class ChartCache:
+    """
+    Chart images on disk, one file per key; least recently used files are evicted past max_bytes.
+
+    The directory's total size is scanned once and then tracked in memory, so
+    the directory is only listed again when an eviction is due.
+    """
+
+    def __init__(self, cache_dir: Optional[Path], max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # Size of the cached files, once scanned
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            image = path.read_bytes()
+            os.utime(path)  # Mark as recently used
+            return image
+        except OSError:
+            return None
+
+    def put(self, key: str, image: bytes):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            replaced = path.stat().st_size if path.exists() else 0
+            tmp_path.write_bytes(image)
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"Failed to cache chart {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += len(image) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.png"
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every cached image."""
+        files = []
+        for path in self.cache_dir.glob("*.png"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self):
+        """Remove least recently used images down to CACHE_EVICT_TO of max_bytes; call with the lock held."""
+        files = self._scan()
+        total = sum(size for _, size, _ in files)  # Also picks up files other processes wrote
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes * CACHE_EVICT_TO:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._total_bytes = total
+
+
+chart_cache = ChartCache(CHART_CACHE_DIR, CHART_CACHE_MAX_BYTES)
+
+
+def pool_workers(workers: int, charts: int) -> int:
+    """
+    Processes worth starting for charts renders; 1 means render in-process.
+
+    A pool only pays off with more than one CPU and enough charts to amortize
+    starting the workers.
+    """
+    cpus = os.cpu_count() or 1
+    if workers <= 1 or cpus <= 1 or charts < PARALLEL_CHART_MIN_COUNT:
+        return 1
+    return min(workers, cpus, charts)
+
+
+def render_charts(requests: List[ChartRequest], workers: int = 1,
+                  cache: Optional[ChartCache] = chart_cache) -> List[bytes]:
+    """
+    Render charts in request order, in a process pool when pool_workers allows one.
+
+    Charts found in the cache are reused; only the rest are rendered.
+    """
+    keys = [chart_key(*request) for request in requests]
+    images: List[Optional[bytes]] = [cache.get(key) if cache else None for key in keys]
+    missing = [i for i, image in enumerate(images) if image is None]
+    if len(missing) < len(requests):
+        logger.info(f"Reusing {len(requests) - len(missing)} of {len(requests)} cached charts")
+
+    todo = [requests[i] for i in missing]
+    processes = pool_workers(workers, len(todo))
+    if processes <= 1:
+        rendered = [render_chart(*request) for request in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            rendered = list(executor.map(render_chart, *zip(*todo)))
+
+    for i, image in zip(missing, rendered):
+        images[i] = image
+        if cache:
+            cache.put(keys[i], image)
+    return images
@@ -204,6 +204,14 @@ Generate a complete database schema for this data challenge:
     ]
   }}
 }}
+{{
+  "rule_type": "calculated_field",
+  "description": "Order total from quantity and product price",
+  "parameters": {{
+    "table": "fact_orders",
+    "formula": "total_amount = quantity * dim_products.unit_price"
+  }}
+}}
 
 **KPI Format:**
 {{
@@ -0,0 +1,101 @@
+"""
+Time shaping for generated date columns.
+
+Fact-table dates are drawn from a per-day intensity curve instead of uniformly
+(dimension dates, such as signup dates, use uniform_dates). The curve
+multiplies a long-run trend taken from the schema's KPI narrative (a "35% decline"
+ends the date range at 0.65 of the starting volume), a month-of-year seasonal
+cycle, and dips for events that are not already applied to the table's metrics
+(see event_impacts). Row dates are sampled from the curve by inverse CDF: one
+cumulative sum over the days of the range and one searchsorted over all rows.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models import Schema, TableDefinition, KPIDefinition
+from config import SEASONAL_AMPLITUDE, SEASONAL_PEAK_MONTH, DEFAULT_TREND_PCT
+from event_impacts import impact_curve
+
+logger = logging.getLogger(__name__)
+
+TRENDS = ("growth", "decline", "spike")
+MAX_DECLINE = 0.9  # Volume never falls below 10% of the starting level
+SPIKE_CENTER = 0.75  # Position of a spike's peak within the date range
+SPIKE_WIDTH_DAYS = 45  # Standard deviation of the spike, in days
+
+
+def kpi_trend(kpis: List[KPIDefinition]) -> Tuple[str, float]:
+    """(trend, fraction) of the first KPI expecting growth, decline or a spike; ("stable", 0.0) otherwise."""
+    for kpi in kpis:
+        trend = (kpi.expected_trend or "").strip().lower()
+        if trend in TRENDS:
+            pct = kpi.narrative_percentage if kpi.narrative_percentage is not None else DEFAULT_TREND_PCT
+            return trend, abs(pct) / 100
+    return "stable", 0.0
+
+
+def trend_curve(trend: str, fraction: float, n_days: int) -> np.ndarray:
+    """Relative volume on each day of the range, starting at 1."""
+    position = np.linspace(0.0, 1.0, n_days)
+    if trend == "growth":
+        return 1 + fraction * position
+    if trend == "decline":
+        return 1 - min(fraction, MAX_DECLINE) * position
+    if trend == "spike":
+        offset = (position - SPIKE_CENTER) * (n_days - 1) / SPIKE_WIDTH_DAYS
+        return 1 + fraction * np.exp(-0.5 * offset ** 2)
+    return np.ones(n_days)
+
+
+def seasonal_curve(days: np.ndarray) -> np.ndarray:
+    """Month-of-year multiplier for datetime64[D] days, peaking in SEASONAL_PEAK_MONTH."""
+    month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    return 1 + SEASONAL_AMPLITUDE * np.cos(2 * np.pi * (month - SEASONAL_PEAK_MONTH) / 12)
+
+
+def _date_range(schema: Schema) -> Tuple[np.datetime64, np.datetime64]:
+    first = pd.Timestamp(schema.date_range_start).to_datetime64().astype("datetime64[D]")
+    last = pd.Timestamp(schema.date_range_end).to_datetime64().astype("datetime64[D]")
+    return first, last
+
+
+def daily_intensity(schema: Schema, table_def: Optional[TableDefinition] = None) -> Tuple[np.datetime64, np.ndarray]:
+    """
+    First day of the schema's date range and the unnormalized row intensity of each day.
+
+    Events whose affected metrics are columns of table_def already scale those
+    metrics, so they do not also thin out the table's rows.
+    """
+    first, last = _date_range(schema)
+    days = np.arange(first, last + 1)
+
+    trend, fraction = kpi_trend(schema.kpis)
+    columns = {c.name for c in table_def.columns} if table_def is not None else set()
+    events = [e for e in schema.event_impacts if not columns.intersection(e.affected_metrics)]
+
+    first_day = int(first.astype(np.int64))
+    intensity = (trend_curve(trend, fraction, len(days)) * seasonal_curve(days)
+                 * impact_curve(events, first_day, first_day + len(days) - 1))
+    return first, np.clip(intensity, 0.0, None)
+
+
+def sample_dates(schema: Schema, row_count: int, table_def: Optional[TableDefinition] = None) -> np.ndarray:
+    """row_count datetime64 dates (at midnight) drawn from the schema's daily intensity curve."""
+    first, intensity = daily_intensity(schema, table_def)
+    cdf = np.cumsum(intensity)
+    if not len(cdf) or cdf[-1] <= 0:
+        offsets = np.random.randint(0, max(len(cdf), 1), row_count)
+    else:
+        offsets = np.searchsorted(cdf, np.random.random(row_count) * cdf[-1], side="right")
+        offsets = np.minimum(offsets, len(cdf) - 1)
+    return (first + offsets).astype("datetime64[ns]")
+
+
+def uniform_dates(schema: Schema, row_count: int) -> np.ndarray:
+    """row_count datetime64 dates (at midnight) drawn uniformly from the schema's date range."""
+    first, last = _date_range(schema)
+    offsets = np.random.randint(0, max(int((last - first).astype(np.int64)) + 1, 1), row_count)
+    return (first + offsets).astype("datetime64[ns]")
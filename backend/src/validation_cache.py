@@ -0,0 +1,90 @@
+"""
+Process-wide cache of per-table validation results.
+
+Table profiles and FK check results are keyed by a fingerprint of the table
+contents, so a re-validation after some tables were regenerated only profiles
+the changed tables and re-checks the relationships that touch them.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import VALIDATION_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def table_fingerprint(df: pd.DataFrame, duplicate_rows: Optional[np.ndarray] = None) -> str:
+    """Digest of column names, dtypes, row contents and duplicate row positions (the index is ignored)."""
+    digest = hashlib.sha256()
+    for col, series in df.items():
+        digest.update(f"{col}\0{series.dtype}\0".encode("utf-8"))
+        _update_column(digest, series)
+    if duplicate_rows is not None:
+        digest.update(b"\0duplicates\0")
+        digest.update(np.ascontiguousarray(duplicate_rows, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def _update_column(digest, series: pd.Series):
+    """Feed a column's raw buffer to digest; object columns are joined into one string."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        digest.update(series.cat.codes.to_numpy().tobytes())
+        _update_column(digest, pd.Series(series.cat.categories))
+        return
+    numpy_dtype = getattr(series.dtype, "numpy_dtype", None)
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and numpy_dtype is not None \
+            and numpy_dtype.kind in "iufb":
+        # Nullable numeric/boolean columns: validity mask plus values
+        digest.update(series.isna().to_numpy().tobytes())
+        values = series.to_numpy(dtype=numpy_dtype, na_value=0)
+        digest.update(np.ascontiguousarray(values).tobytes())
+        return
+    values = series.to_numpy()
+    if values.dtype != object:
+        digest.update(np.ascontiguousarray(values).tobytes())
+        return
+    try:
+        joined = "\x1f".join(values)
+    except TypeError:
+        # Mixed values (nulls, numbers, dates)
+        joined = "\x1f".join(map(str, values))
+    digest.update(joined.encode("utf-8", "surrogatepass"))
+
+
+class ValidationCache:
+    """LRU cache of table profiles and FK check results."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing it with factory on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                logger.debug(f"Validation cache hit for {key[0]} {key[1]}")
+                return self._entries[key]
+
+        value = factory()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+validation_cache = ValidationCache(VALIDATION_CACHE_SIZE)
@@ -0,0 +1,96 @@
+"""
+Process-wide cache of pre-generated Faker value pools.
+"""
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from config import VALUE_POOL_CACHE_SIZE, VALUE_POOL_CACHE_DIR, VALUE_POOL_DISK_CACHE
+
+logger = logging.getLogger(__name__)
+
+# (provider, locale, seed bucket, pool size)
+PoolKey = Tuple[str, str, int, int]
+
+
+class ValuePoolCache:
+    """LRU cache of Faker value pools, optionally persisted to disk as .npy files."""
+
+    def __init__(self, max_entries: int, cache_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._pools: "OrderedDict[PoolKey, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: PoolKey, factory: Callable[[], List[str]]) -> List[str]:
+        """Return the pool for key, loading it from disk or building it with factory on a miss."""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                self._pools.move_to_end(key)
+                return pool
+
+        pool = self._load(key)
+        if pool is None:
+            pool = factory()
+            self._save(key, pool)
+
+        with self._lock:
+            self._pools[key] = pool
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_entries:
+                self._pools.popitem(last=False)
+        return pool
+
+    def clear(self):
+        """Drop all in-memory pools (disk files are kept)."""
+        with self._lock:
+            self._pools.clear()
+
+    def _path(self, key: PoolKey) -> Path:
+        provider, locale, bucket, size = key
+        return self.cache_dir / f"{provider}_{locale}_{bucket}_{size}.npy"
+
+    def _load(self, key: PoolKey) -> Optional[List[str]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            return np.load(path, allow_pickle=False).tolist()
+        except Exception as e:
+            logger.warning(f"Failed to load value pool {path.name}: {e}")
+            return None
+
+    def _save(self, key: PoolKey, pool: List[str]):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        # Write to a uniquely named temp file first so concurrent writers (processes or
+        # threads) never see or replace each other's partial file
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp",
+                                             delete=False) as f:
+                tmp_path = Path(f.name)
+                np.save(f, np.asarray(pool, dtype=str))
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.warning(f"Failed to persist value pool {path.name}: {e}")
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+
+
+value_pool_cache = ValuePoolCache(
+    VALUE_POOL_CACHE_SIZE,
+    VALUE_POOL_CACHE_DIR if VALUE_POOL_DISK_CACHE else None
+)
@@ -0,0 +1,92 @@
+"""
+Streaming ZIP archives.
+
+Builds a ZIP on the fly from files on disk and in-memory documents, yielding
+bytes as they are produced so downloads start immediately and nothing is
+staged on disk.
+"""
+import logging
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Read size when copying files into the archive
+ZIP_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Formats that are already compressed; deflating them again only burns CPU
+STORED_SUFFIXES = {".parquet", ".feather", ".gz", ".zip", ".xlsx", ".png", ".pdf"}
+
+# (name inside the archive, path on disk or in-memory content)
+ZipEntry = Tuple[str, Union[Path, bytes]]
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink that zipfile writes into and we drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compression_for(name: str) -> int:
+    if Path(name).suffix.lower() in STORED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries: List[ZipEntry], chunk_size: int = ZIP_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of the given entries chunk by chunk.
+
+    Files are read straight from disk into the archive; bytes entries are
+    written as-is. Missing files are skipped with a warning.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as zf:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+                info.compress_type = _compression_for(arcname)
+                zf.writestr(info, source)
+                yield buffer.drain()
+                continue
+
+            path = Path(source)
+            if not path.exists():
+                logger.warning(f"Skipping missing file in download: {path}")
+                continue
+
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = _compression_for(arcname)
+            with open(path, "rb") as src, zf.open(info, mode="w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as dest:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            yield buffer.drain()
+
+    # Central directory is written on close
+    yield buffer.drain()
@@ -0,0 +1,122 @@
+"""
+Calculated-field business rules: formula parsing, dependency order and FK joins.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from models import Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition, BusinessRule
+from business_rules import parse_rule, compile_rules, apply_calculated_fields
+
+
+def rule(table: str, formula: str) -> BusinessRule:
+    return BusinessRule(rule_type="calculated_field", description=formula,
+                        parameters={"table": table, "formula": formula})
+
+
+def schema_with(*rules: BusinessRule) -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="products", description="Products", primary_key="product_id", columns=[
+                ColumnDefinition(name="product_id", datatype="string"),
+                ColumnDefinition(name="unit_price", datatype="float"),
+                ColumnDefinition(name="list_price", datatype="float"),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string"),
+                ColumnDefinition(name="product_id", datatype="string"),
+                ColumnDefinition(name="quantity", datatype="int"),
+                ColumnDefinition(name="total", datatype="float"),
+                ColumnDefinition(name="tax", datatype="float"),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="products", parent_column="product_id",
+                                            child_table="orders", child_column="product_id")],
+        business_rules=list(rules),
+        kpis=[],
+    )
+
+
+def test_parse_rewrites_parent_references():
+    field = parse_rule(rule("orders", "orders.total = quantity * products.unit_price"))
+    assert field.key == ("orders", "total")
+    assert field.expression == "quantity * products__unit_price"
+    assert field.variables == {"quantity": ("orders", "quantity"),
+                               "products__unit_price": ("products", "unit_price")}
+
+
+@pytest.mark.parametrize("formula", [
+    "total quantity * 2",  # No assignment
+    "total = ",
+    "1total = quantity",
+    "total = quantity *",
+    "total = __import__('os').getcwd()",
+    "total = quantity.real.imag",
+    "total = round(quantity)",
+    "total = [quantity]",
+    "total = quantity if tax else 0",
+])
+def test_malformed_formulas_rejected(formula):
+    with pytest.raises(ValueError):
+        parse_rule(rule("orders", formula))
+
+
+def test_missing_parameters_rejected():
+    with pytest.raises(ValueError):
+        parse_rule(BusinessRule(rule_type="calculated_field", description="x", parameters={"formula": "a = b"}))
+
+
+def test_rules_ordered_by_dependencies_across_tables():
+    schema = schema_with(
+        rule("orders", "tax = total * 0.2"),
+        rule("orders", "total = quantity * products.unit_price"),
+        rule("products", "unit_price = list_price * 0.9"),
+    )
+    order = [field.key for field in compile_rules(schema)]
+    assert order.index(("products", "unit_price")) < order.index(("orders", "total")) < order.index(("orders", "tax"))
+
+
+def test_cyclic_and_malformed_rules_dropped():
+    schema = schema_with(
+        rule("orders", "total = tax * 5"),
+        rule("orders", "tax = total * 0.2"),
+        rule("orders", "quantity = total +"),
+        rule("products", "unit_price = list_price * 0.9"),
+    )
+    assert [field.key for field in compile_rules(schema)] == [("products", "unit_price")]
+
+
+def test_parent_columns_joined_through_foreign_key():
+    schema = schema_with(
+        rule("orders", "total = quantity * products.unit_price"),
+        rule("orders", "tax = where(total > 50, total * 0.2, 0)"),
+        rule("products", "unit_price = list_price * 0.5"),
+    )
+    data = {
+        "products": pd.DataFrame({"product_id": ["P1", "P2"], "list_price": [20.0, 200.0]}),
+        "orders": pd.DataFrame({"order_id": ["O1", "O2", "O3"], "product_id": ["P2", "P9", "P1"],
+                                "quantity": [2, 1, 3]}),
+    }
+    apply_calculated_fields(schema, data)
+
+    assert data["products"]["unit_price"].tolist() == [10.0, 100.0]
+    total = data["orders"]["total"].to_numpy()
+    assert total[0] == 200.0 and np.isnan(total[1]) and total[2] == 30.0  # O2 has no parent product
+    assert data["orders"]["tax"].tolist()[::2] == [40.0, 0.0]
+
+
+def test_resident_parents_joined_but_not_computed():
+    schema = schema_with(rule("orders", "total = quantity * products.unit_price"),
+                         rule("products", "unit_price = list_price * 0.5"))
+    parents = {"products": pd.DataFrame({"product_id": ["P1"], "list_price": [8.0], "unit_price": [4.0]})}
+    data = {"orders": pd.DataFrame({"order_id": ["O1"], "product_id": ["P1"], "quantity": [3]})}
+    apply_calculated_fields(schema, data, parents=parents)
+
+    assert data["orders"]["total"].tolist() == [12.0]
+    assert parents["products"]["unit_price"].tolist() == [4.0]
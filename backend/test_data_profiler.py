@@ -0,0 +1,78 @@
+"""
+Data profiler: HyperLogLog distinct counts and sampled-profile error bounds.
+"""
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from config import HLL_PRECISION
+from data_profiler import (profile_table, profile_table_sample, hyperloglog_distinct,
+                           proportion_margin, correlation_bounds)
+
+RSE = 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+
+def orders(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "order_id": [f"O{i:07d}" for i in range(n)],
+        "status": rng.choice(["new", "paid", "shipped"], n),
+        "amount": np.where(rng.random(n) < 0.1, np.nan, rng.uniform(0, 100, n)),
+    })
+
+
+@pytest.mark.parametrize("distinct", [10, 5000, 200000])
+def test_hyperloglog_within_error(distinct):
+    values = pd.Series(np.arange(distinct).repeat(2))
+    assert hyperloglog_distinct(values) == pytest.approx(distinct, rel=4 * RSE)
+
+
+def test_hyperloglog_ignores_nulls():
+    assert hyperloglog_distinct(pd.Series([None, None], dtype=object)) == 0.0
+    assert hyperloglog_distinct(pd.Series(["a", None, "a", "b"])) == pytest.approx(2, abs=0.1)
+
+
+def test_exact_profile_has_no_margin():
+    profile = profile_table("orders", orders(1000), "order_id")
+    assert profile.sampled_rows is None
+    assert proportion_margin(0.1, profile) == 0.0
+    assert correlation_bounds(0.5, profile) == (0.5, 0.5)
+
+
+def test_sample_scales_counts_to_table():
+    df = orders(100000)
+    profile = profile_table_sample("orders", df, "order_id", sample_rows=5000)
+    exact = profile_table("orders", df, "order_id")
+
+    assert profile.row_count == 100000 and profile.sampled_rows == 5000
+    assert profile.primary_key_unique
+    p = exact.columns["amount"].null_count / len(df)
+    margin = proportion_margin(p, profile) * len(df)
+    assert 0 < margin < 0.02 * len(df)
+    assert abs(profile.columns["amount"].null_count - exact.columns["amount"].null_count) <= margin
+    low, high = correlation_bounds(0.3, profile)
+    assert low < 0.3 < high
+
+
+def test_sample_counts_rewritten_duplicates():
+    df = orders(100000)
+    dups = np.arange(0, 100000, 50)  # 2000 rows written twice
+    profile = profile_table_sample("orders", df, "order_id", sample_rows=20000, duplicate_rows=dups)
+
+    assert profile.row_count == 102000
+    assert not profile.primary_key_unique
+    assert abs(profile.duplicate_row_count - len(dups)) <= profile.duplicate_margin
+
+
+def test_repeated_key_outside_sample_detected():
+    df = orders(100000)
+    df.loc[50000:59999, "order_id"] = df.loc[40000:49999, "order_id"].to_numpy()  # 10% repeated keys
+    profile = profile_table_sample("orders", df, "order_id", sample_rows=100)
+    assert not profile.primary_key_unique
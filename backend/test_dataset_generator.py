@@ -0,0 +1,102 @@
+"""
+Dataset generator: primary key construction and parallel table generation.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import dataset_generator
+from models import Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition
+from dataset_generator import DatasetGenerator
+
+
+def table(prefix=None) -> TableDefinition:
+    return TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+        ColumnDefinition(name="order_id", datatype="string", id_prefix=prefix),
+        ColumnDefinition(name="amount", datatype="float"),
+    ])
+
+
+def test_keys_prefixed_and_padded():
+    keys = DatasetGenerator(seed=1, workers=1)._generate_primary_key(table("O"), 3)
+    assert isinstance(keys, pd.arrays.ArrowStringArray)
+    assert list(keys) == ["O000001", "O000002", "O000003"]
+
+
+def test_prefix_defaults_to_table_name():
+    keys = DatasetGenerator(seed=1, workers=1)._generate_primary_key(table(), 1)
+    assert list(keys) == ["ORD000001"]
+
+
+def test_width_grows_with_table():
+    keys = DatasetGenerator(seed=1, workers=1)._generate_primary_key(table("O"), 2, start=999999)
+    assert list(keys) == ["O0999999", "O1000000"]
+
+
+def test_chunks_share_width_of_whole_table():
+    generator = DatasetGenerator(seed=1, workers=1)
+    first = generator._generate_primary_key(table("O"), 2, start=1, total_rows=1_500_000)
+    last = generator._generate_primary_key(table("O"), 2, start=1_499_999, total_rows=1_500_000)
+    assert list(first) + list(last) == ["O0000001", "O0000002", "O1499999", "O1500000"]
+
+
+def star_schema() -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="name", datatype="string"),
+                ColumnDefinition(name="segment", datatype="category", allowed_values=["Retail", "Business"]),
+            ]),
+            TableDefinition(name="products", description="Products", primary_key="product_id", columns=[
+                ColumnDefinition(name="product_id", datatype="string", id_prefix="P"),
+                ColumnDefinition(name="price", datatype="float"),
+            ]),
+            TableDefinition(name="stores", description="Stores", primary_key="store_id", columns=[
+                ColumnDefinition(name="store_id", datatype="string", id_prefix="S"),
+                ColumnDefinition(name="opened", datatype="date"),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="product_id", datatype="string"),
+                ColumnDefinition(name="store_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="quantity", datatype="integer"),
+            ]),
+        ],
+        relationships=[
+            ForeignKeyDefinition(parent_table=parent, parent_column=f"{parent[:-1]}_id",
+                                 child_table="orders", child_column=f"{parent[:-1]}_id")
+            for parent in ("customers", "products", "stores")
+        ],
+        business_rules=[],
+        kpis=[],
+    )
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_output_independent_of_worker_count(monkeypatch, workers):
+    monkeypatch.setattr(dataset_generator, "PARALLEL_GENERATION_MIN_ROWS", 0)
+    serial = DatasetGenerator(seed=13, workers=1)
+    expected = serial.generate(star_schema(), 5000)
+
+    parallel_levels = []
+    parallel = DatasetGenerator(seed=13, workers=workers)
+    level_parallel = parallel._generate_level_parallel
+    monkeypatch.setattr(parallel, "_generate_level_parallel",
+                        lambda level, *args: parallel_levels.append(level) or level_parallel(level, *args))
+    result = parallel.generate(star_schema(), 5000)
+
+    assert parallel_levels == [["customers", "products", "stores"]]
+    assert list(result) == list(expected)
+    for name in expected:
+        pd.testing.assert_frame_equal(result[name], expected[name])
+    assert parallel.duplicate_rows.keys() == serial.duplicate_rows.keys()
+    for name, rows in serial.duplicate_rows.items():
+        assert (parallel.duplicate_rows[name] == rows).all()
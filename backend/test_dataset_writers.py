@@ -0,0 +1,86 @@
+"""
+Round-trip tests for the dataset writers (CSV, Parquet, Feather).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from dataset_writers import WRITERS, get_writer
+
+
+def read_back(path: Path, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        table = pq.read_table(path)
+    elif fmt == "feather":
+        table = feather.read_table(path)
+    else:
+        table = pa_csv.read_csv(path)
+    return table.to_pandas()
+
+
+def make_chunk(start: int, categories: list) -> pd.DataFrame:
+    rng = np.random.default_rng(start)
+    return pd.DataFrame({
+        "id": np.arange(start, start + 100),
+        "city": pd.Categorical.from_codes(rng.integers(0, len(categories), 100), categories=categories),
+        "amount": rng.uniform(0, 100, 100).round(2),
+    })
+
+
+@pytest.mark.parametrize("fmt", list(WRITERS))
+def test_chunks_with_different_categories(tmp_path, fmt):
+    """Each streamed chunk samples a different value pool, so dictionaries differ per chunk."""
+    chunks = [make_chunk(0, ["Paris", "Rome"]), make_chunk(100, ["Oslo", "Paris", "Lima"]), make_chunk(200, ["Kyiv"])]
+    with get_writer(tmp_path, "orders", fmt) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    written = read_back(writer.path, fmt)
+    expected = pd.concat([c.astype({"city": str}) for c in chunks], ignore_index=True)
+    assert len(written) == 300
+    assert written["city"].astype(str).tolist() == expected["city"].tolist()
+    assert written["id"].tolist() == expected["id"].tolist()
+
+
+@pytest.mark.parametrize("fmt", list(WRITERS))
+def test_duplicate_rows_written_after_chunk(tmp_path, fmt):
+    chunk = make_chunk(0, ["Paris", "Rome"])
+    with get_writer(tmp_path, "orders", fmt) as writer:
+        writer.write(chunk, duplicate_rows=np.array([3, 7]))
+
+    written = read_back(writer.path, fmt)
+    assert len(written) == 102
+    assert written["id"].tolist()[-2:] == [3, 7]
+
+
+def test_date_columns_written_as_dates(tmp_path):
+    dates = pd.to_datetime(["2021-03-01", "2021-03-02"])
+    df = pd.DataFrame({"order_date": dates, "shipped_at": dates + pd.Timedelta(hours=5)})
+    with get_writer(tmp_path, "orders", "csv", date_columns=["order_date"]) as writer:
+        writer.write(df)
+
+    lines = writer.path.read_text().splitlines()
+    assert lines[1] == '2021-03-01,2021-03-01 05:00:00'
+
+
+def test_unknown_format_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        get_writer(tmp_path, "orders", "xlsx")
+
+
+def test_midnight_timestamps_written_as_dates_in_csv(tmp_path):
+    midnight = pd.DataFrame({"created_at": pd.to_datetime(["2021-03-01", None])})
+    with get_writer(tmp_path, "events", "csv") as writer:
+        writer.write(midnight)
+        writer.write(midnight)
+
+    assert writer.path.read_text().splitlines() == ['"created_at"', "2021-03-01", "", "2021-03-01", ""]
@@ -0,0 +1,77 @@
+"""
+Intentional duplicate rows exist only as row positions until the writers emit
+them; consumers of the in-memory tables must agree with the written files.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from models import Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition, KPIDefinition
+from dataset_generator import DatasetGenerator
+from excel_generator import SolutionExcelGenerator
+from referential_integrity import check_relationships
+
+
+def retail_schema() -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="products", description="Products", primary_key="product_id", columns=[
+                ColumnDefinition(name="product_id", datatype="string", id_prefix="P"),
+                ColumnDefinition(name="category", datatype="category", allowed_values=["Toys", "Food", "Tech"]),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="product_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="region", datatype="category", allowed_values=["North", "South", "East"]),
+                ColumnDefinition(name="revenue", datatype="float", constraints={"min": 1.0, "max": 500.0}),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="products", parent_column="product_id",
+                                            child_table="orders", child_column="product_id")],
+        business_rules=[],
+        kpis=[KPIDefinition(name="Revenue", formula="sum(revenue)", expected_trend="growth")],
+    )
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    schema = retail_schema()
+    generator = DatasetGenerator(seed=7, workers=1)
+    data = generator.generate(schema, 20000)
+    output_dir = tmp_path_factory.mktemp("datasets")
+    generator.save_to_disk(output_dir, "parquet")
+    assert len(generator.duplicate_rows["orders"])
+    return schema, data, generator.duplicate_rows, output_dir
+
+
+def test_answer_matches_written_file(generated):
+    schema, data, duplicate_rows, output_dir = generated
+    answer = SolutionExcelGenerator(Path("unused.xlsx"))._answer_question(
+        "Which region brings in the most revenue?", schema.kpis, 0, schema, data, duplicate_rows)
+
+    written = pd.read_parquet(output_dir / "orders.parquet")
+    assert len(written) == len(data["orders"]) + len(duplicate_rows["orders"])
+    expected = written.groupby("region", observed=True)["revenue"].agg(["sum", "count"])
+
+    table = answer["table"].set_index("region")
+    assert answer["dimension"] == "region"
+    for region, row in expected.iterrows():
+        assert table.loc[str(region), "Total revenue"] == pytest.approx(row["sum"])
+        assert table.loc[str(region), "Records"] == row["count"]
+
+
+def test_relationship_counts_match_written_file(generated):
+    schema, data, duplicate_rows, output_dir = generated
+    result = check_relationships(schema, data, duplicate_rows=duplicate_rows)[0]
+
+    orders = pd.read_parquet(output_dir / "orders.parquet")
+    products = pd.read_parquet(output_dir / "products.parquet")
+    keys = orders["product_id"].dropna()
+    assert result.child_rows == len(keys)
+    assert result.orphan_rows == int((~keys.isin(products["product_id"])).sum())
@@ -0,0 +1,68 @@
+"""
+Event impacts: ramped per-day multiplier curves and metric scaling.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from models import EventImpact
+from event_impacts import impact_curve, apply_event_impacts, _to_day
+
+
+def event(start="2021-01-01", end="2021-01-10", magnitude=-0.5, ramp_in=0, ramp_out=0, metrics=("revenue",)):
+    return EventImpact(event_name="event", start_date=start, end_date=end, impact_magnitude=magnitude,
+                       affected_metrics=list(metrics), ramp_in_days=ramp_in, ramp_out_days=ramp_out)
+
+
+def test_ramps_build_up_and_fade_out():
+    first = _to_day("2020-12-30")
+    curve = impact_curve([event(ramp_in=4, ramp_out=2)], first, first + 14)
+    days = {d: curve[_to_day(d) - first] for d in
+            ("2020-12-31", "2021-01-01", "2021-01-02", "2021-01-04", "2021-01-06",
+             "2021-01-09", "2021-01-10", "2021-01-11")}
+    assert days == pytest.approx({
+        "2020-12-31": 1.0,  # Before the event
+        "2021-01-01": 1 - 0.5 * 1 / 4,
+        "2021-01-02": 1 - 0.5 * 2 / 4,
+        "2021-01-04": 0.5,  # Full magnitude once ramped in
+        "2021-01-06": 0.5,
+        "2021-01-09": 0.5,
+        "2021-01-10": 1 - 0.5 * 1 / 2,
+        "2021-01-11": 1.0,  # After the event
+    })
+
+
+def test_ramp_measured_from_event_start_when_range_starts_later():
+    first = _to_day("2021-01-03")
+    curve = impact_curve([event(ramp_in=4)], first, first + 2)
+    assert curve == pytest.approx([1 - 0.5 * 3 / 4, 0.5, 0.5])
+
+
+def test_overlapping_impacts_multiply():
+    first = _to_day("2021-01-01")
+    curve = impact_curve([event(magnitude=-0.5), event(start="2021-01-05", magnitude=0.2)], first, first + 11)
+    assert curve[0] == pytest.approx(0.5)
+    assert curve[4] == pytest.approx(0.5 * 1.2)
+    assert curve[10] == pytest.approx(1.0)
+
+
+def test_metrics_scaled_by_row_date():
+    df = pd.DataFrame({
+        "order_date": pd.to_datetime(["2020-12-31", "2021-01-05", None, "2021-01-06"]),
+        "revenue": [100.0, 100.0, 100.0, np.nan],
+        "units": pd.array([10, 11, 10, None], dtype="Int64"),
+        "visits": np.array([10, 11, 10, 7]),
+    })
+    apply_event_impacts(df, [event(metrics=("revenue", "units", "visits"))])
+
+    assert df["revenue"].tolist()[:3] == [100.0, 50.0, 100.0]  # Outside the event, or no valid date
+    assert np.isnan(df["revenue"].iloc[3])
+    assert df["units"].dtype == "Int64" and df["units"].tolist()[:3] == [10, 6, 10]  # Rounded half to even
+    assert df["units"].isna().iloc[3]
+    assert df["visits"].dtype == np.int64 and df["visits"].tolist() == [10, 6, 10, 4]
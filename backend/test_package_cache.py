@@ -0,0 +1,125 @@
+"""
+Content-addressed download packages: archive contents and shared archives.
+"""
+import asyncio
+import sys
+import threading
+import zipfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from package_cache import PackageCache, PackageFileResponse
+
+
+def entries_for(tmp_path: Path, text: str):
+    data_file = tmp_path / f"orders_{abs(hash(text))}.csv"
+    data_file.write_text(text)
+    return [("orders.csv", data_file), ("README.txt", b"readme"), ("missing.pdf", tmp_path / "missing.pdf")]
+
+
+def test_archive_holds_entries(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    zip_path = cache.get_or_build(entries_for(tmp_path, "id\n1\n"))
+
+    with zipfile.ZipFile(zip_path) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["orders.csv", "README.txt"]  # Missing files are left out
+        assert archive.read("orders.csv") == b"id\n1\n"
+
+
+def test_same_content_same_archive(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    first = cache.get_or_build(entries_for(tmp_path, "id\n1\n"))
+    mtime = first.stat().st_mtime_ns
+    assert cache.get_or_build(entries_for(tmp_path, "id\n1\n")) == first
+    assert first.stat().st_mtime_ns == mtime
+
+
+def test_shared_archive_kept_while_served(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    shared = cache.get_or_build(entries_for(tmp_path, "id\n1\n"), owner="a:package")
+    assert cache.get_or_build(entries_for(tmp_path, "id\n1\n"), owner="b:package") == shared
+
+    # Session a regenerates: b still serves the shared archive
+    changed = cache.get_or_build(entries_for(tmp_path, "id\n2\n"), owner="a:package")
+    assert changed != shared
+    assert shared.exists()
+
+    # Once b moves on too, nobody serves it
+    cache.get_or_build(entries_for(tmp_path, "id\n3\n"), owner="b:package")
+    assert not shared.exists()
+    assert changed.exists()
+
+
+def test_builds_of_different_packages_run_concurrently(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    slow_entries = entries_for(tmp_path, "id\n1\n")
+    slow_path = cache.path_for(cache.digest(slow_entries))
+    started, release = threading.Event(), threading.Event()
+    build = cache._build
+
+    def blocking_build(entries, zip_path):
+        if zip_path == slow_path:
+            started.set()
+            assert release.wait(10)
+        build(entries, zip_path)
+
+    cache._build = blocking_build
+    slow = threading.Thread(target=cache.get_or_build, args=(slow_entries, "a:package"))
+    slow.start()
+    try:
+        assert started.wait(10)
+        # Another session's package is built while the first build is still running
+        other = cache.get_or_build(entries_for(tmp_path, "id\n2\n"), owner="b:package")
+        assert other.exists() and not slow_path.exists()
+    finally:
+        release.set()
+        slow.join(10)
+    assert slow_path.exists()
+    assert not cache._pins and not cache._build_locks
+
+
+def test_archive_pinned_while_requested(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    shared = cache.get_or_build(entries_for(tmp_path, "id\n1\n"), owner="a:package")
+    digest = shared.stem
+    cache._pins[digest] += 1  # Another request is between its existence check and serving
+    cache.get_or_build(entries_for(tmp_path, "id\n2\n"), owner="a:package")
+    assert shared.exists()
+
+
+def serve(response, headers: dict):
+    """Run a response as an ASGI app; returns (status, headers, body)."""
+    scope = {"type": "http", "method": "GET", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(response(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def test_range_resumes_with_package_etag(tmp_path):
+    cache = PackageCache(tmp_path / "cache")
+    zip_path = cache.get_or_build(entries_for(tmp_path, "id\n1\n"))
+    digest = zip_path.stem
+    content = zip_path.read_bytes()
+
+    status, headers, body = serve(PackageFileResponse(zip_path, digest), {})
+    assert status == 200 and body == content
+    assert headers["etag"] == f'"{digest}"'
+
+    status, _, body = serve(PackageFileResponse(zip_path, digest), {"range": "bytes=10-19", "if-range": f'"{digest}"'})
+    assert status == 206 and body == content[10:20]
+
+    # A different package: the resume restarts from scratch
+    status, _, body = serve(PackageFileResponse(zip_path, digest), {"range": "bytes=10-19", "if-range": '"other"'})
+    assert status == 200 and body == content
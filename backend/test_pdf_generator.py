@@ -0,0 +1,85 @@
+"""
+Quality report PDF: vector charts are embedded as drawings, not raster images.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import pdf_generator
+import report_charts
+from models import ChallengeInput, Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition
+from dataset_generator import DatasetGenerator
+from pdf_generator import QualityReportPDF
+from quality_validator import QualityValidator
+from report_charts import VECTOR_RENDERERS
+
+
+@pytest.fixture(scope="module")
+def validated():
+    schema = Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="segment", datatype="category", allowed_values=["Retail", "Business"]),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="status", datatype="category", allowed_values=["new", "paid", "shipped"]),
+                ColumnDefinition(name="quantity", datatype="integer"),
+                ColumnDefinition(name="amount", datatype="float"),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="customers", parent_column="customer_id",
+                                            child_table="orders", child_column="customer_id")],
+        business_rules=[],
+        kpis=[],
+    )
+    data = DatasetGenerator(seed=9, workers=1).generate(schema, 3000)
+    input_data = ChallengeInput(domain="Retail", function="Sales", dataset_size=3000,
+                                problem_statement="Order volumes and basket sizes shifted over the year and the "
+                                                  "team needs to understand which customer segments drove it.")
+    validator = QualityValidator("test", workers=1)
+    results = validator.validate(schema, data, input_data)
+    return results, schema, data, input_data, validator.profile
+
+
+def chart_images(pdf: bytes) -> int:
+    """Raster images in the PDF other than the cover logo (alpha masks are images of their own)."""
+    images = pdf.count(b"/Subtype /Image") - pdf.count(b"/SMask ")
+    return images - pdf_generator.LOGO_PATH.exists()
+
+
+def build(tmp_path, monkeypatch, validated, chart_format):
+    rasterized = []
+
+    def render_uncached(requests, workers):
+        rasterized.extend(kind for kind, _, _ in requests)
+        return report_charts.render_charts(requests, workers=1, cache=None)
+
+    monkeypatch.setattr(pdf_generator, "render_charts", render_uncached)
+    report = QualityReportPDF(tmp_path / f"report_{chart_format}.pdf", workers=1, chart_format=chart_format)
+    report.generate(*validated)
+    kinds = [kind for kind, _, _ in report._chart_requests]
+    return report.output_path.read_bytes(), kinds, rasterized
+
+
+def test_vector_charts_embed_no_raster_images(tmp_path, monkeypatch, validated):
+    pdf, kinds, rasterized = build(tmp_path, monkeypatch, validated, "vector")
+    assert pdf.startswith(b"%PDF")
+    assert any(kind in VECTOR_RENDERERS for kind in kinds)
+
+    # Only chart kinds without a vector renderer are rasterized, one image each
+    assert rasterized == [kind for kind in kinds if kind not in VECTOR_RENDERERS]
+    assert chart_images(pdf) == len(rasterized)
+
+
+def test_png_charts_are_all_raster(tmp_path, monkeypatch, validated):
+    pdf, kinds, rasterized = build(tmp_path, monkeypatch, validated, "png")
+    assert rasterized == kinds
+    assert chart_images(pdf) == len(kinds)
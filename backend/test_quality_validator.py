@@ -0,0 +1,129 @@
+"""
+Check selection under a time budget, concurrent check execution and category
+scoring of skipped checks.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from config import SCORING_WEIGHTS
+from models import (ValidationCheckResult, ChallengeInput, Schema, TableDefinition, ColumnDefinition,
+                    ForeignKeyDefinition)
+from dataset_generator import DatasetGenerator
+from quality_validator import CHECK_REGISTRY, QualityValidator, select_checks
+from validation_cache import validation_cache
+
+
+def result(name: str, category: str, score: float) -> ValidationCheckResult:
+    return ValidationCheckResult(check_name=name, category=category, passed=score >= 7, score=score, message="")
+
+
+def test_no_budget_runs_every_check():
+    checks = list(CHECK_REGISTRY.values())
+    assert select_checks(checks, 1_000_000, None) == checks
+
+
+def test_budget_keeps_registry_order_and_fits():
+    checks = list(CHECK_REGISTRY.values())
+    rows = 1_000_000
+    selected = select_checks(checks, rows, 0.5)
+    assert 0 < len(selected) < len(checks)
+    assert sum(c.estimated_seconds(rows) for c in selected) <= 0.5
+    assert [c.name for c in selected] == [c.name for c in checks if c in selected]
+
+
+def test_skipped_category_is_not_scored():
+    validator = QualityValidator("test")
+    validator.results = [result("Duplicate Analysis", "technical_integrity", 6.0)]
+    skipped = [name for name, spec in CHECK_REGISTRY.items() if spec.category == "realism_distribution"]
+
+    scores = validator._calculate_category_scores(skipped)
+    assert "realism_distribution" not in scores
+    assert scores["technical_integrity"] == 6.0
+
+    overall = validator._calculate_overall_score(scores)
+    evaluated = {cat: w for cat, w in SCORING_WEIGHTS.items() if cat in scores}
+    expected = sum(scores[cat] * w for cat, w in evaluated.items()) / sum(evaluated.values())
+    assert overall == pytest.approx(round(expected, 1))
+
+
+def test_full_run_weights_every_category():
+    validator = QualityValidator("test")
+    validator.results = [result("Duplicate Analysis", "technical_integrity", 6.0),
+                         result("Distribution Analysis", "realism_distribution", 8.0)]
+    scores = validator._calculate_category_scores()
+    assert set(scores) == set(SCORING_WEIGHTS)
+    assert validator._calculate_overall_score(scores) == pytest.approx(
+        round(sum(scores[cat] * w for cat, w in SCORING_WEIGHTS.items()), 1))
+
+
+def retail_dataset():
+    schema = Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="segment", datatype="category", allowed_values=["Retail", "Business"]),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="quantity", datatype="integer"),
+                ColumnDefinition(name="amount", datatype="float"),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="customers", parent_column="customer_id",
+                                            child_table="orders", child_column="customer_id")],
+        business_rules=[],
+        kpis=[],
+    )
+    generator = DatasetGenerator(seed=17, workers=1)
+    data = generator.generate(schema, 5000)
+    input_data = ChallengeInput(domain="Retail", function="Sales", dataset_size=5000,
+                                problem_statement="Order volumes and basket sizes shifted over the year and the "
+                                                  "team needs to understand which customer segments drove it.")
+    return schema, data, input_data, generator.duplicate_rows
+
+
+def test_greedy_selection_prefers_value_per_second():
+    rows = 1_000_000
+    checks = list(CHECK_REGISTRY.values())
+    low = [c for c in checks if c.cost == "low"]
+    budget = sum(c.estimated_seconds(rows) for c in low) + 1e-9
+    # Every low-cost check is worth more per second than any other, and nothing else fits
+    assert [c.name for c in select_checks(checks, rows, budget)] == [c.name for c in low]
+
+
+def test_tiny_budget_skips_costly_checks():
+    schema, data, input_data, duplicate_rows = retail_dataset()
+    validator = QualityValidator("test", workers=4)
+    rows = validator._profiled_rows(data)
+    low = [name for name, spec in CHECK_REGISTRY.items() if spec.cost == "low"]
+    budget = sum(CHECK_REGISTRY[name].estimated_seconds(rows) for name in low) + 1e-9
+
+    results = validator.validate(schema, data, input_data, time_budget=budget, duplicate_rows=duplicate_rows)
+    assert [check.check_name for check in results.checks] == low
+    assert results.skipped_checks == [name for name in CHECK_REGISTRY if name not in low]
+    assert all(check.details["wall_time_ms"] >= 0 for check in results.checks)
+
+
+def test_results_do_not_depend_on_thread_count():
+    schema, data, input_data, duplicate_rows = retail_dataset()
+    runs = []
+    for workers in (1, 8):
+        validation_cache.clear()  # Profile from scratch on each thread count
+        runs.append(QualityValidator("test", workers=workers).validate(schema, data, input_data,
+                                                                       duplicate_rows=duplicate_rows))
+
+    for results in runs:
+        assert [check.check_name for check in results.checks] == list(CHECK_REGISTRY)
+        assert results.skipped_checks == []
+    serial, threaded = runs
+    assert [(c.score, c.passed, c.message) for c in serial.checks] == \
+           [(c.score, c.passed, c.message) for c in threaded.checks]
+    assert serial.category_scores == threaded.category_scores
+    assert serial.overall_score == threaded.overall_score
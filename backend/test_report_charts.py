@@ -0,0 +1,66 @@
+"""
+Report chart rendering: process pool sizing and the on-disk chart cache.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import report_charts
+from config import PARALLEL_CHART_MIN_COUNT
+from report_charts import pool_workers, render_charts
+
+
+def bar_request(i: int):
+    return ("bar", {"labels": ["a", "b"], "values": [i, i + 1], "title": f"Chart {i}"}, (4, 3))
+
+
+@pytest.mark.parametrize("cpus, workers, charts, expected", [
+    (1, 4, 50, 1),  # One CPU: a pool only adds overhead
+    (8, 1, 50, 1),
+    (8, 4, PARALLEL_CHART_MIN_COUNT - 1, 1),  # Too few charts to amortize the pool
+    (8, 4, 50, 4),
+    (2, 4, 50, 2),
+    (8, 16, PARALLEL_CHART_MIN_COUNT, PARALLEL_CHART_MIN_COUNT),
+])
+def test_pool_workers(monkeypatch, cpus, workers, charts, expected):
+    monkeypatch.setattr(report_charts.os, "cpu_count", lambda: cpus)
+    assert pool_workers(workers, charts) == expected
+
+
+def test_single_cpu_renders_in_process(monkeypatch):
+    monkeypatch.setattr(report_charts.os, "cpu_count", lambda: 1)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started on a single CPU")
+
+    monkeypatch.setattr(report_charts, "ProcessPoolExecutor", no_pool)
+    images = render_charts([bar_request(i) for i in range(PARALLEL_CHART_MIN_COUNT + 1)], workers=4, cache=None)
+    assert all(image.startswith(b"\x89PNG") for image in images)
+
+
+def test_cache_round_trip(tmp_path):
+    cache = report_charts.ChartCache(tmp_path, max_bytes=10_000)
+    cache.put("a", b"image-a")
+    assert cache.get("a") == b"image-a"
+    assert cache.get("missing") is None
+
+
+def test_cache_scans_directory_only_when_evicting(tmp_path, monkeypatch):
+    cache = report_charts.ChartCache(tmp_path, max_bytes=1000)
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or scan())
+
+    for i in range(9):
+        cache.put(f"chart{i}", b"x" * 100)
+    assert len(scans) == 1  # Initial size scan only
+
+    for i in range(9, 15):
+        cache.put(f"chart{i}", b"x" * 100)
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.png")) <= 1000
+    assert cache.get("chart14") is not None  # Newest images survive
+    assert cache.get("chart0") is None
@@ -0,0 +1,101 @@
+"""
+Streaming generation: tables written chunk by chunk must hold every row and
+only reference parent keys that were generated.
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from config import STREAMING_GENERATION_MIN_CELLS, STREAMING_REPORT_ROWS
+from models import (Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition, BusinessRule,
+                    GenerationSizeInput)
+from dataset_generator import DatasetGenerator
+from dataset_writers import read_dataset_head
+
+TOTAL_ROWS = 25000
+CHUNK_SIZE = 10000
+
+
+def retail_schema() -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="segment", datatype="category", allowed_values=["Retail", "Business"]),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="note", datatype="string"),
+                ColumnDefinition(name="amount", datatype="float"),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="customers", parent_column="customer_id",
+                                            child_table="orders", child_column="customer_id")],
+        business_rules=[],
+        kpis=[],
+    )
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "feather"])
+def test_streamed_tables_complete_and_consistent(tmp_path, fmt):
+    schema = retail_schema()
+    generator = DatasetGenerator(seed=11, workers=1)
+    paths = generator.generate_streaming(schema, TOTAL_ROWS, tmp_path, chunk_size=CHUNK_SIZE, fmt=fmt)
+
+    orders = read_dataset_head(paths["orders"], 10 * TOTAL_ROWS)
+    # Every generated row is written once, plus the intentional duplicates of each chunk
+    unique_rows = len(orders) - int(orders.duplicated().sum())
+    assert unique_rows == TOTAL_ROWS
+    assert len(orders) > TOTAL_ROWS
+
+    # FK values only come from the resident parent keys
+    parent_keys = pd.Index(generator.key_arrays[("customers", "customer_id")])
+    fk_values = orders["customer_id"].dropna()
+    assert len(fk_values) > 0.9 * len(orders)
+    assert fk_values.isin(parent_keys).all()
+
+    # Dates are read back as dates spanning the schema range
+    assert pd.api.types.is_datetime64_any_dtype(orders["order_date"])
+
+
+def test_read_dataset_head_limits_rows(tmp_path):
+    generator = DatasetGenerator(seed=3, workers=1)
+    paths = generator.generate_streaming(retail_schema(), TOTAL_ROWS, tmp_path, chunk_size=CHUNK_SIZE, fmt="parquet")
+    head = read_dataset_head(paths["orders"], 12000)
+    assert len(head) == 12000
+    assert head["order_id"].iloc[0] == "O000001"
+
+
+def test_dangling_and_cyclic_foreign_keys(tmp_path):
+    schema = retail_schema()
+    schema.tables[0].columns.append(ColumnDefinition(name="last_order_id", datatype="string"))
+    schema.relationships += [
+        ForeignKeyDefinition(parent_table="suppliers", parent_column="supplier_id",
+                             child_table="orders", child_column="supplier_id"),  # No such table
+        ForeignKeyDefinition(parent_table="orders", parent_column="order_id",
+                             child_table="customers", child_column="last_order_id"),  # Cycle
+    ]
+    schema.business_rules.append(BusinessRule(rule_type="calculated_field", description="Supplier cost",
+                                              parameters={"table": "orders",
+                                                          "formula": "amount = suppliers.cost * 2"}))
+
+    paths = DatasetGenerator(seed=5, workers=1).generate_streaming(schema, TOTAL_ROWS, tmp_path,
+                                                                   chunk_size=CHUNK_SIZE, fmt="parquet")
+    in_memory = DatasetGenerator(seed=5, workers=1).generate(schema, TOTAL_ROWS)
+    for name, path in paths.items():
+        assert list(read_dataset_head(path, 10).columns) == list(in_memory[name].columns)
+
+
+def test_phase4_sizes_stream():
+    schema = retail_schema()
+    schema.tables[1].columns += [ColumnDefinition(name=f"metric_{i}", datatype="float") for i in range(5)]
+    size_limit = GenerationSizeInput.model_fields["dataset_size"].metadata[1].le
+    assert DatasetGenerator(seed=1, workers=1).estimated_cells(schema, size_limit) >= STREAMING_GENERATION_MIN_CELLS
+    assert STREAMING_REPORT_ROWS < size_limit
@@ -0,0 +1,148 @@
+"""
+Time shaping: KPI trend, seasonality and event dips in sampled fact-table dates.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from models import Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition, KPIDefinition, EventImpact
+from dataset_generator import DatasetGenerator
+from time_shaping import kpi_trend, trend_curve, sample_dates, uniform_dates
+
+
+def schema_with(trend: str, pct=None, events=()) -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="signup_date", datatype="date"),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="revenue", datatype="float"),
+            ]),
+        ],
+        relationships=[ForeignKeyDefinition(parent_table="customers", parent_column="customer_id",
+                                            child_table="orders", child_column="customer_id")],
+        business_rules=[],
+        kpis=[KPIDefinition(name="Revenue", formula="sum(revenue)", expected_trend=trend, narrative_percentage=pct)],
+        event_impacts=list(events),
+    )
+
+
+def monthly_cv(dates: np.ndarray) -> float:
+    counts = pd.Series(dates).dt.to_period("M").value_counts()
+    return counts.std() / counts.mean()
+
+
+def test_kpi_trend_picks_first_directional_kpi():
+    kpis = [KPIDefinition(name="a", formula="x", expected_trend="stable"),
+            KPIDefinition(name="b", formula="y", expected_trend="Decline", narrative_percentage=-35.0)]
+    assert kpi_trend(kpis) == ("decline", 0.35)
+    assert kpi_trend(kpis[:1]) == ("stable", 0.0)
+
+
+@pytest.mark.parametrize("trend, end", [("growth", 1.35), ("decline", 0.65), ("stable", 1.0)])
+def test_trend_curve_hits_narrative(trend, end):
+    curve = trend_curve(trend, 0.35, 100)
+    assert curve[0] == pytest.approx(1.0)
+    assert curve[-1] == pytest.approx(end)
+
+
+def test_decline_narrative_in_sampled_dates():
+    np.random.seed(0)
+    schema = schema_with("decline", 35.0)
+    dates = pd.Series(sample_dates(schema, 200_000))
+    years = dates.dt.year.value_counts().sort_index()
+    assert years.index.min() == 2019 and years.index.max() == 2024
+    assert years.iloc[-1] < years.iloc[0] * 0.8
+    assert monthly_cv(dates.to_numpy()) > 0.1  # Passes the flat-trend check
+
+
+def test_event_dip_only_when_not_applied_to_metrics():
+    covid = EventImpact(event_name="covid", start_date="2020-04-01", end_date="2020-04-30",
+                        impact_magnitude=-0.5, affected_metrics=["revenue"])
+    schema = schema_with("stable", events=[covid])
+    orders = next(t for t in schema.tables if t.name == "orders")
+    customers = next(t for t in schema.tables if t.name == "customers")
+
+    def april_share(table_def):
+        np.random.seed(1)
+        dates = pd.Series(sample_dates(schema, 200_000, table_def))
+        return ((dates.dt.year == 2020) & (dates.dt.month == 4)).mean()
+
+    assert april_share(customers) < 0.7 * april_share(orders)  # revenue is scaled in orders instead
+
+
+def test_dimension_dates_stay_uniform():
+    schema = schema_with("growth", 80.0)
+    data = DatasetGenerator(seed=4, workers=1).generate(schema, 100_000)
+    fact_years = data["orders"]["order_date"].dt.year.value_counts().sort_index()
+    assert fact_years.iloc[-1] > 1.3 * fact_years.iloc[0]
+
+    np.random.seed(2)
+    uniform = pd.Series(uniform_dates(schema, 100_000)).dt.year.value_counts().sort_index()
+    assert uniform.iloc[-1] == pytest.approx(uniform.iloc[0], rel=0.1)
+    signup_years = data["customers"]["signup_date"].dt.year.value_counts().sort_index()
+    assert signup_years.iloc[-1] < 1.2 * signup_years.iloc[0]  # No 80% growth imposed on signups
+
+
+@pytest.mark.parametrize("row_count", [0, 1, 7, 12_345])
+@pytest.mark.parametrize("trend", ["growth", "decline", "spike", "stable"])
+def test_sampled_dates_hit_row_count_within_range(trend, row_count):
+    np.random.seed(3)
+    dates = sample_dates(schema_with(trend, 40.0), row_count)
+    assert len(dates) == row_count
+    if row_count:
+        assert dates.min() >= np.datetime64("2019-01-01") and dates.max() <= np.datetime64("2024-12-31")
+
+
+def test_range_fully_suppressed_still_fills_rows():
+    blackout = EventImpact(event_name="blackout", start_date="2019-01-01", end_date="2024-12-31",
+                           impact_magnitude=-1.0, affected_metrics=[])
+    np.random.seed(5)
+    assert len(sample_dates(schema_with("stable", events=[blackout]), 1000)) == 1000
+
+
+@pytest.mark.parametrize("trend, direction", [("growth", 1), ("decline", -1)])
+def test_monthly_counts_follow_trend(trend, direction):
+    np.random.seed(6)
+    monthly = pd.Series(sample_dates(schema_with(trend, 50.0), 300_000)).dt.to_period("M").value_counts().sort_index()
+    # Compare whole years so seasonality cancels out
+    yearly = monthly.groupby(monthly.index.year).sum()
+    assert np.sign(np.diff(yearly.to_numpy())).tolist() == [direction] * (len(yearly) - 1)
+    # The first and last of six years sit at 1/12 and 11/12 of the linear trend on average
+    expected = (1 + direction * 0.5 * 11 / 12) / (1 + direction * 0.5 / 12)
+    assert yearly.iloc[-1] / yearly.iloc[0] == pytest.approx(expected, rel=0.05)
+
+
+def test_spike_peaks_three_quarters_through_range():
+    np.random.seed(7)
+    monthly = pd.Series(sample_dates(schema_with("spike", 100.0), 300_000)).dt.to_period("M").value_counts()
+    peak = monthly.idxmax().to_timestamp()
+    assert pd.Timestamp("2023-04-01") <= peak <= pd.Timestamp("2023-10-31")
+
+
+def test_ramped_event_dip_in_monthly_counts():
+    dip = EventImpact(event_name="lockdown", start_date="2020-03-01", end_date="2020-08-31", impact_magnitude=-0.6,
+                      affected_metrics=["visits"], ramp_in_days=61, ramp_out_days=61)
+    np.random.seed(8)
+    monthly = pd.Series(sample_dates(schema_with("stable", events=[dip]), 400_000)).dt.to_period("M").value_counts()
+
+    def share(month):
+        return monthly[pd.Period(month)] / monthly[pd.Period(month.replace("2020", "2021"))]
+
+    # Ramps in over March and April, holds through June, fades out over July and August
+    assert share("2020-03") > share("2020-04") > share("2020-05")
+    assert share("2020-05") == pytest.approx(0.4, abs=0.05)
+    assert share("2020-06") == pytest.approx(0.4, abs=0.05)
+    assert share("2020-06") < share("2020-07") < share("2020-08")
+    assert share("2020-10") == pytest.approx(1.0, abs=0.05)
@@ -0,0 +1,71 @@
+"""
+Incremental validation: regenerating with one table changed re-profiles only that table.
+"""
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import data_profiler
+from models import Schema, TableDefinition, ColumnDefinition, ForeignKeyDefinition
+from dataset_generator import DatasetGenerator
+from validation_cache import table_fingerprint, validation_cache
+
+
+def retail_schema(customer_columns=()) -> Schema:
+    return Schema(
+        tables=[
+            TableDefinition(name="customers", description="Customers", primary_key="customer_id", columns=[
+                ColumnDefinition(name="customer_id", datatype="string", id_prefix="C"),
+                ColumnDefinition(name="city", datatype="string"),
+                *customer_columns,
+            ]),
+            TableDefinition(name="products", description="Products", primary_key="product_id", columns=[
+                ColumnDefinition(name="product_id", datatype="string", id_prefix="P"),
+                ColumnDefinition(name="price", datatype="float"),
+            ]),
+            TableDefinition(name="orders", description="Orders", primary_key="order_id", columns=[
+                ColumnDefinition(name="order_id", datatype="string", id_prefix="O"),
+                ColumnDefinition(name="customer_id", datatype="string"),
+                ColumnDefinition(name="product_id", datatype="string"),
+                ColumnDefinition(name="order_date", datatype="date"),
+                ColumnDefinition(name="quantity", datatype="integer"),
+            ]),
+        ],
+        relationships=[
+            ForeignKeyDefinition(parent_table="customers", parent_column="customer_id",
+                                 child_table="orders", child_column="customer_id"),
+            ForeignKeyDefinition(parent_table="products", parent_column="product_id",
+                                 child_table="orders", child_column="product_id"),
+        ],
+        business_rules=[],
+        kpis=[],
+    )
+
+
+def generate(schema: Schema):
+    generator = DatasetGenerator(seed=21, workers=1)
+    data = generator.generate(schema, 5000)
+    return data, {name: table_fingerprint(df, generator.duplicate_rows.get(name)) for name, df in data.items()}
+
+
+def test_changing_one_table_keeps_the_others_cached(monkeypatch):
+    validation_cache.clear()
+    schema = retail_schema()
+    data, fingerprints = generate(schema)
+    data_profiler.profile_dataset(schema, data, fingerprints=fingerprints)
+
+    changed = retail_schema([ColumnDefinition(name="segment", datatype="category",
+                                              allowed_values=["Retail", "Business"])])
+    new_data, new_fingerprints = generate(changed)
+    assert new_fingerprints["customers"] != fingerprints["customers"]
+    assert {name: new_fingerprints[name] for name in ("products", "orders")} == \
+           {name: fingerprints[name] for name in ("products", "orders")}
+
+    profiled = []
+    profile_table = data_profiler.profile_table
+    monkeypatch.setattr(data_profiler, "profile_table", lambda name, *args: profiled.append(name)
+                        or profile_table(name, *args))
+    data_profiler.profile_dataset(changed, new_data, fingerprints=new_fingerprints)
+    assert profiled == ["customers"]
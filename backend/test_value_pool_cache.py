@@ -0,0 +1,43 @@
+"""
+Faker value pool cache: LRU eviction and disk persistence.
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from value_pool_cache import ValuePoolCache
+
+KEY = ("word", "en_US", 0, 1000)
+
+
+def test_lru_evicts_oldest():
+    cache = ValuePoolCache(max_entries=2)
+    for bucket in range(3):
+        cache.get(("word", "en_US", bucket, 10), lambda: ["x"])
+    calls = []
+    cache.get(("word", "en_US", 0, 10), lambda: calls.append(1) or ["x"])
+    assert calls == [1]
+
+
+def test_pools_persist_across_caches(tmp_path):
+    pool = [f"value {i}" for i in range(1000)]
+    ValuePoolCache(4, tmp_path).get(KEY, lambda: pool)
+    assert ValuePoolCache(4, tmp_path).get(KEY, lambda: []) == pool
+
+
+def test_concurrent_threads_persist_same_pool(tmp_path):
+    pool = [f"value {i}" * 20 for i in range(20000)]
+
+    def persist(_):
+        cache = ValuePoolCache(4, tmp_path)  # Separate in-memory caches, shared directory
+        return cache.get(KEY, lambda: pool)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(persist, range(16)))
+
+    assert all(result == pool for result in results)
+    assert ValuePoolCache(4, tmp_path).get(KEY, lambda: []) == pool
+    assert not list(tmp_path.glob("*.tmp"))
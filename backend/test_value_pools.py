@@ -0,0 +1,52 @@
+"""
+Pool sampling for string and category columns, with and without pd.Categorical storage.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+import dataset_generator
+from dataset_generator import DatasetGenerator
+from models import Schema, TableDefinition, ColumnDefinition
+
+POOL = ["alpha", "beta", "gamma", "beta"]
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_sample_from_pool(monkeypatch, categorical):
+    monkeypatch.setattr(dataset_generator, "CATEGORICAL_STRING_COLUMNS", categorical)
+    np.random.seed(0)
+    values = DatasetGenerator(seed=1, workers=1)._sample_from_pool(POOL, 10_000)
+
+    assert len(values) == 10_000
+    assert set(values) == {"alpha", "beta", "gamma"}
+    if categorical:
+        assert isinstance(values, pd.Categorical)
+        assert list(values.categories) == ["alpha", "beta", "gamma"]
+    else:
+        assert isinstance(values, np.ndarray) and values.dtype == object
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_generated_columns_match_flag(monkeypatch, categorical):
+    monkeypatch.setattr(dataset_generator, "CATEGORICAL_STRING_COLUMNS", categorical)
+    schema = Schema(
+        tables=[TableDefinition(name="people", description="People", primary_key="person_id", columns=[
+            ColumnDefinition(name="person_id", datatype="string", id_prefix="P"),
+            ColumnDefinition(name="full_name", datatype="string"),
+            ColumnDefinition(name="tier", datatype="category", allowed_values=["Gold", "Silver"]),
+        ])],
+        relationships=[], business_rules=[], kpis=[],
+    )
+    people = DatasetGenerator(seed=5, workers=1).generate(schema, 2000)["people"]
+
+    assert isinstance(people["full_name"].dtype, pd.CategoricalDtype) == categorical
+    assert isinstance(people["tier"].dtype, pd.CategoricalDtype) == categorical
+    assert set(people["tier"].dropna()) == {"Gold", "Silver"}
+    assert people["full_name"].dropna().str.len().min() > 0
@@ -0,0 +1,42 @@
+"""
+Streaming ZIP archives: validity, per-entry compression and missing files.
+"""
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from zip_stream import stream_zip
+
+
+def test_archive_round_trip(tmp_path):
+    csv_file = tmp_path / "orders.csv"
+    csv_file.write_bytes(b"id,amount\n" + b"".join(b"%d,%d.50\n" % (i, i) for i in range(50000)))
+    parquet_file = tmp_path / "orders.parquet"
+    parquet_file.write_bytes(bytes(range(256)) * 100)
+    entries = [
+        ("data/orders.csv", csv_file),
+        ("data/orders.parquet", parquet_file),
+        ("data/missing.csv", tmp_path / "missing.csv"),
+        ("README.txt", b"readme"),
+    ]
+
+    chunks = list(stream_zip(entries, chunk_size=4096))
+    assert len(chunks) > 3  # Bytes arrive while the archive is being built
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["data/orders.csv", "data/orders.parquet", "README.txt"]
+        assert archive.read("data/orders.csv") == csv_file.read_bytes()
+        assert archive.read("data/orders.parquet") == parquet_file.read_bytes()
+        assert archive.read("README.txt") == b"readme"
+        assert archive.getinfo("data/orders.csv").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("data/orders.parquet").compress_type == zipfile.ZIP_STORED
+
+
+def test_empty_archive():
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_zip([])))) as archive:
+        assert archive.namelist() == []